@@ -0,0 +1,222 @@
+"""Framework overhead benchmarks.
+
+Times the BaseClass lifecycle (start, create_browser, context/page creation,
+close_browser, close_all) per engine and mode, plus a full login_to_On_call
+and the dashboard steps against the local stand-in server (standin/), and
+reports percentiles as JSON:
+
+    python -m benchmarks.run --engines chromium,firefox,webkit --modes headless,headed \\
+        --iterations 10 --records 2000 --output bench.json --baseline benchmarks/baseline.json
+
+Pass --save-baseline to store the run as the new baseline instead of comparing.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from importlib.metadata import version
+
+from controller.OnCallFunctions import OnCallFunctions
+from controller.base import BaseClass, BrowserPool
+from controller.login_cache import LoginCache
+from controller.profiles import PROFILES, get_profile
+from standin.server import StandinServer, StandinSettings
+
+PERCENTILES = (50, 90, 95, 99)
+MODES = {"headless": True, "headed": False}
+
+
+def percentile(values, pct):
+    """Linear interpolation between the closest ranks."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples):
+    summary = {"n": len(samples), "mean": sum(samples) / len(samples), "min": min(samples), "max": max(samples)}
+    summary.update({f"p{pct}": percentile(samples, pct) for pct in PERCENTILES})
+    return {key: round(value, 2) if isinstance(value, float) else value for key, value in summary.items()}
+
+
+class Timings:
+    """Samples (ms) per measured step."""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        started = time.perf_counter()
+        yield
+        self.samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+
+    def summary(self):
+        return {name: summarize(samples) for name, samples in self.samples.items()}
+
+
+def bench_lifecycle(engine, headless, iterations, timings):
+    for _ in range(iterations):
+        # A private pool per iteration so start and the first create_browser include the launch
+        controller = BaseClass()
+        controller.pool = pool = BrowserPool()
+        try:
+            with timings.measure("start"):
+                controller.start()
+            with timings.measure("create_browser_cold"):
+                handle = controller.create_browser(engine, headless)
+            with timings.measure("close_browser"):
+                controller.close_browser(handle)
+
+            browser = pool.get_browser(engine, headless)
+            with timings.measure("new_context"):
+                context = browser.new_context()
+            with timings.measure("new_page"):
+                context.new_page()
+            context.close()
+
+            with timings.measure("create_browser"):
+                controller.create_browser(engine, headless)
+            for _ in range(2):
+                controller.create_browser(engine, headless)
+            with timings.measure("close_all"):
+                controller.close_all()
+        except Exception:
+            pool.close()
+            raise
+        with timings.measure("pool_close"):
+            pool.close()
+
+
+def bench_login(engine, headless, iterations, timings, standin):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        oncall = standin.point(OnCallFunctions())
+        oncall.pool = pool = BrowserPool()
+        oncall.login_cache = LoginCache(cache_dir)
+        try:
+            for index in range(iterations):
+                email = f"bench{index}@example.com"
+                # First login goes through the sign-in form, the second resumes the cached session
+                for name in ("login_to_On_call", "login_to_On_call_cached"):
+                    handle = oncall.create_browser(engine, headless)
+                    with timings.measure(name):
+                        oncall.login_to_On_call(oncall.pages[handle], email)
+                    if name == "login_to_On_call_cached":
+                        bench_dashboard(oncall, oncall.pages[handle], timings)
+                    oncall.close_browser(handle)
+        finally:
+            pool.close()
+
+
+def bench_dashboard(oncall, page, timings):
+    """The dashboard-to-history steps; their cost grows with the stand-in's --records."""
+    for step in (oncall.select_dashboard_record, oncall.send_email, oncall.open_email_history,
+                 oncall.add_activity_12, oncall.close):
+        with timings.measure(step.__name__):
+            step(page)
+
+
+def run(engines, modes, iterations, standin):
+    results, errors = {}, {}
+    for engine in engines:
+        for mode in modes:
+            label = f"{engine}:{mode}"
+            timings = Timings()
+            try:
+                # create_browser prints its handle; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    bench_lifecycle(engine, MODES[mode], iterations, timings)
+                    bench_login(engine, MODES[mode], iterations, timings, standin)
+            except Exception as e:
+                errors[label] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                print(f"❌ {label}: {errors[label]}")
+                continue
+            results[label] = timings.summary()
+            print(f"✅ {label}")
+    return results, errors
+
+
+def compare(results, baseline, metric="p50", tolerance=20.0):
+    """Steps whose ``metric`` grew more than ``tolerance`` percent over the baseline."""
+    regressions = []
+    for label, steps in results.items():
+        for step, summary in steps.items():
+            before = baseline.get(label, {}).get(step, {}).get(metric)
+            if not before:
+                continue
+            change = 100 * (summary[metric] - before) / before
+            if change > tolerance:
+                regressions.append((label, step, before, summary[metric], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="chromium,firefox,webkit")
+    parser.add_argument("--modes", default="headless,headed")
+    parser.add_argument("--profile", default=None, choices=sorted(PROFILES),
+                        help="execution profile supplying launch flags, viewport and slow-mo (default: $PW_PROFILE)")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--records", type=int, default=50, help="queue records on the stand-in dashboard")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to stand-in responses")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--metric", default="p50", choices=[f"p{pct}" for pct in PERCENTILES] + ["mean"])
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed slowdown in percent")
+    args = parser.parse_args(argv)
+    profile = BrowserPool.profile = get_profile(args.profile)
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    settings = StandinSettings(records=args.records, latency_ms=args.latency_ms)
+    with StandinServer(settings) as standin:
+        results, errors = run(engines, modes, args.iterations, standin)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "playwright": version("playwright"),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "records": args.records,
+            "latency_ms": args.latency_ms,
+            "profile": profile.name,
+            "unit": "ms",
+        },
+        "results": results,
+        "errors": errors,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        print(f"⚠️ No baseline at {args.baseline}; nothing to compare against")
+        return 0
+    regressions = compare(results, baseline, args.metric, args.tolerance)
+    for label, step, before, now, change in regressions:
+        print(f"🐢 {label} {step}: {args.metric} {before:.1f}ms -> {now:.1f}ms (+{change:.0f}%)")
+    if not regressions:
+        print(f"✅ No step slower than the baseline by more than {args.tolerance:.0f}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
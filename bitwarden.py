@@ -2,8 +2,22 @@ import subprocess
 import json
 import re
 import os
+import base64
+import hashlib
+import hmac
+import struct
 import shutil
+import socket
+import time
+import atexit
+import threading
 from pathlib import Path
+from urllib.parse import quote, urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from controller.login_cache import file_lock
 
 # Global API credentials
 BW_CLIENT_ID = ""
@@ -12,6 +26,152 @@ MASTER_PASSWORD = ""
 
 # Environment variable name for session token
 BW_SESSION_ENV_VAR = "BW_SESSION_TOKEN"
+# File the session token is persisted in between runs
+BW_SESSION_CACHE_FILE = Path(os.environ.get("BW_SESSION_CACHE_FILE",
+                                            Path.home() / ".cache" / "bitwarden" / "session"))
+# How long a token that was proven valid is trusted without asking `bw status` again
+BW_SESSION_LEASE_WINDOW = float(os.environ.get("BW_SESSION_LEASE_WINDOW", 300))
+
+# Route vault calls through a long-lived `bw serve` process instead of one CLI spawn per call
+USE_BW_SERVE = os.environ.get("BW_SERVE", "").lower() in ("1", "true", "yes")
+BW_SERVE_HOST = "127.0.0.1"
+
+# How long the in-memory vault index is trusted before it is rebuilt
+VAULT_INDEX_TTL = float(os.environ.get("BW_VAULT_INDEX_TTL", 300))
+
+# Codes with fewer seconds left than this are too close to the window boundary to submit
+TOTP_MIN_REMAINING = int(os.environ.get("BW_TOTP_MIN_REMAINING", 3))
+# At the boundary, wait for the next window instead of submitting the next window's code early
+TOTP_WAIT_AT_BOUNDARY = os.environ.get("BW_TOTP_WAIT", "").lower() in ("1", "true", "yes")
+
+
+class BwServeError(Exception):
+    """Raised when the `bw serve` REST API rejects a request or is unreachable."""
+
+
+class BwServeBackend:
+    """Runs `bw serve` once on a local port and talks to its REST API over a pooled session."""
+
+    def __init__(self, session_token, bw_path='bw', port=None, startup_timeout=30):
+        self.session_token = session_token
+        self.bw_path = bw_path
+        self.port = port or self._free_port()
+        self.startup_timeout = startup_timeout
+        self.base_url = f"http://{BW_SERVE_HOST}:{self.port}"
+        self.process = None
+        self.http = requests.Session()
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
+    @staticmethod
+    def _free_port():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind((BW_SERVE_HOST, 0))
+            return sock.getsockname()[1]
+
+    def start(self):
+        env = os.environ.copy()
+        env['BW_SESSION'] = self.session_token
+        print(f"🚀 Starting bw serve on port {self.port}...")
+        self.process = subprocess.Popen(
+            [self.bw_path, 'serve', '--hostname', BW_SERVE_HOST, '--port', str(self.port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise BwServeError(f"bw serve exited with code {self.process.returncode}")
+            try:
+                self.http.get(f"{self.base_url}/status", timeout=2)
+                print("✅ bw serve is ready")
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.stop()
+        raise BwServeError(f"bw serve did not become ready within {self.startup_timeout}s")
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.is_running():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+        self.http.close()
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.http.request(method, f"{self.base_url}{path}", timeout=30, **kwargs)
+            payload = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise BwServeError(f"bw serve request failed: {e}")
+        if not payload.get('success'):
+            raise BwServeError(payload.get('message') or f"HTTP {response.status_code}")
+        return payload.get('data')
+
+    def status(self):
+        return self._request('GET', '/status').get('template', {})
+
+    def sync(self):
+        return self._request('POST', '/sync')
+
+    def list_items(self, search=None):
+        params = {'search': search} if search else None
+        return self._request('GET', '/list/object/items', params=params).get('data', [])
+
+    def get_item(self, item_name):
+        return self._request('GET', f"/object/item/{quote(item_name, safe='')}")
+
+    def get_totp(self, item_name):
+        return self._request('GET', f"/object/totp/{quote(item_name, safe='')}").get('data')
+
+
+_serve_backend = None
+
+
+def get_serve_backend(session_token, bw_path='bw'):
+    """Return a running `bw serve` backend for this session, or None to use the CLI."""
+    global _serve_backend, USE_BW_SERVE
+
+    if not USE_BW_SERVE or not session_token:
+        return None
+
+    if running_serve_backend(session_token):
+        return _serve_backend
+
+    # The server is bound to the session it was started with; restart it on token refresh
+    stop_serve_backend()
+    try:
+        _serve_backend = BwServeBackend(session_token, bw_path).start()
+        return _serve_backend
+    except (BwServeError, OSError) as e:
+        print(f"⚠️ bw serve unavailable, falling back to CLI calls: {e}")
+        USE_BW_SERVE = False
+        _serve_backend = None
+        return None
+
+
+def running_serve_backend(session_token):
+    """The `bw serve` backend already running for this session, if any; never starts one."""
+    if _serve_backend and _serve_backend.session_token == session_token and _serve_backend.is_running():
+        return _serve_backend
+    return None
+
+
+def stop_serve_backend():
+    """Stops the `bw serve` process if one is running."""
+    global _serve_backend
+    if _serve_backend:
+        _serve_backend.stop()
+        _serve_backend = None
+
+
+atexit.register(stop_serve_backend)
 
 
 def find_bw_executable():
@@ -90,145 +250,232 @@ def find_bw_executable():
     return None
 
 
+def _session_lock_path():
+    return BW_SESSION_CACHE_FILE.with_name(BW_SESSION_CACHE_FILE.name + ".lock")
+
+
+def _read_session_token_file():
+    try:
+        return BW_SESSION_CACHE_FILE.read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _publish_session_token(session_token, lease=None):
+    """Hands `session_token` to this process and the cache file; the caller holds the file lock."""
+    os.environ[BW_SESSION_ENV_VAR] = session_token
+    (lease or get_session_lease()).record(session_token)
+
+    # Persist for future runs; skip the write when the token hasn't changed
+    try:
+        if _read_session_token_file() == session_token:
+            return
+        BW_SESSION_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so other workers never read a half-written token
+        tmp = BW_SESSION_CACHE_FILE.with_name(f"{BW_SESSION_CACHE_FILE.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(session_token)
+        os.replace(tmp, BW_SESSION_CACHE_FILE)
+        print(f"💾 Session token cached in {BW_SESSION_CACHE_FILE}")
+    except OSError as e:
+        print(f"⚠️ Could not persist token for future sessions: {e}")
+        print(f"💾 Session token cached in memory for current process only: {BW_SESSION_ENV_VAR}")
+
+
 def get_cached_session_token():
-    """Get session token from environment variable if it exists."""
-    # First check in process environment
-    token = os.environ.get(BW_SESSION_ENV_VAR)
-    
-    # If not found in process environment, try to get from system environment
-    if not token and os.name == 'nt':  # Windows
-        try:
-            # Use PowerShell to get system environment variable
-            result = subprocess.run(
-                ['powershell', '-Command', f'[Environment]::GetEnvironmentVariable("{BW_SESSION_ENV_VAR}", "User")'],
-                capture_output=True, 
-                text=True,
-                check=False
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                token = result.stdout.strip()
-                # Set in current process too
-                os.environ[BW_SESSION_ENV_VAR] = token
-        except Exception as e:
-            print(f"⚠️ Error checking system environment: {e}")
-    
+    """Get session token from the process environment or the session cache file."""
+    # Don't hand out a token while this process is replacing it
+    with get_session_lease().lock:
+        # First check in process environment
+        token = os.environ.get(BW_SESSION_ENV_VAR)
+
+        # Then fall back to the token persisted by a previous run
+        if not token:
+            try:
+                with file_lock(_session_lock_path()):
+                    token = _read_session_token_file()
+                if token:
+                    # Set in current process too
+                    os.environ[BW_SESSION_ENV_VAR] = token
+            except OSError as e:
+                print(f"⚠️ Error reading session cache file: {e}")
+
     if token:
-        print(f"🔄 Found cached session token in environment variable")
+        print(f"🔄 Found cached session token")
         return token
-    
+
     print("ℹ️ No cached session token found, will need to create a new one")
     return None
 
 
 def set_session_token_cache(session_token):
-    """Set session token as environment variable for current process and future use."""
+    """Set session token for the current process and persist it in the session cache file."""
     if not session_token:
         print("⚠️ Attempted to cache empty token - ignoring")
         return
-        
-    # Store in process environment
-    os.environ[BW_SESSION_ENV_VAR] = session_token
-    
-    # Also try to persist the token for future runs
-    try:
-        # For Windows
-        if os.name == 'nt':
-            # Use setx for normal persistence
-            subprocess.run(['setx', BW_SESSION_ENV_VAR, session_token], 
-                          capture_output=True, check=False)
-            
-            # Additionally use PowerShell for better persistence (system-wide)
-            try:
-                ps_cmd = f'[Environment]::SetEnvironmentVariable("{BW_SESSION_ENV_VAR}", "{session_token}", "User")'
-                subprocess.run(['powershell', '-Command', ps_cmd], 
-                              capture_output=True, check=False)
-            except Exception as e:
-                print(f"⚠️ PowerShell environment setting failed: {e}")
-                
-            print(f"💾 Session token cached in environment variable and persisted for future sessions: {BW_SESSION_ENV_VAR}")
-        # For Linux/macOS
-        else:
-            home = os.path.expanduser("~")
-            shell_profiles = [
-                os.path.join(home, '.bashrc'),
-                os.path.join(home, '.bash_profile'),
-                os.path.join(home, '.zshrc')
-            ]
-            
-            for profile in shell_profiles:
-                if os.path.exists(profile):
-                    with open(profile, 'r') as f:
-                        content = f.read()
-                    
-                    # Remove existing export if present
-                    if f'export {BW_SESSION_ENV_VAR}=' in content:
-                        lines = content.split('\n')
-                        filtered_lines = [line for line in lines if not line.startswith(f'export {BW_SESSION_ENV_VAR}=')]
-                        content = '\n'.join(filtered_lines)
-                    
-                    # Add new export at the end
-                    with open(profile, 'w') as f:
-                        f.write(content)
-                        if not content.endswith('\n'):
-                            f.write('\n')
-                        f.write(f'export {BW_SESSION_ENV_VAR}="{session_token}"\n')
-                    
-                    print(f"💾 Session token cached and persisted in {profile}")
-                    break
-    except Exception as e:
-        print(f"⚠️ Could not persist token for future sessions: {e}")
-        print(f"💾 Session token cached in memory for current process only: {BW_SESSION_ENV_VAR}")
+
+    with get_session_lease().lock, file_lock(_session_lock_path()):
+        _publish_session_token(session_token)
 
 
 def clear_session_token_cache():
-    """Clear cached session token from environment."""
-    if BW_SESSION_ENV_VAR in os.environ:
-        del os.environ[BW_SESSION_ENV_VAR]
-        print(f"🗑️ Cleared cached session token from current process")
-        
-    # Also try to remove from persistent storage
+    """Clear cached session token from the environment and the session cache file."""
+    with get_session_lease().lock:
+        if BW_SESSION_ENV_VAR in os.environ:
+            del os.environ[BW_SESSION_ENV_VAR]
+            print(f"🗑️ Cleared cached session token from current process")
+        get_session_lease().reset()
+
+        try:
+            with file_lock(_session_lock_path()):
+                BW_SESSION_CACHE_FILE.unlink()
+            print(f"🗑️ Removed persistent session token from {BW_SESSION_CACHE_FILE}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Could not remove persistent token: {e}")
+
+
+def unlock_vault(bw_path: str = 'bw') -> str:
+    """Unlocks the logged-in account for a new session key, without logging out first."""
+    env = os.environ.copy()
+    env['BW_PASSWORD'] = MASTER_PASSWORD
     try:
-        # For Windows
-        if os.name == 'nt':
-            # Use setx to clear variable
-            subprocess.run(['setx', BW_SESSION_ENV_VAR, ''], 
-                          capture_output=True, check=False)
-            
-            # Additionally use PowerShell for thorough cleanup
-            try:
-                ps_cmd = f'[Environment]::SetEnvironmentVariable("{BW_SESSION_ENV_VAR}", $null, "User")'
-                subprocess.run(['powershell', '-Command', ps_cmd], 
-                              capture_output=True, check=False)
-            except Exception as e:
-                print(f"⚠️ PowerShell environment clearing failed: {e}")
-                
-            print(f"🗑️ Removed persistent session token from system environment")
-        # For Linux/macOS
-        else:
-            home = os.path.expanduser("~")
-            shell_profiles = [
-                os.path.join(home, '.bashrc'),
-                os.path.join(home, '.bash_profile'),
-                os.path.join(home, '.zshrc')
-            ]
-            
-            for profile in shell_profiles:
-                if os.path.exists(profile):
-                    with open(profile, 'r') as f:
-                        content = f.read()
-                    
-                    # Remove existing export if present
-                    if f'export {BW_SESSION_ENV_VAR}=' in content:
-                        lines = content.split('\n')
-                        filtered_lines = [line for line in lines if not line.startswith(f'export {BW_SESSION_ENV_VAR}=')]
-                        with open(profile, 'w') as f:
-                            f.write('\n'.join(filtered_lines))
-                            if filtered_lines and not filtered_lines[-1].endswith('\n'):
-                                f.write('\n')
-                        print(f"🗑️ Removed persistent session token from {profile}")
-                    break
-    except Exception as e:
-        print(f"⚠️ Could not remove persistent token: {e}")
+        result = subprocess.run(
+            [bw_path, 'unlock', '--passwordenv', 'BW_PASSWORD', '--raw'],
+            capture_output=True,
+            text=True,
+            env=env,
+            timeout=30
+        )
+    except (subprocess.TimeoutExpired, OSError) as e:
+        print(f"⚠️ Unlock failed: {e}")
+        return None
+    if result.returncode == 0 and result.stdout.strip():
+        return result.stdout.strip()
+    print(f"⚠️ Unlock failed: {result.stderr.strip()}")
+    return None
+
+
+class SessionLease:
+    """Remembers when a session token was last proven valid so callers can skip re-checking it."""
+
+    def __init__(self, bw_path='bw', window=BW_SESSION_LEASE_WINDOW):
+        self.bw_path = bw_path
+        self.window = window
+        self.token = None
+        self.validated_at = None
+        self.lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, token):
+        """Marks `token` as valid as of now (e.g. right after unlock)."""
+        with self.lock:
+            self.token = token
+            self.validated_at = time.monotonic()
+
+    def reset(self):
+        with self.lock:
+            self.token = None
+            self.validated_at = None
+
+    def is_current(self, token=None):
+        with self.lock:
+            return (self.token is not None
+                    and (token is None or token == self.token)
+                    and self.validated_at is not None
+                    and time.monotonic() - self.validated_at < self.window)
+
+    def is_valid(self, token=None):
+        """Validates `token` (default: the leased one), reusing a recent result inside the window."""
+        token = token or self.token
+        if not token:
+            return False
+        if self.is_current(token):
+            return True
+        if is_session_valid(token, self.bw_path):
+            self.record(token)
+            return True
+        with self.lock:
+            if token == self.token:
+                self.validated_at = None
+        return False
+
+    def refresh(self):
+        """Proves the leased token again, or unlocks for a new one if it was rejected.
+
+        Holds the lease lock and the session file lock throughout, so neither this process's
+        callers nor other workers use or replace the token halfway through.
+        """
+        with self.lock:
+            with file_lock(_session_lock_path()):
+                # Another worker may have refreshed while we waited for the lock
+                stored = _read_session_token_file()
+                for token in dict.fromkeys(t for t in (stored, self.token) if t):
+                    if is_session_valid(token, self.bw_path):
+                        _publish_session_token(token, self)
+                        return token
+                print("🔄 Session lease expired, unlocking for a new session token...")
+                token = unlock_vault(self.bw_path)
+                if token:
+                    _publish_session_token(token, self)
+                    return token
+            # Not logged in any more; only a full login helps
+            return get_bw_session(self.bw_path, force_new=True)
+
+    def start_auto_refresh(self, margin=None):
+        """Refreshes the lease in a background thread shortly before the window runs out."""
+        if self._thread and self._thread.is_alive():
+            return
+        margin = self.window * 0.2 if margin is None else margin
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(max(self.window - margin, 1)):
+                if self.token:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        print(f"⚠️ Background session refresh failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="bw-session-lease", daemon=True)
+        self._thread.start()
+
+    def stop_auto_refresh(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def auto_refreshing(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+_session_lease = None
+
+
+def get_session_lease(bw_path=None) -> SessionLease:
+    """Returns the process-wide session lease shared by every caller."""
+    global _session_lease
+    if _session_lease is None:
+        _session_lease = SessionLease(bw_path or 'bw')
+    elif bw_path:
+        _session_lease.bw_path = bw_path
+    return _session_lease
+
+
+def stop_session_lease():
+    """Stops the background refresh of the session lease, if one is running."""
+    if _session_lease:
+        _session_lease.stop_auto_refresh()
+
+
+# The refresher is a daemon thread, so it would otherwise keep calling `bw status`
+# and `bw unlock` until the interpreter dies, e.g. in an xdist worker after its last test
+atexit.register(stop_session_lease)
 
 
 def is_session_valid(session_token, bw_path='bw'):
@@ -237,6 +484,17 @@ def is_session_valid(session_token, bw_path='bw'):
         print("❌ No session token provided to validate")
         return False
 
+    # Only ask a server that already runs for this token: checking a candidate token
+    # (e.g. one another worker stored) must not start or restart `bw serve`
+    backend = running_serve_backend(session_token) if USE_BW_SERVE else None
+    if backend:
+        try:
+            if backend.status().get('status') == 'unlocked':
+                print("✅ Session token is valid and vault is unlocked")
+                return True
+        except BwServeError as e:
+            print(f"⚠️ bw serve status check failed, using CLI: {e}")
+
     try:
         print(f"🔍 Validating session token...")
         
@@ -307,7 +565,7 @@ def get_bw_session(bw_path: str = 'bw', force_new=False) -> str:
         cached_token = get_cached_session_token()
         if cached_token:
             print("🔍 Validating cached session token...")
-            if is_session_valid(cached_token, bw_path):
+            if get_session_lease(bw_path).is_valid(cached_token):
                 print("🔐 Using valid cached session token")
                 return cached_token
             else:
@@ -433,6 +691,16 @@ def get_bw_session(bw_path: str = 'bw', force_new=False) -> str:
 
 def sync_vault(session_token: str, bw_path: str = 'bw'):
     """Syncs the Bitwarden vault to get the latest data."""
+    backend = get_serve_backend(session_token, bw_path)
+    if backend:
+        try:
+            backend.sync()
+            invalidate_vault_index()
+            print("✅ Vault synced successfully.")
+            return
+        except BwServeError as e:
+            print(f"⚠️ bw serve sync failed, using CLI: {e}")
+
     try:
         subprocess.run(
             [bw_path, 'sync', '--session', session_token],
@@ -441,6 +709,7 @@ def sync_vault(session_token: str, bw_path: str = 'bw'):
             check=True,
             timeout=30
         )
+        invalidate_vault_index()
         print("✅ Vault synced successfully.")
     except subprocess.CalledProcessError as e:
         print(f"❌ Error during vault sync: {e.stderr}")
@@ -454,6 +723,169 @@ def extract_ids_from_error(error_message: str) -> list:
     return ids
 
 
+class VaultIndex:
+    """In-memory name/username/URI/ID lookup built from one `bw list items` dump."""
+
+    def __init__(self, items, ttl=VAULT_INDEX_TTL):
+        self.built_at = time.monotonic()
+        self.ttl = ttl
+        self.stale = False
+        self.by_id = {}
+        self.by_name = {}
+        self.by_username = {}
+        self.by_uri = {}
+
+        for item in items:
+            self.by_id[item['id'].lower()] = item
+            login = item.get('login') or {}
+            self._add(self.by_name, item.get('name'), item)
+            self._add(self.by_username, login.get('username'), item)
+            for uri in login.get('uris') or []:
+                self._add(self.by_uri, uri.get('uri'), item)
+
+        # Resolve duplicates the same way every run: newest revision first, then ID
+        for bucket in (self.by_name, self.by_username, self.by_uri):
+            for matches in bucket.values():
+                matches.sort(key=lambda i: i['id'])
+                matches.sort(key=lambda i: i.get('revisionDate') or '', reverse=True)
+
+    @staticmethod
+    def _add(bucket, key, item):
+        if key:
+            bucket.setdefault(key.strip().lower(), []).append(item)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def is_fresh(self):
+        return not self.stale and time.monotonic() - self.built_at < self.ttl
+
+    def lookup(self, item_name: str) -> dict:
+        """Find an item by ID, name, username or URI, in that order of precedence."""
+        key = item_name.strip().lower()
+        if key in self.by_id:
+            return self.by_id[key]
+        for bucket in (self.by_name, self.by_username, self.by_uri):
+            matches = bucket.get(key)
+            if matches:
+                if len(matches) > 1:
+                    print(f"⚠️  Multiple entries found for '{item_name}', using {matches[0]['id']}")
+                return matches[0]
+        return None
+
+
+_vault_index = None
+
+# Ways building the index can fail that a direct `bw get` lookup may still get past
+INDEX_BUILD_ERRORS = (json.JSONDecodeError, subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError)
+
+
+def list_vault_items(session_token: str, bw_path: str = 'bw') -> list:
+    """Dumps every vault item with a single `bw list items` call."""
+    backend = get_serve_backend(session_token, bw_path)
+    if backend:
+        try:
+            return backend.list_items()
+        except BwServeError as e:
+            print(f"⚠️ bw serve list failed, using CLI: {e}")
+
+    result = subprocess.run(
+        [bw_path, 'list', 'items', '--session', session_token],
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60
+    )
+    return json.loads(result.stdout)
+
+
+def get_vault_index(session_token: str, bw_path: str = 'bw', force_refresh=False) -> VaultIndex:
+    """Returns the shared vault index, rebuilding it when expired or after a sync."""
+    global _vault_index
+
+    if force_refresh or _vault_index is None or not _vault_index.is_fresh():
+        items = list_vault_items(session_token, bw_path)
+        _vault_index = VaultIndex(items)
+        print(f"📇 Indexed {len(_vault_index)} vault items")
+    return _vault_index
+
+
+def is_vault_index_fresh() -> bool:
+    return _vault_index is not None and _vault_index.is_fresh()
+
+
+def invalidate_vault_index():
+    """Marks the vault index stale so the next lookup rebuilds it."""
+    if _vault_index is not None:
+        _vault_index.stale = True
+
+
+def parse_totp_secret(secret: str) -> dict:
+    """Parses a Bitwarden `login.totp` value (base32 seed or otpauth:// URI) into TOTP parameters."""
+    params = {'algorithm': 'SHA1', 'digits': 6, 'period': 30}
+    value = secret.strip()
+
+    if value.lower().startswith('otpauth://'):
+        query = {k.lower(): v[0] for k, v in parse_qs(urlparse(value).query).items()}
+        value = query.get('secret', '')
+        params['algorithm'] = query.get('algorithm', params['algorithm']).upper()
+        params['digits'] = int(query.get('digits', params['digits']))
+        params['period'] = int(query.get('period', params['period']))
+    elif '://' in value:
+        # steam:// and other non-standard schemes are left to the CLI
+        raise ValueError(f"Unsupported TOTP scheme: {value.split('://')[0]}")
+
+    if params['algorithm'] not in ('SHA1', 'SHA256', 'SHA512'):
+        raise ValueError(f"Unsupported TOTP algorithm: {params['algorithm']}")
+
+    seed = value.replace(' ', '').replace('-', '').upper().rstrip('=')
+    params['key'] = base64.b32decode(seed + '=' * (-len(seed) % 8))
+    return params
+
+
+def generate_totp(secret, at: float = None) -> str:
+    """Generates the RFC 6238 code for `secret` (string or parsed dict) at time `at`."""
+    params = parse_totp_secret(secret) if isinstance(secret, str) else secret
+    counter = int((time.time() if at is None else at) // params['period'])
+    digest = hmac.new(params['key'], struct.pack('>Q', counter),
+                      getattr(hashlib, params['algorithm'].lower())).digest()
+    offset = digest[-1] & 0x0F
+    code = struct.unpack('>I', digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(code % 10 ** params['digits']).zfill(params['digits'])
+
+
+def get_local_totp(secret: str, min_remaining: int = None, wait: bool = None) -> str:
+    """Generates a code locally, steering clear of codes about to roll over."""
+    min_remaining = TOTP_MIN_REMAINING if min_remaining is None else min_remaining
+    wait = TOTP_WAIT_AT_BOUNDARY if wait is None else wait
+    params = parse_totp_secret(secret)
+
+    now = time.time()
+    remaining = params['period'] - now % params['period']
+    if remaining < min_remaining:
+        if wait:
+            print(f"⏳ TOTP window ends in {remaining:.1f}s, waiting for the next one")
+            time.sleep(remaining)
+            now = time.time()
+        else:
+            now += params['period']
+    return generate_totp(params, now)
+
+
+def _resolve_via_serve(lookup, item_name):
+    """Runs a `bw serve` lookup, retrying with the first ID when the name is ambiguous."""
+    try:
+        return lookup(item_name)
+    except BwServeError as e:
+        if "More than one result was found" not in str(e):
+            raise
+        ids = extract_ids_from_error(str(e))
+        if not ids:
+            raise
+        print(f"⚠️  Multiple entries found for '{item_name}', using first ID: {ids[0]}")
+        return lookup(ids[0])
+
+
 def get_credentials_with_retry(item_name: str, session_token: str, bw_path: str = 'bw', max_retries: int = 2) -> dict:
     """Retrieves an item from the Bitwarden vault with retry logic for expired sessions."""
 
@@ -495,6 +927,21 @@ def get_credentials_with_retry(item_name: str, session_token: str, bw_path: str
 
 def get_credentials(item_name: str, session_token: str, bw_path: str = 'bw') -> dict:
     """Retrieves an item from the Bitwarden vault by name, ID, or URL."""
+    try:
+        item_data = get_vault_index(session_token, bw_path).lookup(item_name)
+        if item_data:
+            return item_data
+        print(f"ℹ️ '{item_name}' not in vault index, asking Bitwarden directly")
+    except INDEX_BUILD_ERRORS as e:
+        print(f"⚠️ Could not build vault index, asking Bitwarden directly: {e}")
+
+    backend = get_serve_backend(session_token, bw_path)
+    if backend:
+        try:
+            return _resolve_via_serve(backend.get_item, item_name)
+        except BwServeError as e:
+            print(f"⚠️ bw serve lookup failed, using CLI: {e}")
+
     try:
         # First, try with the original item name/email
         result = subprocess.run(
@@ -580,7 +1027,7 @@ def get_totp_with_retry(item_name: str, session_token: str, bw_path: str = 'bw',
                     
                     # First try to get the updated session token from environment
                     cached_token = get_cached_session_token()
-                    if cached_token and cached_token != session_token and is_session_valid(cached_token, bw_path):
+                    if cached_token and cached_token != session_token and get_session_lease(bw_path).is_valid(cached_token):
                         print("✅ Using recently refreshed session token from cache")
                         session_token = cached_token
                         continue
@@ -612,6 +1059,21 @@ def get_totp_with_retry(item_name: str, session_token: str, bw_path: str = 'bw',
 
 def get_totp(item_name: str, session_token: str, bw_path: str = 'bw') -> str:
     """Fetches the TOTP for the specified Bitwarden item."""
+    try:
+        item_data = get_vault_index(session_token, bw_path).lookup(item_name)
+        seed = ((item_data or {}).get('login') or {}).get('totp')
+        if seed:
+            return get_local_totp(seed)
+    except INDEX_BUILD_ERRORS + (ValueError,) as e:
+        print(f"⚠️ Could not generate TOTP locally, asking Bitwarden: {e}")
+
+    backend = get_serve_backend(session_token, bw_path)
+    if backend:
+        try:
+            return _resolve_via_serve(backend.get_totp, item_name)
+        except BwServeError as e:
+            print(f"⚠️ bw serve TOTP lookup failed, using CLI: {e}")
+
     try:
         # First, try with the original item name/email
         result = subprocess.run(
@@ -692,10 +1154,14 @@ def get_bitwarden_credentials(email):
         print("❌ Failed to get session token, cannot proceed")
         return None
 
+    # Keep the shared lease warm so later lookups in this process don't re-validate
+    get_session_lease(bw_path).start_auto_refresh()
+
     try:
-        # Sync vault to ensure latest data (non-blocking)
-        print("\n=== Syncing Vault ===")
-        sync_vault(session_token, bw_path)
+        # Sync vault to ensure latest data, unless the index was built recently
+        if not is_vault_index_fresh():
+            print("\n=== Syncing Vault ===")
+            sync_vault(session_token, bw_path)
 
         # Get credentials with retry logic
         print("\n=== Retrieving Credentials ===")
@@ -720,7 +1186,7 @@ def get_bitwarden_credentials(email):
         token_status = "Not Cached"
         final_token = get_cached_session_token()
         if final_token:
-            if is_session_valid(final_token, bw_path):
+            if get_session_lease(bw_path).is_valid(final_token):
                 token_status = "Cached and Valid"
             else:
                 token_status = "Cached but Invalid"
@@ -734,7 +1200,7 @@ def get_bitwarden_credentials(email):
 
         # Show a reminder about token persistence
         print("\n=== Token Persistence Info ===")
-        print(f"✅ Session token has been stored in the {BW_SESSION_ENV_VAR} environment variable")
+        print(f"✅ Session token has been stored in the {BW_SESSION_ENV_VAR} environment variable and {BW_SESSION_CACHE_FILE}")
         print(f"   This token will be reused for future runs to avoid unnecessary logins")
         print(f"   Token will expire after several hours of inactivity")
 
@@ -769,4 +1235,4 @@ if __name__ == "__main__":
     else:
         print("Usage: python bitwardenAuth.py <email_address>")
         print("Example: python bitwardenAuth.py admin@rtqa1securly.com")
-        print(f"\nNote: Session tokens are cached in environment variable: {BW_SESSION_ENV_VAR}")
\ No newline at end of file
+        print(f"\nNote: Session tokens are cached in environment variable {BW_SESSION_ENV_VAR} and {BW_SESSION_CACHE_FILE}")
\ No newline at end of file
@@ -1,25 +1,37 @@
 import pytest
 import logging
-import allure
 
-# Configure global logger
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)  # Capture all logs
+from controller.base import BaseClass
 
-# def pytest_addoption(parser):
-#     # parser.addoption("--browser", action="store", default="chromium")
-#     # parser.addoption("--headed", action="store_true")
+pytest_plugins = [
+    "plugins.profiles",
+    "plugins.logging_pipeline",
+    "plugins.network_policy",
+    "plugins.har",
+    "plugins.browser_servers",
+    "plugins.duration_scheduler",
+    "plugins.impact_selection",
+    "plugins.action_metrics",
+    "plugins.failure_tracing",
+    "plugins.standin",
+    "plugins.results_store",
+    "plugins.capture",
+]
 
+logger = logging.getLogger()
 
-@pytest.fixture(autouse=True)
-def setup_logging():
-    logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
 
-    # Add Allure logging handler
-    class AllureLogger(logging.Handler):
-        def emit(self, record):
-            with allure.step(f'LOG ({record.levelname}): {record.getMessage()}'):
-                pass
 
-    if not any(isinstance(handler, AllureLogger) for handler in logger.handlers):
-        logger.addHandler(AllureLogger())
+@pytest.fixture(scope="session", autouse=True)
+def browser_pool():
+    pool = BaseClass.pool
+    yield pool
+    report = pool.report()
+    pool.close()
+    if report["checkouts"]:
+        logger.info("Browser pool: %s", report)
@@ -0,0 +1,15 @@
+from controller.async_base import AsyncBaseClass
+from controller.locators import AWARE
+
+class AsyncAwareFunctions(AsyncBaseClass):
+
+    locators = AWARE
+
+    def __init__(self, pool=None):
+        super().__init__(pool)
+        self.login_url = "https://rtqawww.securly.com/app/aware/"
+
+    async def login_to_child(self, handle):
+        page3 = self.pages[handle]
+        await page3.goto("https://www.saucedemo.com/v1/")
+        await self.locators.on(page3).accepted_usernames.click()
@@ -0,0 +1,114 @@
+from dotenv import load_dotenv
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import asyncio
+import os
+
+from controller.async_base import AsyncBaseClass, FanOutError, gather_limited
+from controller.locators import ONCALL
+from controller.login_cache import LoginCache, local_storage_script
+from controller.waits import AsyncWait
+
+load_dotenv()
+
+class AsyncOnCallFunctions(AsyncBaseClass):
+
+    locators = ONCALL
+
+    def __init__(self, pool=None):
+        super().__init__(pool)
+        self.login_url = "https://rtqawww.securly.com/24/login"
+        self.enable_automation_url = os.getenv("ENABLE_AUTOMATION_URL", self.enable_automation_url)
+        self.login_cache = LoginCache()
+
+    async def create_logged_in_browser(self, email):
+        # The cache takes a file lock, which may wait on another worker; keep that off the event loop
+        storage_state = await asyncio.to_thread(self.login_cache.get, self.login_url, email)
+        handle = await self.create_browser(storage_state=storage_state, label=email)
+        await self.login_to_On_call(self.pages[handle], email)
+        return handle
+
+    async def create_logged_in_browsers(self, emails, concurrency=None):
+        """Log every email into its own context, all at once; returns ``{email: handle}``.
+
+        The contexts share the pool's browser (``pool_size`` browsers per engine at most),
+        so 20-50 users cost contexts rather than browser processes.
+        """
+        emails = list(emails)
+        if len({email.lower() for email in emails}) != len(emails):
+            raise ValueError("Fan-out users need distinct emails; repeated ones would share one session")
+        before = set(self.contexts)
+        outcomes = await gather_limited([self.create_logged_in_browser(email) for email in emails], concurrency)
+        errors = {email: ("login", outcome) for email, outcome in zip(emails, outcomes)
+                  if isinstance(outcome, BaseException)}
+        if errors:
+            # Includes contexts whose login failed after create_browser
+            await asyncio.gather(*(self.close_browser(handle) for handle in set(self.contexts) - before))
+            raise FanOutError(errors, dict(zip(emails, outcomes)))
+        return dict(zip(emails, outcomes))
+
+    async def login_to_On_call(self, page, email):
+        if await self.resume_cached_session(page, email):
+            return
+        await self.enable_automation(page)
+        async with self._dashboard_wait(page):
+            await self.login_to_url_on_page(page, self.login_url, email)
+        await asyncio.to_thread(self.login_cache.write, await page.context.storage_state(), self.login_url, email)
+
+    async def resume_cached_session(self, page, email, google_signin_text='Google "G" Logo Sign in with', timeout_ms=10000):
+        state = await asyncio.to_thread(self.login_cache.load, self.login_url, email)
+        if state is None:
+            return False
+        await page.context.add_cookies(state.get("cookies", []))
+        script = local_storage_script(state)
+        if script:
+            await page.context.add_init_script(script)
+        await page.goto(self.login_url)
+        locators = self.locators.on(page)
+        signin = locators.get("google_signin_link", google_signin_text=google_signin_text)
+        try:
+            await locators.dashboard_record.or_(signin).first.wait_for(timeout=timeout_ms)
+            rejected = await signin.is_visible()
+        except PlaywrightTimeoutError:
+            rejected = True
+        if rejected:
+            await asyncio.to_thread(self.login_cache.invalidate, self.login_url, email)
+            return False
+        return True
+
+    def _dashboard_wait(self, page, budget_ms=10000):
+        return (AsyncWait(page, "dashboard", budget_ms)
+                .selector(self.locators.on(page).dashboard_record)
+                .network_idle(required=False)
+                .dom_settled(required=False))
+
+    async def wait_for_dashboard(self, page, budget_ms=10000):
+        return await self._dashboard_wait(page, budget_ms).until()
+
+    # --- LoginPage functionality ---
+    async def login_to_url_on_page(self, page, login_url, email, google_signin_text='Google "G" Logo Sign in with', submit_text='Submit'):
+        locators = self.locators.on(page)
+        await page.goto(login_url)
+        await locators.get("google_signin_link", google_signin_text=google_signin_text).click()
+        await locators.email_input.fill(email)
+        await locators.get("submit_button", submit_text=submit_text).click()
+
+    async def select_dashboard_record(self, page, record_id=25973, email="rtqa1securly.com"):
+        await self.locators.on(page).get("dashboard_record", record_id=record_id, email=email).click()
+
+    async def send_email(self, page):
+        await self.locators.on(page).send_email_button.click()
+
+    async def open_email_history(self, page):
+        await self.locators.on(page).open_history_link.click()
+
+    async def add_activity(self, page, n):
+        await self.locators.on(page).get("add_activity_button", n=n).click()
+
+    async def add_activity_1(self, page):
+        await self.add_activity(page, 1)
+
+    async def add_activity_12(self, page):
+        await self.add_activity(page, 12)
+
+    async def close(self, page):
+        await self.locators.on(page).close_button.click()
@@ -1,55 +1,112 @@
 
 from dotenv import load_dotenv
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 import os
 
+from controller.AsyncOnCallFunctions import AsyncOnCallFunctions
 from controller.base import BaseClass
+from controller.locators import ONCALL
+from controller.login_cache import LoginCache, local_storage_script
+from controller.waits import Wait
 
 load_dotenv()
 
 class OnCallFunctions(BaseClass):
 
+    locators = ONCALL
+    async_twin = AsyncOnCallFunctions
+
     def __init__(self):
         super().__init__()
         self.login_url = "https://rtqawww.securly.com/24/login"
-        self.enable_automation_url = os.getenv("ENABLE_AUTOMATION_URL")
+        self.enable_automation_url = os.getenv("ENABLE_AUTOMATION_URL", self.enable_automation_url)
+        self.login_cache = LoginCache()
+
+    def create_logged_in_browser(self, email):
+        # Start the context from the cached session when we have one; login_to_On_call
+        # still verifies it and falls back to a real login if it was rejected.
+        handle = self.create_browser(storage_state=self.login_cache.get(self.login_url, email), label=email)
+        self.login_to_On_call(self.pages[handle], email)
+        return handle
 
     def login_to_On_call(self, page, email):
+        if self.resume_cached_session(page, email):
+            return
         # Only perform login steps
         self.enable_automation(page)
-        self.login_to_url_on_page(page, self.login_url, email)
-        # try:
-        #     page.wait_for_selector('[data-testid="dashboard_queue_auditor_record-25973__button"]', timeout=5000)
-        # except Exception:
-        #     raise AssertionError("Dashboard did not load or expected element not found after login.")
+        # Armed before the submit click so the post-login redirects are seen; the session
+        # cookies are only complete once they have finished
+        with self._dashboard_wait(page):
+            self.login_to_url_on_page(page, self.login_url, email)
+        self.login_cache.save(page.context, self.login_url, email)
         print(page)
         # return page
 
+    def resume_cached_session(self, page, email, google_signin_text='Google "G" Logo Sign in with', timeout_ms=10000):
+        state = self.login_cache.load(self.login_url, email)
+        if state is None:
+            return False
+        # create_logged_in_browser already built the context from the full storage state;
+        # a context made elsewhere only gets it back through cookies and an init script.
+        page.context.add_cookies(state.get("cookies", []))
+        script = local_storage_script(state)
+        if script:
+            page.context.add_init_script(script)
+        page.goto(self.login_url)
+        locators = self.locators.on(page)
+        signin = locators.get("google_signin_link", google_signin_text=google_signin_text)
+        # Whichever shows up first decides: an accepted session lands on the dashboard,
+        # a rejected one on the sign-in page.
+        try:
+            locators.dashboard_record.or_(signin).first.wait_for(timeout=timeout_ms)
+            rejected = signin.is_visible()
+        except PlaywrightTimeoutError:
+            rejected = True
+        if rejected:
+            self.login_cache.invalidate(self.login_url, email)
+            return False
+        return True
+
+    def _dashboard_wait(self, page, budget_ms=10000):
+        """A dashboard record must show up; quiet network and DOM are only waited for briefly (long polls)."""
+        return (Wait(page, "dashboard", budget_ms)
+                .selector(self.locators.on(page).dashboard_record)
+                .network_idle(required=False)
+                .dom_settled(required=False))
+
+    def wait_for_dashboard(self, page, budget_ms=10000):
+        return self._dashboard_wait(page, budget_ms).until()
+
     # --- LoginPage functionality ---
     def login_to_url_on_page(self, page, login_url, email, google_signin_text='Google "G" Logo Sign in with', submit_text='Submit'):
+        locators = self.locators.on(page)
         page.goto(login_url)
-        page.get_by_role("link", name=google_signin_text).click()
-        page.get_by_role("textbox").fill(email)
-        page.get_by_role("button", name=submit_text).click()
+        locators.get("google_signin_link", google_signin_text=google_signin_text).click()
+        locators.email_input.fill(email)
+        locators.get("submit_button", submit_text=submit_text).click()
 
     # def select_(self, page):
     #     page.get_by_test_id("dashboard_queue_auditor_record-25973__button").get_by_text("
 
-    def select_dashboard_record(self, page):
-        page.get_by_test_id("dashboard_queue_auditor_record-25973__button").get_by_text("rtqa1securly.com").click()
+    def select_dashboard_record(self, page, record_id=25973, email="rtqa1securly.com"):
+        self.locators.on(page).get("dashboard_record", record_id=record_id, email=email).click()
 
     def send_email(self, page):
-        page.get_by_test_id("dashboard_case-overview__send-email-button").click()
+        self.locators.on(page).send_email_button.click()
 
     def open_email_history(self, page):
-        page.get_by_test_id("email_incident-type__open-history-link").click()
+        self.locators.on(page).open_history_link.click()
+
+    def add_activity(self, page, n):
+        self.locators.on(page).get("add_activity_button", n=n).click()
 
     def add_activity_1(self, page):
-        page.get_by_test_id("history_flagged-tab_activity-1__add-activity-button").click()
+        self.add_activity(page, 1)
 
     def add_activity_12(self, page):
-        page.get_by_test_id("history_flagged-tab_activity-12__add-activity-button").click()
+        self.add_activity(page, 12)
 
     def close(self, page):
-        page.get_by_role("button", name="Close").click()
+        self.locators.on(page).close_button.click()
 
     
@@ -0,0 +1,196 @@
+from playwright.async_api import async_playwright
+import asyncio
+import logging
+import time
+
+from controller.instrumentation import counters, instrument_class
+from controller.profiles import get_profile
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutError(AssertionError):
+    """Some users of a fan-out failed; ``errors`` maps each to the (step, exception) that stopped it."""
+
+    def __init__(self, errors, results):
+        self.errors = errors
+        self.results = results
+        lines = [f"{user}: {step} raised {error!r}" for user, (step, error) in errors.items()]
+        super().__init__(f"{len(errors)} of {len(results)} users failed\n" + "\n".join(lines))
+
+
+async def gather_limited(coroutines, concurrency=None):
+    """``asyncio.gather`` with at most ``concurrency`` running at once; exceptions are returned, not raised."""
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def limited(coroutine):
+        if semaphore is None:
+            return await coroutine
+        async with semaphore:
+            return await coroutine
+    return await asyncio.gather(*(limited(coroutine) for coroutine in coroutines), return_exceptions=True)
+
+
+class AsyncBrowserPool:
+    """Async counterpart of ``BrowserPool``; share one instance between the actors of a scenario."""
+
+    # Execution profile (controller/profiles.py); plugins/profiles.py replaces it for --profile
+    profile = get_profile()
+
+    def __init__(self):
+        self.pw = None
+        self.browsers = {}
+        self.launch_timings = {}
+        self.checkout_timings = []
+        self.checkouts = 0
+        self.releases = 0
+        self._locks = {}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self.pw is None:
+            self.pw = await async_playwright().start()
+        return self.pw
+
+    async def get_browser(self, engine=None, headless=None):
+        key = engine, mode = self.profile.resolve(engine, headless)
+        # Actors created concurrently must not race each other into launching twice.
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            browsers = self.browsers[key] = [b for b in self.browsers.get(key, []) if b.is_connected()]
+            if browsers and (len(browsers) >= self.profile.pool_size or min(len(b.contexts) for b in browsers) == 0):
+                return min(browsers, key=lambda b: len(b.contexts))
+            await self.start()
+            started = time.perf_counter()
+            browser = await getattr(self.pw, engine).launch(**self.profile.launch_options(engine, mode))
+            elapsed = time.perf_counter() - started
+            self.launch_timings.setdefault(key, []).append(elapsed)
+            logger.info("Launched %s (%s, profile %s) in %.3fs", engine, mode, self.profile.name, elapsed)
+            browsers.append(browser)
+        return browser
+
+    async def checkout(self, engine=None, headless=None, **context_options):
+        started = time.perf_counter()
+        browser = await self.get_browser(engine, headless)
+        context = await browser.new_context(**{**self.profile.context_options(), **context_options})
+        page = await context.new_page()
+        self.checkout_timings.append(time.perf_counter() - started)
+        self.checkouts += 1
+        return browser, context, page
+
+    async def release(self, context):
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning("Could not close context cleanly: %s", e)
+        self.releases += 1
+
+    async def close(self):
+        for browser in [browser for browsers in self.browsers.values() for browser in browsers]:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning("Could not close browser cleanly: %s", e)
+        self.browsers.clear()
+        if self.pw:
+            await self.pw.stop()
+            self.pw = None
+
+
+class AsyncBaseClass:
+    """Async twin of ``BaseClass`` so several actors can be driven with ``asyncio.gather``."""
+
+    # Set per test by plugins/network_policy.py and plugins/har.py
+    network_policy = None
+    har = None
+    # Engine of the running test when the profile covers several (plugins/profiles.py)
+    engine = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every public controller step is timed; see controller/instrumentation.py
+        instrument_class(cls)
+
+    def __init__(self, pool=None):
+        self.pool = pool or AsyncBrowserPool()
+        self.browsers = {}
+        self.contexts = {}
+        self.pages = {}
+        self.counter = 0
+        self.enable_automation_url = "https://rtqawww.securly.com/automation/enableAutomation"
+
+    async def start(self):
+        await self.pool.start()
+
+    async def create_browser(self, engine=None, headless=None, storage_state=None, label=None):
+        # engine and headless default to the execution profile (controller/profiles.py);
+        # label names the user the context is for, which keys its HAR file
+        context_options = {}
+        if storage_state:
+            context_options["storage_state"] = str(storage_state)
+        browser, context, page = await self.pool.checkout(engine or self.engine, headless, **context_options)
+        await self.prepare_context(context, label)
+        handle = f"browser_{self.counter}"
+        self.counter += 1
+        self.browsers[handle] = browser
+        self.contexts[handle] = context
+        self.pages[handle] = page
+        print(handle)
+        return handle
+
+    async def prepare_context(self, context, label=None):
+        counters.watch(context)
+        if self.network_policy:
+            await self.network_policy.apply_async(context)
+        if self.har:
+            await self.har.apply_async(context, label)
+
+    async def enable_automation(self, page):
+        await page.goto(self.enable_automation_url)
+
+    async def close_browser(self, handle):
+        if handle in self.contexts:
+            await self.pool.release(self.contexts[handle])
+            del self.browsers[handle]
+            del self.contexts[handle]
+            del self.pages[handle]
+
+    async def close_all(self):
+        await asyncio.gather(*(self.close_browser(handle) for handle in list(self.contexts)))
+
+    def _fan_out_step(self, step):
+        # "add_activity_1", ("select_dashboard_record", {"record_id": 25974}) or async fn(controller, page, user)
+        if callable(step):
+            return getattr(step, "__name__", repr(step)), lambda page, user: step(self, page, user)
+        name, kwargs = (step, {}) if isinstance(step, str) else step
+        method = getattr(self, name)
+        return name, lambda page, user: method(page, **kwargs)
+
+    async def fan_out(self, handles, *steps, concurrency=None):
+        """Run ``steps`` on the pages of many handles, every user taking each step at the same moment.
+
+        ``handles`` is a list of handles or a ``{user: handle}`` dict. A user whose step raises
+        skips the rest; once everyone is done, ``FanOutError`` reports them. Returns
+        ``{user: [result of each step]}``.
+        """
+        if not isinstance(handles, dict):
+            handles = {handle: handle for handle in handles}
+        results = {user: [] for user in handles}
+        errors = {}
+        for step in steps:
+            label, call = self._fan_out_step(step)
+            users = [user for user in handles if user not in errors]
+            outcomes = await gather_limited([call(self.pages[handles[user]], user) for user in users], concurrency)
+            for user, outcome in zip(users, outcomes):
+                if isinstance(outcome, BaseException):
+                    errors[user] = (label, outcome)
+                else:
+                    results[user].append(outcome)
+        if errors:
+            raise FanOutError(errors, results)
+        return results
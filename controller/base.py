@@ -1,8 +1,150 @@
 from playwright.sync_api import sync_playwright
+import asyncio
+import concurrent.futures
+import logging
+import time
+
+from controller.async_base import AsyncBrowserPool
+from controller.capture import ScreenshotCapture
+from controller.instrumentation import counters, instrument_class
+from controller.profiles import get_profile
+from controller.tracing import RollingTracer
 import pytest
 
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """Launches each browser engine once per worker and hands out fresh contexts."""
+
+    # Execution profile (controller/profiles.py); plugins/profiles.py replaces it for --profile
+    profile = get_profile()
+
+    def __init__(self):
+        self.pw = None
+        self.browsers = {}
+        # engine -> ws endpoint of a shared browser server (see plugins/browser_servers.py)
+        self.endpoints = {}
+        self.launch_timings = {}
+        self.checkout_timings = []
+        self.checkouts = 0
+        self.releases = 0
+        self.server_stats = {}
+        self._context_endpoints = {}
+
+    def start(self):
+        if self.pw is None:
+            self.pw = sync_playwright().start()
+        return self.pw
+
+    def get_browser(self, engine=None, headless=None):
+        engine, mode = self.profile.resolve(engine, headless)
+        endpoint = self.endpoints.get(engine)
+        # A server decides its own headless mode, so one connection serves both
+        key = (engine, None) if endpoint else (engine, mode)
+        browsers = self.browsers[key] = [b for b in self.browsers.get(key, []) if b.is_connected()]
+        # Up to pool_size browsers per engine; a new one only once every browser is busy
+        if browsers and (endpoint or len(browsers) >= self.profile.pool_size
+                         or min(len(b.contexts) for b in browsers) == 0):
+            return min(browsers, key=lambda b: len(b.contexts))
+        self.start()
+        started = time.perf_counter()
+        if endpoint:
+            browser = getattr(self.pw, engine).connect(endpoint)
+            self._server_stats(endpoint)["connections"] += 1
+        else:
+            browser = getattr(self.pw, engine).launch(**self.profile.launch_options(engine, mode))
+        elapsed = time.perf_counter() - started
+        self.launch_timings.setdefault(key, []).append(elapsed)
+        logger.info("%s %s in %.3fs", "Connected to" if endpoint else "Launched",
+                    endpoint or f"{engine} ({mode}, profile {self.profile.name})", elapsed)
+        browsers.append(browser)
+        return browser
+
+    def _server_stats(self, endpoint):
+        return self.server_stats.setdefault(
+            endpoint, {"connections": 0, "contexts": 0, "active": 0, "peak_active": 0})
+
+    def checkout(self, engine=None, headless=None, **context_options):
+        started = time.perf_counter()
+        browser = self.get_browser(engine, headless)
+        context = browser.new_context(**{**self.profile.context_options(), **context_options})
+        page = context.new_page()
+        self.checkout_timings.append(time.perf_counter() - started)
+        self.checkouts += 1
+        endpoint = self.endpoints.get(self.profile.resolve(engine)[0])
+        if endpoint:
+            stats = self._server_stats(endpoint)
+            stats["contexts"] += 1
+            stats["active"] += 1
+            stats["peak_active"] = max(stats["peak_active"], stats["active"])
+            self._context_endpoints[context] = endpoint
+        return browser, context, page
+
+    def release(self, context):
+        # Contexts are cheap and fully isolated, so recycling means closing the
+        # context while keeping the browser process warm for the next checkout.
+        try:
+            context.close()
+        except Exception as e:
+            logger.warning("Could not close context cleanly: %s", e)
+        self.releases += 1
+        endpoint = self._context_endpoints.pop(context, None)
+        if endpoint:
+            self.server_stats[endpoint]["active"] -= 1
+
+    @staticmethod
+    def _label(engine, mode):
+        return f"{engine}:{mode or 'server'}"
+
+    def report(self):
+        timings = self.checkout_timings
+        return {
+            "launches": {
+                self._label(engine, mode): [round(t, 3) for t in values]
+                for (engine, mode), values in self.launch_timings.items()
+            },
+            "servers": self.server_stats,
+            "checkouts": self.checkouts,
+            "releases": self.releases,
+            "checkout_avg": round(sum(timings) / len(timings), 3) if timings else 0.0,
+            "checkout_max": round(max(timings), 3) if timings else 0.0,
+        }
+
+    def close(self):
+        for browser in [browser for browsers in self.browsers.values() for browser in browsers]:
+            try:
+                browser.close()
+            except Exception as e:
+                logger.warning("Could not close browser cleanly: %s", e)
+        self.browsers.clear()
+        if self.pw:
+            self.pw.stop()
+            self.pw = None
+
+
 class BaseClass:
 
+    # Shared by every controller in this worker process; closed by the
+    # session-scoped fixture in conftest.py.
+    pool = BrowserPool()
+    # Set per test by plugins/network_policy.py, plugins/har.py and plugins/failure_tracing.py;
+    # screenshots follow ScreenshotCapture.active (plugins/capture.py)
+    network_policy = None
+    har = None
+    trace_chunks = None
+    # Engine of the running test when the profile covers several (plugins/profiles.py)
+    engine = None
+    # Async controller mirroring this one (controller/async_base.py); fan_out runs on it
+    async_twin = None
+    # Settings fan_out copies to the twin when the controller has them
+    twin_settings = ("enable_automation_url", "login_url", "login_cache")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every public controller step is timed; see controller/instrumentation.py
+        instrument_class(cls)
+
     def __init__(self):
         self.pw = None
         self.browsers = {}
@@ -13,17 +155,17 @@ class BaseClass:
 
     def start(self):
         if self.pw is None:
-            self.pw = sync_playwright().start()
+            self.pw = self.pool.start()
 
-    def create_browser(self,):
+    def create_browser(self, engine=None, headless=None, storage_state=None, label=None):
+        # engine and headless default to the execution profile (controller/profiles.py);
+        # label names the user the context is for, which keys its HAR file
         self.start()
-        # browser_type = config.getoption("--browser")
-        # headed_mode = config.getoption("--headed")
-        # browser = getattr(self.pw, browser_type).launch(headless=not headed_mode)
-        # browser = self.pw..launch(headless=False)
-        browser = self.pw.firefox.launch(headless=False)
-        context = browser.new_context()
-        page = context.new_page()
+        context_options = {}
+        if storage_state:
+            context_options["storage_state"] = str(storage_state)
+        browser, context, page = self.pool.checkout(engine or self.engine, headless, **context_options)
+        self.prepare_context(context, label)
         handle = f"browser_{self.counter}"
         self.counter += 1
         self.browsers[handle] = browser
@@ -32,6 +174,17 @@ class BaseClass:
         print(handle)
         return handle
 
+    def prepare_context(self, context, label=None):
+        counters.watch(context)
+        if self.network_policy:
+            self.network_policy.apply(context)
+        if self.har:
+            self.har.apply(context, label)
+        if self.trace_chunks:
+            RollingTracer.active.append(RollingTracer(context, keep=self.trace_chunks))
+        if ScreenshotCapture.active:
+            ScreenshotCapture.active.watch(context)
+
     # def create_browser_remote_desktop_connection(self,ip,port):
     #     self.start()
     #     browser = self.pw.chromium.connect(f"ws://{ip}:{port}/playwright",headless=False)
@@ -53,26 +206,50 @@ class BaseClass:
 
     def enable_automation(self, handle):
         # page = self.pages[handle]
-        handle.goto("https://rtqawww.securly.com/automation/enableAutomation")
+        handle.goto(self.enable_automation_url)
 
     def close_browser(self, handle):
-        if handle in self.browsers:
-            self.browsers[handle].close()
+        if handle in self.contexts:
+            # Traces have to be stopped while the context is still open
+            RollingTracer.stop_for(self.contexts[handle])
+            if ScreenshotCapture.active:
+                ScreenshotCapture.active.forget(self.contexts[handle])
+            self.pool.release(self.contexts[handle])
             del self.browsers[handle]
             del self.contexts[handle]
             del self.pages[handle]
 
-    def close_all(self):
-        for browser in list(self.browsers.values()):
-            browser.close()
-        self.browsers.clear()
-        self.contexts.clear()
-        self.pages.clear()
-        if self.pw:
-            self.pw.stop()
-            self.pw = None
-
+    def fan_out(self, users, *steps, concurrency=None):
+        """Log ``users`` (distinct emails) into contexts of one browser and run ``steps`` for all of them at once.
 
+        Sync Playwright drives one page at a time, so the scenario runs on the async twin in a
+        thread of its own and only the results come back. Steps are as for
+        ``AsyncBaseClass.fan_out``; ``concurrency`` caps how many users act at the same moment.
+        """
+        if self.async_twin is None:
+            raise TypeError(f"{type(self).__name__} has no async twin to fan out with")
 
+        async def scenario():
+            pool = AsyncBrowserPool()
+            twin = self.async_twin(pool)
+            for name in self.twin_settings:
+                if hasattr(self, name):
+                    setattr(twin, name, getattr(self, name))
+            try:
+                handles = await twin.create_logged_in_browsers(users, concurrency)
+                try:
+                    return await twin.fan_out(handles, *steps, concurrency=concurrency)
+                finally:
+                    await twin.close_all()
+            finally:
+                await pool.close()
 
+        with concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="fan-out") as executor:
+            return executor.submit(asyncio.run, scenario()).result()
 
+    def close_all(self):
+        for handle in list(self.contexts):
+            self.close_browser(handle)
+        # The pool owns the Playwright driver and browsers; drop our reference
+        # and let the session fixture shut them down once.
+        self.pw = None
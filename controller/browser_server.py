@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from importlib.metadata import version
+
+try:
+    # Private API: Playwright has no public way to find the Node driver it bundles.
+    # Checked against Playwright 1.64, where it returns (node, cli.js).
+    from playwright._impl._driver import compute_driver_executable
+except ImportError:  # moved by a Playwright upgrade; only --browser-servers needs it
+    compute_driver_executable = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds a server gets to print its endpoint before it is killed
+STARTUP_TIMEOUT = 60
+
+# Runs BrowserType.launchServer in the Node driver bundled with the Python package and
+# prints the WebSocket endpoint; the server shuts down when our end of stdin closes.
+LAUNCH_SERVER_SCRIPT = r"""
+const playwright = require(process.argv[1]);
+const engine = process.argv[2];
+const options = JSON.parse(process.argv[3]);
+(async () => {
+  const server = await playwright[engine].launchServer(options);
+  console.log(server.wsEndpoint());
+  const shutdown = async () => { await server.close(); process.exit(0); };
+  process.on('SIGTERM', shutdown);
+  process.on('SIGINT', shutdown);
+  process.stdin.on('end', shutdown);
+  process.stdin.resume();
+})().catch(error => { console.error(error); process.exit(1); });
+"""
+
+
+class BrowserServer:
+    """A browser started once with ``launch_server`` that workers ``connect`` to over WebSocket."""
+
+    def __init__(self, engine="firefox", headless=True, startup_timeout=STARTUP_TIMEOUT, **launch_options):
+        self.engine = engine
+        self.startup_timeout = startup_timeout
+        # launchServer runs in Node, which takes camelCase option names (slow_mo -> slowMo)
+        self.launch_options = {re.sub(r"_(\w)", lambda m: m.group(1).upper(), key): value
+                               for key, value in {"headless": headless, **launch_options}.items()}
+        self.process = None
+        self.ws_endpoint = None
+        self.startup_time = None
+
+    @staticmethod
+    def driver():
+        """(node, cli.js) of the driver bundled with the installed Playwright."""
+        driver = compute_driver_executable() if compute_driver_executable else None
+        if not (isinstance(driver, tuple) and len(driver) == 2):
+            raise RuntimeError(
+                f"Playwright {version('playwright')} does not expose its Node driver the way browser servers "
+                f"expect (playwright._impl._driver.compute_driver_executable() -> (node, cli.js)); "
+                f"install a Playwright release that has it (checked with 1.64) or run without --browser-servers")
+        return driver
+
+    def start(self):
+        node, cli = self.driver()
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [node, "-e", LAUNCH_SERVER_SCRIPT, os.path.dirname(cli), self.engine, json.dumps(self.launch_options)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        # readline() blocks for as long as the server stays silent, so it gets a thread and a deadline
+        lines, stdout = queue.Queue(), self.process.stdout
+        threading.Thread(target=lambda: lines.put(stdout.readline()),
+                         name=f"{self.engine}-server-startup", daemon=True).start()
+        try:
+            endpoint = lines.get(timeout=self.startup_timeout).strip()
+        except queue.Empty:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+            raise RuntimeError(f"{self.engine} browser server printed no endpoint within {self.startup_timeout}s")
+        if not endpoint.startswith("ws"):
+            self.stop()
+            raise RuntimeError(f"{self.engine} browser server failed to start")
+        self.ws_endpoint = endpoint
+        self.startup_time = time.perf_counter() - started
+        logger.info("Started %s browser server at %s in %.3fs", self.engine, endpoint, self.startup_time)
+        return self
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
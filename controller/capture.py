@@ -0,0 +1,189 @@
+import concurrent.futures
+import hashlib
+import io
+import logging
+import time
+
+import allure
+
+from controller.instrumentation import step_listeners
+
+try:
+    from PIL import Image
+except ImportError:  # In requirements.txt; without it only byte-identical screenshots are deduplicated
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(data, size=8):
+    """64-bit difference hash of an image: similar screenshots differ in only a few bits."""
+    with Image.open(io.BytesIO(data)) as image:
+        pixels = image.convert("L").resize((size + 1, size)).tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            bits = (bits << 1) | (pixels[row * (size + 1) + col] > pixels[row * (size + 1) + col + 1])
+    return bits
+
+
+def fingerprint(data):
+    if Image is not None:
+        try:
+            return "dhash", dhash(data)
+        except OSError:
+            pass
+    return "sha256", hashlib.sha256(data).hexdigest()
+
+
+def is_near_duplicate(a, b, threshold):
+    if a is None or b is None or a[0] != b[0]:
+        return False
+    if a[0] == "dhash":
+        return bin(a[1] ^ b[1]).count("1") <= threshold
+    return a[1] == b[1]
+
+
+class CapturePolicy:
+    """When to screenshot ("off", "on-failure", "on-step") and how to encode and deduplicate the shots."""
+
+    MODES = ("off", "on-failure", "on-step")
+
+    def __init__(self, mode="on-failure", sample_rate=1.0, image_format="png", quality=80,
+                 full_page=False, threshold=4, workers=2):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown capture mode: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.image_format = image_format
+        self.quality = quality
+        self.full_page = full_page
+        self.threshold = threshold
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="capture")
+        return self._executor
+
+    def encode(self, raw):
+        """Runs on the pool: fingerprint the PNG and re-encode it in the configured format."""
+        started = time.perf_counter()
+        mark = fingerprint(raw)
+        data, extension = raw, "png"
+        if Image is not None:
+            try:
+                with Image.open(io.BytesIO(raw)) as image:
+                    buffer = io.BytesIO()
+                    if self.image_format == "jpeg":
+                        image.convert("RGB").save(buffer, "JPEG", quality=self.quality, optimize=True)
+                        extension = "jpg"
+                    else:
+                        image.save(buffer, "PNG", optimize=True)
+                # A PNG that does not get smaller is kept as the browser encoded it
+                if extension == "jpg" or buffer.tell() < len(raw):
+                    data = buffer.getvalue()
+            except OSError as e:
+                logger.warning("Could not re-encode screenshot: %s", e)
+                data, extension = raw, "png"
+        return {"fingerprint": mark, "data": data, "extension": extension,
+                "encode_ms": (time.perf_counter() - started) * 1000}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class ScreenshotCapture:
+    """Screenshots of one test's BaseClass pages, taken per ``CapturePolicy`` and attached to Allure."""
+
+    # The capture of the running test; controller steps report to it (see controller/instrumentation.py)
+    active = None
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.contexts = []
+        self.shots = []
+        self.steps = 0
+        self.capture_ms = 0.0
+
+    def watch(self, context):
+        self.contexts.append(context)
+
+    def forget(self, context):
+        if context in self.contexts:
+            self.contexts.remove(context)
+
+    def _sampled(self):
+        # Deterministic sampling: a rate of 0.25 shoots steps 4, 8, 12, ...
+        self.steps += 1
+        return int(self.steps * self.policy.sample_rate) > int((self.steps - 1) * self.policy.sample_rate)
+
+    def snap(self, label):
+        for index, context in enumerate(self.contexts):
+            for page_index, page in enumerate(context.pages):
+                if page.is_closed():
+                    continue
+                started = time.perf_counter()
+                try:
+                    raw = page.screenshot(full_page=self.policy.full_page, type="png")
+                except Exception as e:
+                    logger.warning("Could not take screenshot after %s: %s", label, e)
+                    continue
+                finally:
+                    self.capture_ms += (time.perf_counter() - started) * 1000
+                self.shots.append({
+                    "page": id(page),
+                    "where": f"context {index}, page {page_index}",
+                    "label": label,
+                    "raw_size": len(raw),
+                    "future": self.policy.executor.submit(self.policy.encode, raw),
+                })
+
+    def on_failure(self):
+        self.snap("failure")
+
+    def finish(self):
+        """Deduplicate and attach the shots; returns this test's capture statistics."""
+        stats = {"taken": len(self.shots), "kept": 0, "dropped": 0, "capture_ms": self.capture_ms,
+                 "encode_ms": 0.0, "raw_bytes": 0, "kept_bytes": 0}
+        previous = {}
+        for number, shot in enumerate(self.shots):
+            encoded = shot["future"].result()
+            stats["encode_ms"] += encoded["encode_ms"]
+            stats["raw_bytes"] += shot["raw_size"]
+            # Consecutive shots of the same page that look the same add nothing
+            if is_near_duplicate(previous.get(shot["page"]), encoded["fingerprint"], self.policy.threshold):
+                stats["dropped"] += 1
+                continue
+            previous[shot["page"]] = encoded["fingerprint"]
+            stats["kept"] += 1
+            stats["kept_bytes"] += len(encoded["data"])
+            allure.attach(encoded["data"], name=f"{number:03d} {shot['label']} ({shot['where']})",
+                          attachment_type=allure.attachment_type.JPG if encoded["extension"] == "jpg"
+                          else allure.attachment_type.PNG)
+        stats["bytes_saved"] = stats["raw_bytes"] - stats["kept_bytes"]
+        self.shots.clear()
+        return stats
+
+    @classmethod
+    def begin_steps(cls, name):
+        pass
+
+    @classmethod
+    def end_steps(cls, name, passed=True):
+        capture = cls.active
+        if capture is None or capture.policy.mode != "on-step" or not capture.contexts:
+            return
+        if not passed or capture._sampled():
+            capture.snap(name if passed else f"{name} (failed)")
+
+
+step_listeners.append(ScreenshotCapture)
@@ -0,0 +1,83 @@
+import collections
+import logging
+import re
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class HarSettings:
+    """Records or replays each context's traffic to a per-test HAR file.
+
+    ``record`` captures traffic matching ``url`` into ``<directory>/<test>/<label>.har``;
+    ``replay`` serves the same files through ``route_from_har``. With ``strict`` a request
+    missing from the HAR is aborted instead of going to the live host.
+
+    The label is the user a context was opened for (``create_logged_in_browser``), so the
+    same user gets the same file however concurrent logins interleave; contexts opened
+    without one fall back to ``context-<n>`` in creation order.
+    """
+
+    MODES = ("off", "record", "replay")
+
+    def __init__(self, mode="off", directory="hars", strict=False, url=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown HAR mode {mode!r}, expected one of {', '.join(self.MODES)}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.strict = strict
+        self.url = url
+        self.test_dir = None
+        self.contexts = 0
+        self.labels = collections.Counter()
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def begin_test(self, nodeid):
+        self.test_dir = self.directory / self.slug(nodeid)
+        self.contexts = 0
+        self.labels.clear()
+
+    @staticmethod
+    def slug(text):
+        return re.sub(r"[^\w.-]+", "_", text).strip("_")
+
+    def next_path(self, label=None):
+        if label is None:
+            name = f"context-{self.contexts}"
+            self.contexts += 1
+        else:
+            # A second context for the same user in one test gets its own file
+            self.labels[label] += 1
+            count = self.labels[label]
+            name = self.slug(label) if count == 1 else f"{self.slug(label)}-{count}"
+        return (self.test_dir or self.directory) / f"{name}.har"
+
+    def _route_options(self, label=None):
+        path = self.next_path(label)
+        if self.mode == "record":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            return {"path": path, "url": self.url, "update": True,
+                    "update_content": "embed", "update_mode": "minimal"}
+        if not path.exists():
+            if self.strict:
+                raise FileNotFoundError(f"No recorded HAR at {path}; run with --har-mode=record first")
+            logger.warning("No recorded HAR at %s, using the live host", path)
+            return None
+        return {"path": path, "url": self.url, "not_found": "abort" if self.strict else "fallback"}
+
+    def apply(self, context, label=None):
+        if not self.enabled:
+            return
+        options = self._route_options(label)
+        if options:
+            context.route_from_har(**options)
+
+    async def apply_async(self, context, label=None):
+        if not self.enabled:
+            return
+        options = self._route_options(label)
+        if options:
+            await context.route_from_har(**options)
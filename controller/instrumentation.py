@@ -0,0 +1,227 @@
+import contextvars
+import functools
+import inspect
+import logging
+import time
+import weakref
+from pathlib import Path
+
+from controller.tracing import RollingTracer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the duration histogram buckets; +Inf is implied
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class NetworkCounters:
+    """Counts main-frame navigations and requests per watched context, and tracks in-flight requests.
+
+    Counts are kept per context so concurrent actors (``fan_out``) don't show up in each
+    other's steps.
+    """
+
+    def __init__(self):
+        # context -> [navigations, requests]
+        self.counts = weakref.WeakKeyDictionary()
+        # context -> requests started but not yet finished or failed (see controller/waits.py)
+        self.inflight = weakref.WeakKeyDictionary()
+
+    def watch(self, context):
+        counts = self.counts[context] = [0, 0]
+        pending = self.inflight[context] = set()
+
+        def on_navigation(frame):
+            if frame.parent_frame is None:
+                counts[0] += 1
+
+        def on_request(request):
+            counts[1] += 1
+            pending.add(request)
+
+        def watch_page(page):
+            page.on("framenavigated", on_navigation)
+
+        context.on("request", on_request)
+        context.on("requestfinished", pending.discard)
+        context.on("requestfailed", pending.discard)
+        context.on("page", watch_page)
+        for page in context.pages:
+            watch_page(page)
+        # The steps running in this task opened it, so its traffic counts towards them
+        for opened in _opened.get():
+            opened.add(context)
+
+    def pending(self, context):
+        return list(self.inflight.get(context, ()))
+
+    def snapshot(self, contexts):
+        """Navigations and requests so far, summed over ``contexts``."""
+        navigations = requests = 0
+        for context in contexts:
+            counts = self.counts.get(context)
+            if counts:
+                navigations += counts[0]
+                requests += counts[1]
+        return navigations, requests
+
+    def contexts_of(self, values):
+        """The watched contexts among ``values`` and the contexts of the pages among them."""
+        contexts = set()
+        for value in values:
+            for candidate in (value, getattr(value, "context", None)):
+                try:
+                    if candidate in self.counts:
+                        contexts.add(candidate)
+                except TypeError:
+                    pass
+        return contexts
+
+
+class ActionMetrics:
+    """Per-action duration histograms plus navigation/request counts and failures."""
+
+    def __init__(self):
+        self.actions = {}
+
+    def _action(self, name):
+        return self.actions.setdefault(name, {
+            "count": 0, "failed": 0, "sum_ms": 0.0, "max_ms": 0.0,
+            "buckets": [0] * len(BUCKETS_MS), "navigations": 0, "requests": 0,
+        })
+
+    def record(self, name, duration_ms, passed, navigations=0, requests=0):
+        action = self._action(name)
+        action["count"] += 1
+        action["failed"] += 0 if passed else 1
+        action["sum_ms"] += duration_ms
+        action["max_ms"] = max(action["max_ms"], duration_ms)
+        action["navigations"] += navigations
+        action["requests"] += requests
+        for index, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                action["buckets"][index] += 1
+
+    def merge(self, actions):
+        for name, other in actions.items():
+            action = self._action(name)
+            for key in ("count", "failed", "sum_ms", "navigations", "requests"):
+                action[key] += other[key]
+            action["max_ms"] = max(action["max_ms"], other["max_ms"])
+            action["buckets"] = [a + b for a, b in zip(action["buckets"], other["buckets"])]
+
+    def prometheus(self):
+        lines = []
+        for name, action in sorted(self.actions.items()):
+            label = f'action="{name}"'
+            for bound, count in zip(BUCKETS_MS, action["buckets"]):
+                lines.append(f'controller_action_duration_ms_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'controller_action_duration_ms_bucket{{{label},le="+Inf"}} {action["count"]}')
+            lines.append(f'controller_action_duration_ms_sum{{{label}}} {round(action["sum_ms"])}')
+            lines.append(f'controller_action_duration_ms_count{{{label}}} {action["count"]}')
+            lines.append(f'controller_action_failed_total{{{label}}} {action["failed"]}')
+            lines.append(f'controller_action_navigations_total{{{label}}} {action["navigations"]}')
+            lines.append(f'controller_action_requests_total{{{label}}} {action["requests"]}')
+        return "\n".join(lines) + "\n"
+
+    def influx(self, timestamp_ns=None):
+        timestamp_ns = timestamp_ns or time.time_ns()
+        lines = []
+        for name, action in sorted(self.actions.items()):
+            fields = ",".join(f"{key}={round(action[key])}" for key in
+                              ("count", "failed", "sum_ms", "max_ms", "navigations", "requests"))
+            lines.append(f"controller_action,action={name} {fields} {timestamp_ns}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "prometheusData.txt").write_text(self.prometheus(), encoding="utf-8")
+        (directory / "influxDbData.txt").write_text(self.influx(), encoding="utf-8")
+
+
+# Sets collecting the contexts opened by each step running in the current task or thread
+_opened = contextvars.ContextVar("opened_contexts", default=())
+counters = NetworkCounters()
+metrics = ActionMetrics()
+# Told about every outermost sync controller step through begin_steps(name) and end_steps(name, passed)
+step_listeners = [RollingTracer]
+# Nesting depth of sync controller steps; only the outermost one is reported to the listeners
+_depth = contextvars.ContextVar("step_depth", default=0)
+
+
+def instrument(func, name):
+    """Wrap a controller method so every call is timed and recorded under ``name``.
+
+    Navigations and requests are counted on the contexts of the pages (or contexts) the
+    method was given plus any context it opened itself.
+    """
+
+    def begin(args, kwargs):
+        contexts = counters.contexts_of((*args, *kwargs.values()))
+        opened = set()
+        token = _opened.set((*_opened.get(), opened))
+        return time.perf_counter(), contexts, counters.snapshot(contexts), opened, token
+
+    def finish(state, passed):
+        started, contexts, before, opened, token = state
+        _opened.reset(token)
+        after = counters.snapshot(contexts | opened)
+        metrics.record(name, (time.perf_counter() - started) * 1000, passed,
+                       after[0] - before[0], after[1] - before[1])
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            state, passed = begin(args, kwargs), False
+            try:
+                result = await func(*args, **kwargs)
+                passed = True
+                return result
+            finally:
+                finish(state, passed)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        depth = _depth.get()
+        if depth == 0:
+            for listener in step_listeners:
+                listener.begin_steps(name)
+        depth_token = _depth.set(depth + 1)
+        state, passed = begin(args, kwargs), False
+        try:
+            result = func(*args, **kwargs)
+            passed = True
+            return result
+        finally:
+            _depth.reset(depth_token)
+            if depth == 0:
+                for listener in step_listeners:
+                    listener.end_steps(name, passed)
+            finish(state, passed)
+    return wrapper
+
+
+def instrument_class(cls):
+    """Wrap the public methods of a controller class, including those it inherits.
+
+    Only classes in ``controller/`` are instrumented; subclasses elsewhere (test fakes)
+    keep their own methods as they are. Methods inherited from a controller base class
+    (``BaseClass.create_browser``) are wrapped on the first subclass that inherits them,
+    under its name, and that wrapper is inherited further down.
+    """
+    if not cls.__module__.startswith("controller."):
+        return
+    for attr_name, attr in list(vars(cls).items()):
+        if attr_name.startswith("_") or not inspect.isfunction(attr):
+            continue
+        setattr(cls, attr_name, instrument(attr, f"{cls.__name__}.{attr_name}"))
+    for base in cls.__mro__[1:]:
+        if not base.__module__.startswith("controller."):
+            continue
+        for attr_name, attr in vars(base).items():
+            if attr_name.startswith("_") or not inspect.isfunction(attr) or hasattr(attr, "__wrapped__"):
+                continue
+            if inspect.getattr_static(cls, attr_name) is attr:
+                setattr(cls, attr_name, instrument(attr, f"{cls.__name__}.{attr_name}"))
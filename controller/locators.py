@@ -0,0 +1,221 @@
+import inspect
+import re
+import string
+import time
+import typing
+import weakref
+
+from playwright.sync_api import Page
+
+from controller.instrumentation import metrics
+
+ROLES = frozenset(typing.get_args(inspect.signature(Page.get_by_role).parameters["role"].annotation))
+TEST_ID = re.compile(r"^[\w{}-]+$")
+# Locator methods that only build another locator; everything else touches the page
+BUILDERS = frozenset({"locator", "filter", "nth", "and_", "or_", "frame_locator", "content_frame",
+                      "get_by_alt_text", "get_by_label", "get_by_placeholder", "get_by_role",
+                      "get_by_test_id", "get_by_text", "get_by_title"})
+# Told about every locator a page resolves through resolved(registry_name, locator_name)
+resolve_listeners = []
+
+
+class Selector:
+    """One declared locator: a test id, ARIA role or text, optionally narrowed by text, with ``{param}`` fields."""
+
+    KINDS = ("test_id", "role", "text")
+
+    def __init__(self, kind, value, name=None, text=None, exact=None, **defaults):
+        self.kind = kind
+        self.value = value
+        self.name = name
+        self.text = text
+        self.exact = exact
+        self.defaults = defaults
+
+    @classmethod
+    def test_id(cls, value, **kwargs):
+        return cls("test_id", value, **kwargs)
+
+    @classmethod
+    def role(cls, value, **kwargs):
+        return cls("role", value, **kwargs)
+
+    @classmethod
+    def by_text(cls, value, **kwargs):
+        return cls("text", value, **kwargs)
+
+    def templates(self):
+        return [template for template in (self.value, self.name, self.text) if template is not None]
+
+    def fields(self):
+        return {field for template in self.templates()
+                for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+
+    def problems(self):
+        problems = []
+        if self.kind not in self.KINDS:
+            return [f"unknown kind {self.kind!r}"]
+        try:
+            fields = self.fields()
+        except ValueError as e:
+            return [f"bad template: {e}"]
+        if any(not field.isidentifier() for field in fields):
+            problems.append(f"parameters must be plain names: {sorted(fields)}")
+        if self.kind == "test_id" and not TEST_ID.match(self.value):
+            problems.append(f"test id {self.value!r} has characters outside [A-Za-z0-9_-]")
+        if self.kind == "role" and self.value not in ROLES:
+            problems.append(f"unknown ARIA role {self.value!r}")
+        if self.kind != "role" and self.name is not None:
+            problems.append("name= only applies to role selectors")
+        unused = set(self.defaults) - fields
+        if unused:
+            problems.append(f"defaults for unknown parameters {sorted(unused)}")
+        return problems
+
+    def build(self, page, params):
+        params = {**self.defaults, **params}
+        missing = self.fields() - set(params)
+        if missing:
+            raise KeyError(f"Missing locator parameters: {sorted(missing)}")
+        value = self.value.format(**params)
+        if self.kind == "test_id":
+            locator = page.get_by_test_id(value)
+        elif self.kind == "role":
+            name = self.name.format(**params) if self.name is not None else None
+            locator = page.get_by_role(value, name=name, exact=self.exact)
+        else:
+            locator = page.get_by_text(value, exact=self.exact)
+        if self.text is not None:
+            locator = locator.get_by_text(self.text.format(**params))
+        return locator
+
+
+class TrackedLocator:
+    """Proxies a Playwright ``Locator`` and records how long each action on it waited."""
+
+    def __init__(self, locator, metric):
+        self._locator = locator
+        self._metric = metric
+
+    def __repr__(self):
+        return f"<TrackedLocator {self._metric} {self._locator!r}>"
+
+    def __getattr__(self, attr):
+        value = getattr(self._locator, attr)
+        if attr in BUILDERS:
+            return self._unwrapping(value)
+        if not callable(value):
+            return value
+        return self._track(value)
+
+    @staticmethod
+    def _unwrapping(builder):
+        # or_/and_ take another locator, which Playwright needs unproxied
+        def build(*args, **kwargs):
+            return builder(*(arg._locator if isinstance(arg, TrackedLocator) else arg for arg in args), **kwargs)
+        return build
+
+    def _track(self, action):
+        metric = self._metric
+
+        def tracked(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = action(*args, **kwargs)
+            except Exception:
+                metrics.record(metric, (time.perf_counter() - started) * 1000, False)
+                raise
+            if not inspect.isawaitable(result):
+                metrics.record(metric, (time.perf_counter() - started) * 1000, True)
+                return result
+
+            async def awaited():
+                passed = False
+                try:
+                    value = await result
+                    passed = True
+                    return value
+                finally:
+                    metrics.record(metric, (time.perf_counter() - started) * 1000, passed)
+            return awaited()
+        return tracked
+
+
+class PageLocators:
+    """The locators of one registry built for one page, created on first use and then reused."""
+
+    def __init__(self, registry, page):
+        self.registry = registry
+        self.page = page
+        self.cache = {}
+
+    def get(self, name, **params):
+        for listener in resolve_listeners:
+            listener(self.registry.name, name)
+        key = (name, tuple(sorted(params.items())))
+        locator = self.cache.get(key)
+        if locator is None:
+            selector = self.registry.selectors[name]
+            locator = TrackedLocator(selector.build(self.page, params), f"locator:{self.registry.name}.{name}")
+            self.cache[key] = locator
+            self.registry.builds += 1
+        else:
+            self.registry.hits += 1
+        return locator
+
+    def __getattr__(self, name):
+        if name in self.registry.selectors:
+            return self.get(name)
+        raise AttributeError(name)
+
+
+class LocatorRegistry:
+    """Selectors declared once per application, validated when the registry is created."""
+
+    def __init__(self, name, **selectors):
+        self.name = name
+        self.selectors = selectors
+        self.builds = 0
+        self.hits = 0
+        self._pages = weakref.WeakKeyDictionary()
+        self.validate()
+
+    def validate(self):
+        problems = [f"{self.name}.{name}: {problem}"
+                    for name, selector in self.selectors.items() for problem in selector.problems()]
+        test_ids = {}
+        for name, selector in self.selectors.items():
+            if selector.kind == "test_id" and selector.text is None:
+                if selector.value in test_ids:
+                    problems.append(f"{self.name}.{name}: same test id as {test_ids[selector.value]}")
+                test_ids[selector.value] = name
+        if problems:
+            raise ValueError("Invalid locators:\n" + "\n".join(problems))
+
+    def on(self, page):
+        locators = self._pages.get(page)
+        if locators is None:
+            locators = self._pages[page] = PageLocators(self, page)
+        return locators
+
+
+ONCALL = LocatorRegistry(
+    "OnCall",
+    google_signin_link=Selector.role("link", name="{google_signin_text}",
+                                     google_signin_text='Google "G" Logo Sign in with'),
+    email_input=Selector.role("textbox"),
+    submit_button=Selector.role("button", name="{submit_text}", submit_text="Submit"),
+    search_input=Selector.test_id("header__search-input"),
+    search_button=Selector.test_id("header__search-button"),
+    dashboard_record=Selector.test_id("dashboard_queue_auditor_record-{record_id}__button", text="{email}",
+                                      record_id=25973, email="rtqa1securly.com"),
+    send_email_button=Selector.test_id("dashboard_case-overview__send-email-button"),
+    open_history_link=Selector.test_id("email_incident-type__open-history-link"),
+    add_activity_button=Selector.test_id("history_flagged-tab_activity-{n}__add-activity-button"),
+    close_button=Selector.role("button", name="Close"),
+)
+
+AWARE = LocatorRegistry(
+    "Aware",
+    accepted_usernames=Selector.by_text("Accepted usernames are: standard_user locked_out_user problem_user"),
+)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".auth"
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on ``path`` so parallel workers don't clobber each other."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as handle:
+        if os.name == 'nt':
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def local_storage_script(state):
+    """An init script that puts the cached ``localStorage`` back for whichever of its origins loads.
+
+    ``new_context(storage_state=...)`` does this by itself; the script is for contexts
+    that already exist, where only cookies can be added directly.
+    """
+    origins = {origin["origin"]: origin.get("localStorage", []) for origin in state.get("origins", [])}
+    if not origins:
+        return None
+    return ("(origins => { const items = origins[window.location.origin];"
+            " if (items) for (const {name, value} of items) window.localStorage.setItem(name, value); })"
+            f"({json.dumps(origins)});")
+
+
+class LoginCache:
+    """Playwright ``storage_state`` snapshots keyed by (login_url, email)."""
+
+    def __init__(self, cache_dir=None, ttl=None):
+        self.cache_dir = Path(cache_dir or os.getenv("LOGIN_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self.ttl = float(ttl if ttl is not None else os.getenv("LOGIN_CACHE_TTL", 3600))
+
+    def path_for(self, login_url, email):
+        key = hashlib.sha1(f"{login_url}|{email.lower()}".encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def _lock_path(self, path):
+        return path.with_suffix(".lock")
+
+    def is_fresh(self, path):
+        return path.exists() and time.time() - path.stat().st_mtime < self.ttl
+
+    def get(self, login_url, email):
+        """Return the path of a fresh storage state, or None."""
+        path = self.path_for(login_url, email)
+        with file_lock(self._lock_path(path)):
+            if self.is_fresh(path):
+                return path
+            if path.exists():
+                logger.info("Login cache for %s expired", email)
+                path.unlink()
+        return None
+
+    def load(self, login_url, email):
+        path = self.get(login_url, email)
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable login cache for %s: %s", email, e)
+            self.invalidate(login_url, email)
+            return None
+
+    def save(self, context, login_url, email):
+        return self.write(context.storage_state(), login_url, email)
+
+    def write(self, state, login_url, email):
+        path = self.path_for(login_url, email)
+        with file_lock(self._lock_path(path)):
+            # Write then rename so readers never see a half-written file.
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, path)
+        logger.info("Cached login session for %s", email)
+        return path
+
+    def invalidate(self, login_url, email):
+        path = self.path_for(login_url, email)
+        with file_lock(self._lock_path(path)):
+            if path.exists():
+                path.unlink()
+        logger.info("Invalidated login cache for %s", email)
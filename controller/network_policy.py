@@ -0,0 +1,82 @@
+import collections
+import fnmatch
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkPolicy:
+    """Declarative request routing applied to every context created by the controllers.
+
+    Requests matching ``block_resource_types`` or ``block_urls`` are aborted. When
+    ``allow_urls`` is set the policy switches to allowlist mode and aborts everything
+    (documents included) that doesn't match one of those globs.
+
+    Only counts are reported: an aborted request never has a response, so there is no
+    size to add up.
+    """
+
+    def __init__(self, block_resource_types=(), block_urls=(), allow_urls=(), enabled=True):
+        self.block_resource_types = set(block_resource_types)
+        self.block_urls = tuple(block_urls)
+        self.allow_urls = tuple(allow_urls)
+        self.enabled = enabled
+        self.reset_stats()
+
+    def copy(self, **overrides):
+        options = {
+            "block_resource_types": self.block_resource_types,
+            "block_urls": self.block_urls,
+            "allow_urls": self.allow_urls,
+            "enabled": self.enabled,
+        }
+        options.update(overrides)
+        return NetworkPolicy(**options)
+
+    def reset_stats(self):
+        self.requests = 0
+        self.blocked = collections.Counter()
+
+    def should_block(self, url, resource_type):
+        if not self.enabled:
+            return False
+        if self.allow_urls:
+            return not any(fnmatch.fnmatchcase(url, pattern) for pattern in self.allow_urls)
+        if resource_type in self.block_resource_types:
+            return True
+        return any(fnmatch.fnmatchcase(url, pattern) for pattern in self.block_urls)
+
+    def apply(self, context):
+        if not self.enabled:
+            return
+
+        def handle(route):
+            self.requests += 1
+            if self.should_block(route.request.url, route.request.resource_type):
+                self.blocked[route.request.resource_type] += 1
+                route.abort("blockedbyclient")
+            else:
+                route.fallback()
+
+        context.route("**/*", handle)
+
+    async def apply_async(self, context):
+        if not self.enabled:
+            return
+
+        async def handle(route):
+            self.requests += 1
+            if self.should_block(route.request.url, route.request.resource_type):
+                self.blocked[route.request.resource_type] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.fallback()
+
+        await context.route("**/*", handle)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "blocked": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+        }
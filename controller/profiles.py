@@ -0,0 +1,111 @@
+import os
+
+ENV_VAR = "PW_PROFILE"
+DEFAULT_PROFILE = "local"
+
+# headed: a visible window; headless: the full browser without a window;
+# shell: chromium's stripped-down headless shell, the cheapest to launch (other engines treat it as headless)
+MODES = ("headed", "headless", "shell")
+
+CHROMIUM_CI_ARGS = (
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-renderer-backgrounding",
+    "--no-first-run",
+)
+
+
+class Profile:
+    """How controllers launch browsers: engines, headless mode, launch flags, viewport, slow-mo and pool size.
+
+    ``engines`` lists every engine a test runs on; tests are parametrized over them when
+    there is more than one (see plugins/profiles.py). ``args`` maps an engine to extra
+    command line flags. ``pool_size`` is the number of browsers ``BrowserPool`` keeps per
+    engine; contexts go to the least busy one.
+    """
+
+    def __init__(self, name, engines=("firefox",), mode="headed", args=None, viewport=None, slow_mo=0, pool_size=1):
+        if mode not in MODES:
+            raise ValueError(f"Unknown headless mode {mode!r}, expected one of {', '.join(MODES)}")
+        if not engines:
+            raise ValueError(f"Profile {name!r} has no engines")
+        self.name = name
+        self.engines = tuple(engines)
+        self.mode = mode
+        self.args = {engine: tuple(flags) for engine, flags in (args or {}).items()}
+        self.viewport = viewport
+        self.slow_mo = slow_mo
+        self.pool_size = max(1, pool_size)
+
+    def copy(self, **overrides):
+        options = {
+            "name": self.name,
+            "engines": self.engines,
+            "mode": self.mode,
+            "args": self.args,
+            "viewport": self.viewport,
+            "slow_mo": self.slow_mo,
+            "pool_size": self.pool_size,
+        }
+        options.update(overrides)
+        return Profile(**options)
+
+    @property
+    def engine(self):
+        return self.engines[0]
+
+    def resolve(self, engine=None, headless=None):
+        """The (engine, mode) a browser is launched with; explicit arguments win over the profile."""
+        engine = engine or self.engine
+        if headless is None:
+            mode = self.mode
+        elif headless:
+            # Playwright's own default for headless=True is chromium's headless shell
+            mode = "shell" if self.mode == "headed" else self.mode
+        else:
+            mode = "headed"
+        if mode == "shell" and engine != "chromium":
+            mode = "headless"
+        return engine, mode
+
+    def launch_options(self, engine, mode):
+        options = {"headless": mode != "headed"}
+        # Playwright launches chromium's headless shell for headless=True; the full browser needs its channel
+        if engine == "chromium" and mode == "headless":
+            options["channel"] = "chromium"
+        if self.args.get(engine):
+            options["args"] = list(self.args[engine])
+        if self.slow_mo:
+            options["slow_mo"] = self.slow_mo
+        return options
+
+    def context_options(self):
+        return {"viewport": dict(self.viewport)} if self.viewport else {}
+
+    def describe(self):
+        viewport = f"{self.viewport['width']}x{self.viewport['height']}" if self.viewport else "default"
+        return (f"{self.name}: {','.join(self.engines)} {self.mode}, viewport {viewport}, "
+                f"slow_mo {self.slow_mo}ms, {self.pool_size} browser(s) per engine")
+
+
+PROFILES = {
+    # What the controllers always did: one headed firefox
+    "local": Profile("local"),
+    "ci-fast": Profile("ci-fast", engines=("chromium",), mode="shell", args={"chromium": CHROMIUM_CI_ARGS},
+                       viewport={"width": 1280, "height": 720}),
+    "debug": Profile("debug", engines=("chromium",), mode="headed", slow_mo=250,
+                     viewport={"width": 1440, "height": 900}),
+    "cross-browser": Profile("cross-browser", engines=("chromium", "firefox", "webkit"), mode="headless",
+                             args={"chromium": CHROMIUM_CI_ARGS}, viewport={"width": 1280, "height": 720}),
+}
+
+
+def get_profile(name=None):
+    """The named profile, else the one in $PW_PROFILE, else ``local``."""
+    name = name or os.getenv(ENV_VAR) or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown execution profile {name!r}, expected one of {', '.join(PROFILES)}") from None
@@ -0,0 +1,116 @@
+import collections
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def scratch_dir():
+    """tmpfs when the host has one, so chunks that are thrown away never touch the disk."""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return str(shm)
+    return tempfile.gettempdir()
+
+
+class RollingTracer:
+    """Traces a context in chunks that end with each controller step, keeping only the last ``keep``.
+
+    ``tracing.start()`` opens the first chunk and a new one is opened as soon as a step's
+    chunk is saved, so whatever the test does between or outside steps is traced too;
+    it lands in the chunk of the next step, or in the final ``teardown`` chunk.
+    """
+
+    # Tracers of the contexts opened during the current test
+    active = []
+
+    def __init__(self, context, keep=5):
+        self.context = context
+        self.keep = keep
+        self.directory = Path(tempfile.mkdtemp(prefix="trace-chunks-", dir=scratch_dir()))
+        self.chunks = collections.deque()
+        self.steps = 0
+        self.overhead = 0.0
+        self.stopped = False
+        self._timed(context.tracing.start, screenshots=True, snapshots=True)
+
+    def _timed(self, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.overhead += time.perf_counter() - started
+
+    def _chunk_path(self, name):
+        path = self.directory / f"{self.steps:04d}-{UNSAFE.sub('_', name)}.zip"
+        self.steps += 1
+        return path
+
+    def _keep(self, path):
+        self.chunks.append(path)
+        while len(self.chunks) > self.keep:
+            self.chunks.popleft().unlink(missing_ok=True)
+
+    def end_step(self, name):
+        if self.stopped:
+            return
+        path = self._chunk_path(name)
+        try:
+            self._timed(self.context.tracing.stop_chunk, path=path)
+            self._keep(path)
+        except Exception as e:
+            logger.warning("Could not save trace chunk for %s: %s", name, e)
+        try:
+            self._timed(self.context.tracing.start_chunk)
+        except Exception as e:
+            # Most likely the context is gone; there is nothing left to trace
+            logger.warning("Could not start the next trace chunk: %s", e)
+            self.stopped = True
+
+    def stop(self):
+        """Stop tracing (before the context closes), saving what followed the last step."""
+        if self.stopped:
+            return
+        self.stopped = True
+        path = self._chunk_path("teardown")
+        try:
+            self._timed(self.context.tracing.stop, path=path)
+            self._keep(path)
+        except Exception as e:
+            logger.warning("Could not stop tracing cleanly: %s", e)
+
+    def persist(self, target):
+        target = Path(target)
+        target.mkdir(parents=True, exist_ok=True)
+        kept = []
+        for chunk in self.chunks:
+            if chunk.exists():
+                kept.append(Path(shutil.copy2(chunk, target / chunk.name)))
+        return kept
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.chunks.clear()
+
+    @classmethod
+    def begin_steps(cls, name):
+        # The chunk a step belongs to is already open
+        pass
+
+    @classmethod
+    def end_steps(cls, name, passed=True):
+        for tracer in cls.active:
+            tracer.end_step(name)
+
+    @classmethod
+    def stop_for(cls, context):
+        for tracer in cls.active:
+            if tracer.context is context:
+                tracer.stop()
@@ -0,0 +1,313 @@
+import fnmatch
+import logging
+import re
+import time
+
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from controller.instrumentation import counters
+
+logger = logging.getLogger(__name__)
+
+# Installed once per document: remembers when the DOM last changed
+OBSERVE_MUTATIONS_JS = """() => {
+  if (window.__lastMutation === undefined) {
+    window.__lastMutation = performance.now();
+    new MutationObserver(() => { window.__lastMutation = performance.now(); })
+      .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  }
+}"""
+DOM_SETTLED_JS = "quiet => performance.now() - window.__lastMutation >= quiet"
+# Errors (navigation in progress, a detached frame) tolerated while checking the DOM before giving up
+DOM_CHECK_ERRORS = 5
+
+
+class WaitTimeout(AssertionError):
+    """A wait ran out of budget; the message lists the conditions that never held."""
+
+
+class WaitStats:
+    """Time each named wait actually took against the budget it was given."""
+
+    def __init__(self):
+        self.waits = {}
+
+    def _wait(self, name):
+        return self.waits.setdefault(name, {
+            "count": 0, "timeouts": 0, "best_effort_misses": 0, "sum_ms": 0.0, "max_ms": 0.0, "budget_ms": 0.0,
+            "max_used": 0.0,
+        })
+
+    def record(self, name, waited_ms, budget_ms, passed, missed=False):
+        wait = self._wait(name)
+        wait["count"] += 1
+        wait["timeouts"] += 0 if passed else 1
+        wait["best_effort_misses"] += 1 if missed else 0
+        wait["sum_ms"] += waited_ms
+        wait["max_ms"] = max(wait["max_ms"], waited_ms)
+        wait["budget_ms"] = max(wait["budget_ms"], budget_ms)
+        wait["max_used"] = max(wait["max_used"], waited_ms / budget_ms if budget_ms else 0.0)
+
+    def merge(self, waits):
+        for name, other in waits.items():
+            wait = self._wait(name)
+            for key in ("count", "timeouts", "best_effort_misses", "sum_ms"):
+                wait[key] += other.get(key, 0)
+            for key in ("max_ms", "budget_ms", "max_used"):
+                wait[key] = max(wait[key], other[key])
+
+
+wait_stats = WaitStats()
+
+
+class ResponseCondition:
+
+    def __init__(self, url, status=None):
+        self.url = url
+        self.status = status
+        self.seen = False
+
+    def matches(self, response):
+        if self.status is not None and response.status != self.status:
+            return False
+        if callable(self.url):
+            return self.url(response)
+        if isinstance(self.url, re.Pattern):
+            return bool(self.url.search(response.url))
+        return fnmatch.fnmatch(response.url, self.url)
+
+    def __str__(self):
+        return f"response {getattr(self.url, 'pattern', self.url)}" + (f" ({self.status})" if self.status else "")
+
+
+class Wait:
+    """Waits until every chosen condition holds, returning as soon as they do.
+
+    Conditions: no requests in flight for ``idle_ms``, specific responses seen, no DOM
+    mutations for ``quiet_ms`` and locators reaching a state. Use it around the action
+    that triggers the change, so responses are not missed::
+
+        with Wait(page, "dashboard", budget_ms=5000).network_idle().response("**/api/queue*"):
+            locators.submit_button.click()
+
+    Network idle and DOM quiet can be best effort (``required=False``): once the required
+    conditions hold they get at most ``best_effort_ms`` more, and missing them is only
+    counted, so a page that polls forever does not fail the wait.
+    """
+
+    def __init__(self, page, name="wait", budget_ms=10000, poll_ms=25, best_effort_ms=2000):
+        self.page = page
+        self.name = name
+        self.budget_ms = budget_ms
+        self.poll_ms = poll_ms
+        self.best_effort_ms = best_effort_ms
+        self.idle_ms = None
+        self.idle_required = True
+        self.ignore = ()
+        self.quiet_ms = None
+        self.quiet_required = True
+        self.responses = []
+        self.selectors = []
+        self._idle_since = None
+        self._listening = False
+
+    def network_idle(self, idle_ms=100, ignore=(), required=True):
+        """No request of this page's context in flight for ``idle_ms``; ``ignore`` globs skip long polls."""
+        self.idle_ms = idle_ms
+        self.ignore = tuple(ignore)
+        self.idle_required = required
+        return self
+
+    def response(self, url, status=None):
+        """A response whose URL matches a glob, regex or predicate (and ``status``, if given)."""
+        self.responses.append(ResponseCondition(url, status))
+        self._listen()
+        return self
+
+    def dom_settled(self, quiet_ms=250, required=True):
+        self.quiet_ms = quiet_ms
+        self.quiet_required = required
+        return self
+
+    def selector(self, locator, state="visible"):
+        self.selectors.append((locator, state))
+        return self
+
+    def _listen(self):
+        if not self._listening:
+            self.page.on("response", self._on_response)
+            self._listening = True
+
+    def _unlisten(self):
+        if self._listening:
+            self.page.remove_listener("response", self._on_response)
+            self._listening = False
+
+    def _on_response(self, response):
+        for condition in self.responses:
+            if not condition.seen and condition.matches(response):
+                condition.seen = True
+
+    def _network_unmet(self, idle):
+        unmet = [str(condition) for condition in self.responses if not condition.seen]
+        if idle:
+            pending = [request for request in counters.pending(self.page.context)
+                       if not any(fnmatch.fnmatch(request.url, glob) for glob in self.ignore)]
+            now = time.perf_counter()
+            if pending:
+                self._idle_since = None
+                unmet.append(f"{len(pending)} requests in flight (e.g. {pending[0].url})")
+            elif self._idle_since is None:
+                self._idle_since = now
+                unmet.append("network idle")
+            elif (now - self._idle_since) * 1000 < self.idle_ms:
+                unmet.append("network idle")
+        return unmet
+
+    @staticmethod
+    def _remaining_ms(deadline):
+        return max((deadline - time.perf_counter()) * 1000, 1)
+
+    def _best_effort_deadline(self, deadline):
+        return min(deadline, time.perf_counter() + self.best_effort_ms / 1000)
+
+    def _finish(self, started, unmet, missed):
+        waited_ms = (time.perf_counter() - started) * 1000
+        wait_stats.record(self.name, waited_ms, self.budget_ms, not unmet, bool(missed))
+        if unmet:
+            raise WaitTimeout(f"{self.name}: still waiting for {', '.join(unmet)} after {waited_ms:.0f}ms "
+                              f"(budget {self.budget_ms}ms)")
+        if missed:
+            logger.info("%s: gave up on %s (best effort) after %.0fms", self.name, ", ".join(missed), waited_ms)
+        else:
+            logger.debug("%s settled in %.0fms of %sms", self.name, waited_ms, self.budget_ms)
+        return waited_ms
+
+    def until(self):
+        """Block until every required condition holds; returns the milliseconds waited."""
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+        missed = []
+        try:
+            unmet = self._poll_network(deadline, idle=self.idle_ms is not None and self.idle_required)
+            for locator, state in self.selectors:
+                try:
+                    locator.wait_for(state=state, timeout=self._remaining_ms(deadline))
+                except PlaywrightError:
+                    unmet.append(f"{locator} {state}")
+            if self.quiet_ms is not None and self.quiet_required and not self._dom_settled(deadline):
+                unmet.append(f"DOM quiet for {self.quiet_ms}ms")
+            if not unmet:
+                if self.idle_ms is not None and not self.idle_required:
+                    missed += self._poll_network(self._best_effort_deadline(deadline), idle=True)
+                if self.quiet_ms is not None and not self.quiet_required \
+                        and not self._dom_settled(self._best_effort_deadline(deadline)):
+                    missed.append(f"DOM quiet for {self.quiet_ms}ms")
+        finally:
+            self._unlisten()
+        return self._finish(started, unmet, missed)
+
+    def _poll_network(self, deadline, idle):
+        self._idle_since = None
+        unmet = self._network_unmet(idle)
+        while unmet and time.perf_counter() < deadline:
+            self.page.wait_for_timeout(min(self.poll_ms, self._remaining_ms(deadline)))
+            unmet = self._network_unmet(idle)
+        return unmet
+
+    def _dom_error(self, errors, error):
+        """Whether to give up on the DOM after another evaluate error."""
+        if errors < DOM_CHECK_ERRORS:
+            return False
+        logger.warning("%s: giving up on DOM quiet after %d errors: %s", self.name, errors, error)
+        return True
+
+    def _dom_settled(self, deadline):
+        # A navigation replaces the document (and its observer); install it again and keep waiting
+        errors = 0
+        while time.perf_counter() < deadline and not self.page.is_closed():
+            try:
+                self.page.evaluate(OBSERVE_MUTATIONS_JS)
+                self.page.wait_for_function(DOM_SETTLED_JS, arg=self.quiet_ms, timeout=self._remaining_ms(deadline))
+                return True
+            except PlaywrightTimeoutError:
+                return False
+            except PlaywrightError as e:
+                errors += 1
+                if self._dom_error(errors, e):
+                    return False
+                self.page.wait_for_timeout(min(self.poll_ms, self._remaining_ms(deadline)))
+        return False
+
+    def __enter__(self):
+        self._listen()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.until()
+        else:
+            self._unlisten()
+
+
+class AsyncWait(Wait):
+    """``Wait`` for async pages: ``await AsyncWait(...).until()`` or ``async with``."""
+
+    async def until(self):
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+        missed = []
+        try:
+            unmet = await self._poll_network(deadline, idle=self.idle_ms is not None and self.idle_required)
+            for locator, state in self.selectors:
+                try:
+                    await locator.wait_for(state=state, timeout=self._remaining_ms(deadline))
+                except PlaywrightError:
+                    unmet.append(f"{locator} {state}")
+            if self.quiet_ms is not None and self.quiet_required and not await self._dom_settled(deadline):
+                unmet.append(f"DOM quiet for {self.quiet_ms}ms")
+            if not unmet:
+                if self.idle_ms is not None and not self.idle_required:
+                    missed += await self._poll_network(self._best_effort_deadline(deadline), idle=True)
+                if self.quiet_ms is not None and not self.quiet_required \
+                        and not await self._dom_settled(self._best_effort_deadline(deadline)):
+                    missed.append(f"DOM quiet for {self.quiet_ms}ms")
+        finally:
+            self._unlisten()
+        return self._finish(started, unmet, missed)
+
+    async def _poll_network(self, deadline, idle):
+        self._idle_since = None
+        unmet = self._network_unmet(idle)
+        while unmet and time.perf_counter() < deadline:
+            await self.page.wait_for_timeout(min(self.poll_ms, self._remaining_ms(deadline)))
+            unmet = self._network_unmet(idle)
+        return unmet
+
+    async def _dom_settled(self, deadline):
+        errors = 0
+        while time.perf_counter() < deadline and not self.page.is_closed():
+            try:
+                await self.page.evaluate(OBSERVE_MUTATIONS_JS)
+                await self.page.wait_for_function(DOM_SETTLED_JS, arg=self.quiet_ms,
+                                                  timeout=self._remaining_ms(deadline))
+                return True
+            except PlaywrightTimeoutError:
+                return False
+            except PlaywrightError as e:
+                errors += 1
+                if self._dom_error(errors, e):
+                    return False
+                await self.page.wait_for_timeout(min(self.poll_ms, self._remaining_ms(deadline)))
+        return False
+
+    async def __aenter__(self):
+        self._listen()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.until()
+        else:
+            self._unlisten()
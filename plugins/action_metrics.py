@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from controller.instrumentation import metrics
+from controller.waits import wait_stats
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("action metrics", "controller step timings")
+    group.addoption("--action-metrics-dir", default=None,
+                    help="write controller step histograms as prometheusData.txt and influxDbData.txt here")
+    group.addoption("--action-summary", action="store_true",
+                    help="print the per-step timings in the terminal summary (also shown with -v)")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    actions = getattr(node, "workeroutput", {}).get("action_metrics")
+    if actions:
+        metrics.merge(json.loads(actions))
+    waits = getattr(node, "workeroutput", {}).get("wait_stats")
+    if waits:
+        wait_stats.merge(json.loads(waits))
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if hasattr(config, "workeroutput"):
+        config.workeroutput["action_metrics"] = json.dumps(metrics.actions)
+        config.workeroutput["wait_stats"] = json.dumps(wait_stats.waits)
+    elif config.getoption("--action-metrics-dir") and metrics.actions:
+        metrics.write(config.rootpath / config.getoption("--action-metrics-dir"))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if hasattr(config, "workerinput"):
+        return
+    if wait_stats.waits:
+        terminalreporter.section("waits")
+        for name, wait in sorted(wait_stats.waits.items(), key=lambda item: -item[1]["max_used"]):
+            terminalreporter.write_line(
+                f"{name}: {wait['count']} waits, avg {wait['sum_ms'] / wait['count']:.0f}ms, "
+                f"max {wait['max_ms']:.0f}ms of {wait['budget_ms']:.0f}ms budget "
+                f"({wait['max_used']:.0%} used), {wait['timeouts']} timed out, "
+                f"{wait['best_effort_misses']} best-effort misses")
+    if not metrics.actions or not (config.getoption("--action-summary") or config.getoption("verbose") > 0):
+        return
+    terminalreporter.section("controller steps")
+    for name, action in sorted(metrics.actions.items(), key=lambda item: -item[1]["sum_ms"]):
+        terminalreporter.write_line(
+            f"{name}: {action['count']} calls, avg {action['sum_ms'] / action['count']:.0f}ms, "
+            f"max {action['max_ms']:.0f}ms, {action['failed']} failed, "
+            f"{action['navigations']} navigations, {action['requests']} requests")
@@ -0,0 +1,128 @@
+import json
+import logging
+
+import pytest
+
+from controller.base import BaseClass, BrowserPool
+from controller.browser_server import BrowserServer
+
+logger = logging.getLogger(__name__)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("browser servers", "shared browser servers")
+    group.addoption("--browser-servers", type=int, default=0,
+                    help="launch this many browser servers per engine and connect to them "
+                         "instead of launching a browser in every worker (0 = off)")
+    group.addoption("--browser-server-engines", default=None,
+                    help="comma separated engines to start servers for (default: the execution profile's)")
+    group.addoption("--browser-server-headed", action="store_true",
+                    help="run the shared browser servers headed")
+
+
+def is_distributed(config):
+    return getattr(config.option, "dist", "no") != "no"
+
+
+class BrowserServerPool:
+    """Browser servers started by the controlling process and handed out to workers round-robin."""
+
+    def __init__(self, count, engines, headless=True, profile=None):
+        self.count = count
+        self.engines = engines
+        self.headless = headless
+        self.profile = profile or BrowserPool.profile
+        self.servers = {}
+        self.worker_stats = []
+
+    def start(self):
+        for engine in self.engines:
+            # Launch flags and slow-mo follow the execution profile, like locally launched browsers
+            options = self.profile.launch_options(*self.profile.resolve(engine, self.headless))
+            self.servers[engine] = [BrowserServer(engine, **options).start() for _ in range(self.count)]
+
+    def endpoints_for(self, index):
+        return {engine: servers[index % self.count].ws_endpoint for engine, servers in self.servers.items()}
+
+    def stop(self):
+        for servers in self.servers.values():
+            for server in servers:
+                server.stop()
+
+    def summary(self):
+        totals = {}
+        for worker, stats in self.worker_stats:
+            for endpoint, values in stats.items():
+                total = totals.setdefault(endpoint, {"workers": [], "connections": 0, "contexts": 0, "peak_active": 0})
+                total["workers"].append(worker)
+                total["connections"] += values["connections"]
+                total["contexts"] += values["contexts"]
+                # Workers run in parallel, so their peaks can overlap on the server
+                total["peak_active"] += values["peak_active"]
+        return totals
+
+
+def pytest_configure(config):
+    count = config.getoption("--browser-servers")
+    if not count:
+        return
+
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        BaseClass.pool.endpoints = json.loads(workerinput["browser_server_endpoints"])
+        return
+
+    engines = config.getoption("--browser-server-engines")
+    engines = [engine.strip() for engine in engines.split(",") if engine.strip()] if engines \
+        else list(BrowserPool.profile.engines)
+    servers = BrowserServerPool(count, engines, headless=not config.getoption("--browser-server-headed"))
+    config._browser_servers = servers
+    servers.start()
+    if not is_distributed(config):
+        # No xdist: this process is the only worker
+        BaseClass.pool.endpoints = servers.endpoints_for(0)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    servers = getattr(node.config, "_browser_servers", None)
+    if servers:
+        index = int(node.gateway.id.lstrip("gw") or 0)
+        node.workerinput["browser_server_endpoints"] = json.dumps(servers.endpoints_for(index))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    servers = getattr(node.config, "_browser_servers", None)
+    stats = getattr(node, "workeroutput", {}).get("browser_server_stats")
+    if servers and stats:
+        servers.worker_stats.append((node.gateway.id, json.loads(stats)))
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if hasattr(config, "workeroutput"):
+        config.workeroutput["browser_server_stats"] = json.dumps(BaseClass.pool.server_stats)
+    elif getattr(config, "_browser_servers", None) and not is_distributed(config):
+        config._browser_servers.worker_stats.append(("main", BaseClass.pool.server_stats))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    servers = getattr(config, "_browser_servers", None)
+    if not servers:
+        return
+    terminalreporter.section("browser servers")
+    for engine, engine_servers in servers.servers.items():
+        for server in engine_servers:
+            terminalreporter.write_line(f"{engine} {server.ws_endpoint} started in {server.startup_time:.3f}s")
+    for endpoint, total in servers.summary().items():
+        reuse = total["contexts"] / total["connections"] if total["connections"] else 0
+        terminalreporter.write_line(
+            f"{endpoint}: workers={','.join(total['workers'])} connections={total['connections']} "
+            f"contexts={total['contexts']} contexts/connection={reuse:.1f} peak_active<={total['peak_active']}")
+
+
+def pytest_unconfigure(config):
+    servers = getattr(config, "_browser_servers", None)
+    if servers:
+        servers.stop()
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from controller.capture import CapturePolicy, Image, ScreenshotCapture
+
+TOTALS = ("taken", "kept", "dropped", "capture_ms", "encode_ms", "raw_bytes", "kept_bytes", "bytes_saved")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("capture policy", "screenshots of controller pages")
+    group.addoption("--capture-policy", choices=CapturePolicy.MODES, default="on-failure",
+                    help="screenshot BaseClass pages never, when a test fails, or after controller steps")
+    group.addoption("--capture-sample", type=float, default=1.0,
+                    help="with on-step, fraction of steps to screenshot (failed steps are always taken)")
+    group.addoption("--capture-format", choices=("png", "jpeg"), default="png",
+                    help="format screenshots are re-encoded to on the background pool (needs Pillow)")
+    group.addoption("--capture-quality", type=int, default=80, help="JPEG quality")
+    group.addoption("--capture-full-page", action="store_true", help="capture the full scrollable page")
+    group.addoption("--capture-threshold", type=int, default=4,
+                    help="max differing dHash bits for a screenshot to count as a repeat of the previous one")
+    group.addoption("--capture-workers", type=int, default=2, help="threads encoding screenshots")
+
+
+def pytest_configure(config):
+    if config.getoption("--capture-format") == "jpeg" and Image is None:
+        raise pytest.UsageError("--capture-format jpeg needs Pillow: pip install -r requirements.txt")
+    config._capture_policy = CapturePolicy(
+        mode=config.getoption("--capture-policy"),
+        sample_rate=config.getoption("--capture-sample"),
+        image_format=config.getoption("--capture-format"),
+        quality=config.getoption("--capture-quality"),
+        full_page=config.getoption("--capture-full-page"),
+        threshold=config.getoption("--capture-threshold"),
+        workers=config.getoption("--capture-workers"),
+    )
+    config._capture_totals = dict.fromkeys(TOTALS, 0)
+
+
+def pytest_unconfigure(config):
+    # Missing when pytest_configure refused the options
+    policy = getattr(config, "_capture_policy", None)
+    if policy:
+        policy.shutdown()
+
+
+# Runtest hooks rather than an autouse fixture, which would add a report container to every test
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    policy = item.config._capture_policy
+    if policy.enabled:
+        ScreenshotCapture.active = ScreenshotCapture(policy)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    capture = ScreenshotCapture.active
+    if capture is None:
+        return
+    ScreenshotCapture.active = None
+    stats = capture.finish()
+    if stats["taken"]:
+        for key in ("capture_ms", "bytes_saved"):
+            item.user_properties.append((key, round(stats[key])))
+        totals = item.config._capture_totals
+        for key in TOTALS:
+            totals[key] += stats[key]
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    # Right after the failing phase, before teardown closes the pages
+    if report.failed and report.when in ("setup", "call") and ScreenshotCapture.active:
+        ScreenshotCapture.active.on_failure()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    totals = getattr(node, "workeroutput", {}).get("capture_totals")
+    if totals:
+        for key, value in json.loads(totals).items():
+            node.config._capture_totals[key] += value
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if hasattr(config, "workeroutput"):
+        config.workeroutput["capture_totals"] = json.dumps(config._capture_totals)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    totals = config._capture_totals
+    if hasattr(config, "workerinput") or not totals["taken"]:
+        return
+    terminalreporter.section("screenshots")
+    terminalreporter.write_line(
+        f"{totals['taken']} taken, {totals['kept']} kept, {totals['dropped']} dropped as repeats; "
+        f"capture {totals['capture_ms'] / 1000:.2f}s, encoding {totals['encode_ms'] / 1000:.2f}s (background)")
+    terminalreporter.write_line(
+        f"{totals['raw_bytes'] / 1024:.0f} KiB captured, {totals['kept_bytes'] / 1024:.0f} KiB attached, "
+        f"{totals['bytes_saved'] / 1024:.0f} KiB saved")
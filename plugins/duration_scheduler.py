@@ -0,0 +1,175 @@
+import glob
+import json
+import os
+import re
+import statistics
+from collections import defaultdict
+
+import pytest
+from allure_commons.utils import md5
+from allure_pytest.utils import allure_full_name
+
+CACHE_KEY = "lpt/durations"
+NODE_CACHE_KEY = "lpt/nodeid_durations"
+GROUP_SUFFIX = re.compile(r"@lpt\d+$")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("lpt", "duration-aware scheduling")
+    group.addoption("--lpt", action="store_true",
+                    help="spread tests over xdist workers longest-first using durations from Allure history")
+    group.addoption("--lpt-history", default="allure-report/history/history.json",
+                    help="Allure history.json to read durations from")
+    group.addoption("--lpt-results", default="allure-results",
+                    help="allure-results directory to read durations from")
+    group.addoption("--lpt-default-ms", type=float, default=None,
+                    help="estimate for tests without history (default: median of known tests, or 1000)")
+
+
+def load_history_durations(history_path):
+    """historyId -> median duration (ms) of the runs kept in an Allure history.json."""
+    try:
+        with open(history_path, encoding="utf-8") as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    durations = {}
+    for history_id, entry in history.items():
+        values = [item["time"]["duration"] for item in entry.get("items", []) if "duration" in item.get("time", {})]
+        if values:
+            durations[history_id] = statistics.median(values)
+    return durations
+
+
+def load_results_durations(results_dir):
+    """historyId -> median duration (ms) of the *-result.json files in allure-results."""
+    samples = defaultdict(list)
+    for path in glob.glob(os.path.join(results_dir, "*-result.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+            samples[result["historyId"]].append(result["stop"] - result["start"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return {history_id: statistics.median(values) for history_id, values in samples.items()}
+
+
+def build_duration_cache(config):
+    """Merge history.json and allure-results into one compact historyId map, rebuilt only when they change."""
+    history_path = config.rootpath / config.getoption("--lpt-history")
+    results_dir = config.rootpath / config.getoption("--lpt-results")
+    sources = [str(history_path)] + glob.glob(os.path.join(results_dir, "*-result.json"))
+    stamp = max((os.path.getmtime(path) for path in sources if os.path.exists(path)), default=0)
+
+    cached = config.cache.get(CACHE_KEY, None)
+    if cached and cached.get("stamp") == stamp:
+        return cached["durations"]
+
+    durations = load_history_durations(history_path)
+    # Fresh results win over the history a report was generated from
+    durations.update(load_results_durations(results_dir))
+    config.cache.set(CACHE_KEY, {"stamp": stamp, "durations": durations})
+    return durations
+
+
+def history_id(item):
+    params = item.callspec.params if hasattr(item, "callspec") else {}
+    return md5(allure_full_name(item), *(params[name] for name in sorted(params)))
+
+
+def assign_longest_first(estimates, workers):
+    """Longest-processing-time-first: each test goes to the currently least loaded worker."""
+    loads = [0.0] * workers
+    assignment = {}
+    for nodeid, estimate in sorted(estimates.items(), key=lambda item: (-item[1], item[0])):
+        worker = min(range(workers), key=lambda index: (loads[index], index))
+        loads[worker] += estimate
+        assignment[nodeid] = worker
+    return assignment, loads
+
+
+class DurationScheduler:
+
+    def __init__(self, config):
+        self.config = config
+        self.predicted_loads = None
+        self.actual = defaultdict(float)
+        self.node_durations = dict(config.cache.get(NODE_CACHE_KEY, {}))
+        # The controlling process builds the cache before workers start; workers only read it
+        if hasattr(config, "workerinput"):
+            self.by_history = config.cache.get(CACHE_KEY, {}).get("durations", {})
+        else:
+            self.by_history = build_duration_cache(config)
+
+    def estimates(self, items):
+        by_history = self.by_history
+        estimates = {}
+        unknown = []
+        for item in items:
+            estimate = self.node_durations.get(item.nodeid, by_history.get(history_id(item)))
+            if estimate is None:
+                unknown.append(item.nodeid)
+            else:
+                estimates[item.nodeid] = estimate
+        default = self.config.getoption("--lpt-default-ms")
+        if default is None:
+            default = statistics.median(estimates.values()) if estimates else 1000.0
+        for nodeid in unknown:
+            estimates[nodeid] = default
+        return estimates
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(self, config, items):
+        workerinput = getattr(config, "workerinput", None)
+        workers = workerinput["workercount"] if workerinput else 1
+        assignment, self.predicted_loads = assign_longest_first(self.estimates(items), workers)
+        if workerinput:
+            for item in items:
+                if not item.get_closest_marker("xdist_group"):
+                    item.add_marker(pytest.mark.xdist_group(f"lpt{assignment[item.nodeid]}"))
+
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, "workeroutput") and self.predicted_loads is not None:
+            self.config.workeroutput["lpt_predicted_loads"] = json.dumps(self.predicted_loads)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        loads = getattr(node, "workeroutput", {}).get("lpt_predicted_loads")
+        if loads and self.predicted_loads is None:
+            self.predicted_loads = json.loads(loads)
+
+    def pytest_runtest_logreport(self, report):
+        if hasattr(self.config, "workerinput"):
+            return
+        node = getattr(report, "node", None)
+        worker = node.gateway.id if node is not None else "main"
+        duration_ms = report.duration * 1000
+        self.actual[worker] += duration_ms
+        nodeid = GROUP_SUFFIX.sub("", report.nodeid)
+        if report.when == "setup":
+            self.node_durations[nodeid] = duration_ms
+        else:
+            self.node_durations[nodeid] += duration_ms
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workerinput"):
+            return
+        self.config.cache.set(NODE_CACHE_KEY, self.node_durations)
+        if not self.predicted_loads or not self.actual:
+            return
+        terminalreporter.section("duration-aware scheduling")
+        terminalreporter.write_line(
+            f"predicted makespan: {max(self.predicted_loads) / 1000:.2f}s "
+            f"(per worker: {', '.join(f'{load / 1000:.2f}s' for load in self.predicted_loads)})")
+        terminalreporter.write_line(
+            f"actual makespan:    {max(self.actual.values()) / 1000:.2f}s "
+            f"(per worker: {', '.join(f'{worker}={load / 1000:.2f}s' for worker, load in sorted(self.actual.items()))})")
+
+
+def pytest_configure(config):
+    if not config.getoption("--lpt"):
+        return
+    if getattr(config.option, "dist", "no") in ("load", "loadscope", "loadfile"):
+        # LPT bins are shipped as xdist groups, which only loadgroup honours
+        config.option.dist = "loadgroup"
+    config.pluginmanager.register(DurationScheduler(config), "duration_scheduler")
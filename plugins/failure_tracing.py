@@ -0,0 +1,109 @@
+import json
+import re
+
+import allure
+import pytest
+
+from controller.base import BaseClass
+from controller.tracing import RollingTracer
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("tracing", "failure-triggered tracing")
+    group.addoption("--trace-on-failure", action="store_true",
+                    help="trace browser contexts in one chunk per controller step and keep the "
+                         "last chunks only for failed tests")
+    group.addoption("--trace-chunks", type=int, default=5,
+                    help="number of most recent step chunks kept per context (default: 5)")
+    group.addoption("--trace-dir", default="test-results/traces",
+                    help="where traces of failed tests are saved (default: test-results/traces)")
+    group.addoption("--trace-budget", type=float, default=5.0,
+                    help="allowed tracing overhead on passing tests, in percent of their duration")
+
+
+class TracingStats:
+    """Tracing time spent on passing tests against the time those tests took."""
+
+    def __init__(self):
+        self.passed = 0
+        self.overhead = 0.0
+        self.duration = 0.0
+        self.persisted = 0
+
+    def merge(self, other):
+        for key in ("passed", "overhead", "duration", "persisted"):
+            setattr(self, key, getattr(self, key) + other[key])
+
+    @property
+    def percent(self):
+        return 100 * self.overhead / self.duration if self.duration else 0.0
+
+
+def pytest_configure(config):
+    config._tracing_stats = TracingStats()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    if item.config.getoption("--trace-on-failure"):
+        BaseClass.trace_chunks = item.config.getoption("--trace-chunks")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    # A hook rather than an autouse fixture, which would add a report container to every test
+    yield
+    config = item.config
+    if not config.getoption("--trace-on-failure"):
+        return
+    BaseClass.trace_chunks = None
+    tracers = list(RollingTracer.active)
+    RollingTracer.active.clear()
+    if not tracers:
+        return
+
+    reports = [getattr(item, f"rep_{when}", None) for when in ("setup", "call")]
+    failed = any(report is not None and report.failed for report in reports)
+    stats = config._tracing_stats
+    for index, tracer in enumerate(tracers):
+        tracer.stop()
+        if failed:
+            target = config.rootpath / config.getoption("--trace-dir") / \
+                re.sub(r"[^\w.-]+", "_", item.nodeid) / f"context-{index}"
+            for path in tracer.persist(target):
+                allure.attach.file(str(path), name=f"trace context-{index} {path.stem}", extension="zip")
+                stats.persisted += 1
+        tracer.discard()
+
+    overhead = sum(tracer.overhead for tracer in tracers)
+    item.user_properties.append(("trace_overhead_ms", round(overhead * 1000)))
+    if not failed:
+        stats.passed += 1
+        stats.overhead += overhead
+        stats.duration += sum(report.duration for report in reports if report is not None)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    stats = getattr(node, "workeroutput", {}).get("tracing_stats")
+    if stats:
+        node.config._tracing_stats.merge(json.loads(stats))
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if hasattr(config, "workeroutput"):
+        config.workeroutput["tracing_stats"] = json.dumps(vars(config._tracing_stats))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    stats = config._tracing_stats
+    if hasattr(config, "workerinput") or not config.getoption("--trace-on-failure") or not stats.passed:
+        return
+    budget = config.getoption("--trace-budget")
+    terminalreporter.section("failure tracing")
+    terminalreporter.write_line(
+        f"overhead on {stats.passed} passing tests: {stats.overhead:.2f}s of {stats.duration:.2f}s "
+        f"({stats.percent:.1f}%, budget {budget:.1f}%)",
+        red=stats.percent > budget, green=stats.percent <= budget)
+    terminalreporter.write_line(f"trace chunks saved for failed tests: {stats.persisted}")
@@ -0,0 +1,42 @@
+import pytest
+
+from controller.async_base import AsyncBaseClass
+from controller.base import BaseClass
+from controller.har import HarSettings
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("har", "HAR record/replay")
+    group.addoption("--har-mode", choices=HarSettings.MODES, default="off",
+                    help="record traffic per test into HAR files, or replay it from them")
+    group.addoption("--har-dir", default="hars",
+                    help="directory holding the per-test HAR files (default: hars)")
+    group.addoption("--har-strict", action="store_true",
+                    help="in replay mode, abort requests that are not in the HAR instead of going live")
+    group.addoption("--har-url", default="**/rtqawww.securly.com/**",
+                    help="glob of the URLs recorded/replayed; anything else is left alone")
+
+
+def pytest_configure(config):
+    config._har_settings = HarSettings(
+        mode=config.getoption("--har-mode"),
+        directory=config.rootpath / config.getoption("--har-dir"),
+        strict=config.getoption("--har-strict"),
+        url=config.getoption("--har-url"),
+    )
+
+
+# Runtest hooks rather than an autouse fixture, which would add a report container to every test
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    har_settings = item.config._har_settings
+    if not har_settings.enabled:
+        return
+    har_settings.begin_test(item.nodeid)
+    BaseClass.har = AsyncBaseClass.har = har_settings
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    BaseClass.har = AsyncBaseClass.har = None
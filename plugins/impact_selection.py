@@ -0,0 +1,298 @@
+import ast
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from controller import locators
+
+# Maps recorded before tests also recorded the locators they resolve can't be trusted
+MAP_VERSION = 2
+# Changes here can affect any test, so they always trigger the full suite
+SHARED_FILES = (
+    "conftest.py",
+    "pytest.ini",
+    "requirements.txt",
+    "controller/base.py",
+    "controller/async_base.py",
+    "plugins/",
+)
+# Only calls into controller/ are recorded, so edits to any other first-party module
+# (bitwarden.py, standin/, reporting/, ...) can't be mapped to tests
+MAPPED_DIR = "controller/"
+XDIST_GROUP_SUFFIX = re.compile(r"@[^@\]]*$")
+HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("impact", "change-based test selection")
+    group.addoption("--impact-record", action="store_true",
+                    help="record which controller methods each test calls into the impact map")
+    group.addoption("--impact-select", action="store_true",
+                    help="only run tests whose recorded controller methods changed since the map was recorded")
+    group.addoption("--impact-map", default=".impact-map.json",
+                    help="path of the test -> controller method map (default: .impact-map.json)")
+    group.addoption("--impact-base", default=None,
+                    help="git ref to diff against (default: the commit the map was recorded at)")
+    group.addoption("--impact-max-age-days", type=float, default=14,
+                    help="treat a map older than this as stale and run the full suite")
+
+
+def git(root, *args):
+    return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True).stdout
+
+
+def function_ranges(source):
+    """(qualname, first_line, last_line) for every function, named the way co_qualname names them."""
+    ranges = []
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qualname = f"{prefix}{child.name}"
+                first = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                ranges.append((qualname, first, child.end_lineno))
+                visit(child, f"{qualname}.<locals>.")
+            elif isinstance(child, ast.ClassDef):
+                visit(child, f"{prefix}{child.name}.")
+
+    visit(ast.parse(source), "")
+    return ranges
+
+
+def locator_ranges(source):
+    """(key, first_line, last_line) of every selector declared in a ``LocatorRegistry(...)`` call.
+
+    Keys are ``locator:<registry>.<name>``, matching what ImpactRecorder records when a test
+    resolves that locator, so editing one selector only selects the tests that use it.
+    """
+    ranges = []
+    for node in ast.walk(ast.parse(source)):
+        if (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "LocatorRegistry"
+                and node.args and isinstance(node.args[0], ast.Constant)):
+            for keyword in node.keywords:
+                if keyword.arg:
+                    ranges.append((f"locator:{node.args[0].value}.{keyword.arg}", keyword.lineno, keyword.end_lineno))
+    return ranges
+
+
+def code_ranges(source):
+    return function_ranges(source) + locator_ranges(source)
+
+
+def touched(ranges, lines):
+    """Qualnames whose body contains a changed line; '*' when a change falls outside every function."""
+    names = set()
+    for line in lines:
+        hits = [name for name, first, last in ranges if first <= line <= last]
+        names.update(hits or ["*"])
+    return names
+
+
+def changed_lines(diff):
+    old_lines, new_lines = set(), set()
+    for line in diff.splitlines():
+        match = HUNK.match(line)
+        if not match:
+            continue
+        old_start, old_count, new_start, new_count = (
+            int(value) if value is not None else 1 for value in match.groups())
+        old_lines.update(range(old_start, old_start + old_count) if old_count else [old_start])
+        new_lines.update(range(new_start, new_start + new_count) if new_count else [new_start])
+    return old_lines, new_lines
+
+
+def is_test_module(path):
+    return path.startswith("tests/") and Path(path).name.startswith("test_")
+
+
+def unmapped_sources(files):
+    """Changed Python files outside controller/ that aren't test modules."""
+    return sorted(f for f in files
+                  if f.endswith(".py") and not f.startswith(MAPPED_DIR) and not is_test_module(f))
+
+
+def changed_methods(root, base, path):
+    """Keys ('controller/x.py::Class.method') of methods added, removed or edited since `base`."""
+    old_lines, new_lines = changed_lines(git(root, "diff", "-U0", base, "--", path))
+    names = set()
+    try:
+        names |= touched(code_ranges(git(root, "show", f"{base}:{path}")), old_lines)
+    except subprocess.CalledProcessError:
+        names.add("*")  # file is new since base
+    current = root / path
+    if current.exists():
+        names |= touched(code_ranges(current.read_text(encoding="utf-8")), new_lines)
+    return {f"{path}::{name}" for name in names}
+
+
+class ImpactRecorder:
+    """Profiles calls into controller/ while each test runs, and the locators it resolves."""
+
+    def __init__(self, root):
+        self.controller_dir = str(root / "controller")
+        self.root = root
+        self.current = None
+        self.calls = {}
+        self._code_keys = {}
+        self.locators_path = Path(locators.__file__).resolve().relative_to(root.resolve()).as_posix()
+        locators.resolve_listeners.append(self._resolved)
+
+    def _resolved(self, registry, name):
+        if self.current is not None:
+            self.current.add(f"{self.locators_path}::locator:{registry}.{name}")
+
+    def _profile(self, frame, event, arg):
+        if event != "call" or self.current is None:
+            return
+        code = frame.f_code
+        key = self._code_keys.get(code)
+        if key is None:
+            if not code.co_filename.startswith(self.controller_dir):
+                self._code_keys[code] = False
+                return
+            path = Path(code.co_filename).relative_to(self.root).as_posix()
+            key = self._code_keys[code] = f"{path}::{code.co_qualname}"
+        if key:
+            self.current.add(key)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self.current = self.calls.setdefault(XDIST_GROUP_SUFFIX.sub("", item.nodeid), set())
+        sys.setprofile(self._profile)
+        threading.setprofile(self._profile)
+        try:
+            yield
+        finally:
+            sys.setprofile(None)
+            threading.setprofile(None)
+            self.current = None
+
+    def pytest_sessionfinish(self, session):
+        config = session.config
+        recorded = {nodeid: sorted(keys) for nodeid, keys in self.calls.items()}
+        if hasattr(config, "workeroutput"):
+            config.workeroutput["impact_calls"] = json.dumps(recorded)
+        else:
+            save_map(config, recorded)
+
+
+def load_map(config):
+    try:
+        with open(config.rootpath / config.getoption("--impact-map"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_map(config, recorded):
+    impact_map = load_map(config)
+    if not impact_map or impact_map.get("version") != MAP_VERSION:
+        impact_map = {"tests": {}}
+    impact_map["tests"].update(recorded)
+    impact_map["version"] = MAP_VERSION
+    impact_map["commit"] = git(config.rootpath, "rev-parse", "HEAD").strip()
+    impact_map["recorded_at"] = time.time()
+    with open(config.rootpath / config.getoption("--impact-map"), "w", encoding="utf-8") as f:
+        json.dump(impact_map, f, indent=1, sort_keys=True)
+
+
+class ImpactSelector:
+
+    def __init__(self, config):
+        self.config = config
+        self.summary = None
+
+    def full_suite(self, reason):
+        self.summary = f"running the full suite: {reason}"
+
+    def changed_files(self, root, base):
+        files = set(git(root, "diff", "--name-only", base).split())
+        files |= set(git(root, "ls-files", "--others", "--exclude-standard").split())
+        return files
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_collection_modifyitems(self, config, items):
+        # Select before any other plugin (e.g. --lpt) plans around the collected items
+        self.select(config, items)
+        yield
+
+    def select(self, config, items):
+        impact_map = load_map(config)
+        if not impact_map or not impact_map.get("tests"):
+            return self.full_suite("no impact map recorded yet")
+        if impact_map.get("version") != MAP_VERSION:
+            return self.full_suite("impact map predates locator tracking; record it again")
+        age_days = (time.time() - impact_map.get("recorded_at", 0)) / 86400
+        if age_days > config.getoption("--impact-max-age-days"):
+            return self.full_suite(f"impact map is {age_days:.0f} days old")
+
+        root = config.rootpath
+        base = config.getoption("--impact-base") or impact_map.get("commit")
+        try:
+            files = self.changed_files(root, base)
+        except (subprocess.CalledProcessError, OSError, TypeError):
+            return self.full_suite(f"cannot diff against {base!r}")
+
+        shared = sorted(f for f in files if f.startswith(SHARED_FILES))
+        if shared:
+            return self.full_suite(f"shared files changed ({', '.join(shared)})")
+        unmapped = unmapped_sources(files)
+        if unmapped:
+            return self.full_suite(f"sources outside {MAPPED_DIR} changed ({', '.join(unmapped)})")
+
+        methods = set()
+        for path in sorted(f for f in files if f.startswith(MAPPED_DIR) and f.endswith(".py")):
+            methods |= changed_methods(root, base, path)
+        changed_modules = {key.split("::")[0] for key in methods if key.endswith("::*")}
+
+        selected, deselected = [], []
+        for item in items:
+            recorded = impact_map["tests"].get(item.nodeid)
+            test_file = item.nodeid.split("::")[0]
+            if (recorded is None
+                    or test_file in files
+                    or methods.intersection(recorded)
+                    or any(key.split("::")[0] in changed_modules for key in recorded)):
+                selected.append(item)
+            else:
+                deselected.append(item)
+
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+        self.summary = (f"selected {len(selected)} of {len(selected) + len(deselected)} tests "
+                        f"from changes since {base[:10]} ({len(methods)} controller methods and locators changed)")
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.summary and not hasattr(self.config, "workerinput"):
+            terminalreporter.write_line(f"impact: {self.summary}")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    calls = getattr(node, "workeroutput", {}).get("impact_calls")
+    if calls:
+        node.config._impact_calls.update(json.loads(calls))
+
+
+def pytest_configure(config):
+    if config.getoption("--impact-select"):
+        config.pluginmanager.register(ImpactSelector(config), "impact_selector")
+    if config.getoption("--impact-record"):
+        if getattr(config.option, "dist", "no") != "no" and not hasattr(config, "workerinput"):
+            # Workers record; the controlling process merges what they send back
+            config._impact_calls = {}
+        else:
+            config.pluginmanager.register(ImpactRecorder(config.rootpath), "impact_recorder")
+
+
+def pytest_unconfigure(config):
+    calls = getattr(config, "_impact_calls", None)
+    if calls:
+        save_map(config, calls)
@@ -0,0 +1,188 @@
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+
+import allure
+import pytest
+
+logger = logging.getLogger()
+
+# Filled in around each test so records carry it without any work at the call site
+log_context = {"nodeid": "", "worker": os.environ.get("PYTEST_XDIST_WORKER", "master")}
+
+
+def pytest_addoption(parser):
+    parser.addini("allure_log_on", default="failure",
+                  help="Attach the captured log to Allure on 'failure' (failed/errored tests) or 'always'")
+    parser.addini("allure_log_capacity", default="2000",
+                  help="Maximum number of log records kept per test; older records are dropped")
+    parser.addini("allure_log_levels", type="linelist", default=[],
+                  help="Per-logger minimum levels for the Allure log, one 'logger=LEVEL' per line")
+    parser.addini("log_root_level", default="DEBUG",
+                  help="Level of the root logger while the suite runs")
+    parser.addini("log_queue_size", default="10000",
+                  help="Records buffered between test threads and the log listener before new ones are dropped")
+    parser.addini("log_pipeline_file", default="",
+                  help="Optional file the log listener writes every record to")
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread, counting the ones a full queue drops."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the arguments now, as QueueHandler.prepare does: the test may change a mutable
+        # argument before the listener gets to it. Full formatting is still left to the listener.
+        record.msg = record.getMessage()
+        record.args = None
+        record.nodeid = log_context["nodeid"]
+        record.worker = log_context["worker"]
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AllureLogBuffer(logging.Handler):
+    """Keeps the last N records of each test in memory and writes them as one Allure attachment."""
+
+    def __init__(self, capacity=2000, levels=None):
+        super().__init__(level=logging.DEBUG)
+        self.capacity = capacity
+        self.buffers = {}
+        self.dropped = collections.Counter()
+        # Longest logger name first so "playwright._impl" wins over "playwright"
+        self.levels = sorted((levels or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+
+    def filter(self, record):
+        for name, level in self.levels:
+            if record.name == name or record.name.startswith(name + "."):
+                return record.levelno >= level
+        return True
+
+    def emit(self, record):
+        nodeid = getattr(record, "nodeid", "")
+        if not nodeid:
+            return
+        records = self.buffers.get(nodeid)
+        if records is None:
+            records = self.buffers[nodeid] = collections.deque(maxlen=self.capacity)
+        if len(records) == self.capacity:
+            self.dropped[nodeid] += 1
+        records.append(record)
+
+    def pop(self, nodeid):
+        """Render and forget the records of one test; returns '' when nothing was logged."""
+        records = self.buffers.pop(nodeid, ())
+        dropped = self.dropped.pop(nodeid, 0)
+        lines = [self.format(record) for record in records]
+        if dropped:
+            lines.insert(0, f"... {dropped} earlier records dropped (allure_log_capacity={self.capacity})")
+        return "\n".join(lines)
+
+
+class LogPipeline:
+    """Routes every record through a bounded queue to a background QueueListener."""
+
+    def __init__(self, config):
+        self.queue = queue.Queue(maxsize=int(config.getini("log_queue_size")))
+        self.queue_handler = ContextQueueHandler(self.queue)
+        self.allure_buffer = AllureLogBuffer(
+            capacity=int(config.getini("allure_log_capacity")),
+            levels=parse_log_levels(config.getini("allure_log_levels")),
+        )
+        handlers = [self.allure_buffer]
+        log_file = config.getini("log_pipeline_file")
+        if log_file:
+            file_handler = logging.FileHandler(log_file, encoding="utf-8")
+            file_handler.setFormatter(logging.Formatter(
+                "%(asctime)s - %(worker)s - %(levelname)s - %(name)s - %(nodeid)s - %(message)s"))
+            handlers.append(file_handler)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.root_level = config.getini("log_root_level").upper()
+
+    def start(self):
+        logger.setLevel(self.root_level)
+        logger.addHandler(self.queue_handler)
+        self.listener.start()
+
+    def flush(self):
+        """Block until the listener has handled everything queued so far."""
+        self.queue.join()
+
+    def stop(self):
+        logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+    @property
+    def dropped(self):
+        return self.queue_handler.dropped
+
+
+def parse_log_levels(lines):
+    levels = {}
+    for line in lines:
+        name, _, level = line.partition("=")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def pytest_configure(config):
+    config._log_pipeline = LogPipeline(config)
+    config._log_pipeline.start()
+
+
+def pytest_unconfigure(config):
+    pipeline = getattr(config, "_log_pipeline", None)
+    if pipeline:
+        pipeline.stop()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    # A hook rather than an autouse fixture, which would add a report container to every test
+    # and put the log in that fixture's teardown step instead of on the test result
+    outcome = yield
+    report = outcome.get_result()
+    if report.when == "teardown":
+        attach_log(item, report)
+
+
+def attach_log(item, teardown_report):
+    """Attach the test's buffered log to its Allure result when it failed, or always with allure_log_on=always."""
+    pipeline = item.config._log_pipeline
+    pipeline.flush()
+    log_text = pipeline.allure_buffer.pop(item.nodeid)
+    reports = [getattr(item, f"rep_{when}", None) for when in ("setup", "call")] + [teardown_report]
+    failed = any(report is not None and report.failed for report in reports)
+    if log_text and (failed or item.config.getini("allure_log_on") == "always"):
+        allure.attach(log_text, name="log", attachment_type=allure.attachment_type.TEXT)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    log_context["nodeid"] = item.nodeid
+    yield
+    log_context["nodeid"] = ""
+    # Drop whatever later teardowns logged after the attachment was written
+    item.config._log_pipeline.flush()
+    item.config._log_pipeline.allure_buffer.pop(item.nodeid)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    pipeline = getattr(config, "_log_pipeline", None)
+    if pipeline and pipeline.dropped:
+        terminalreporter.write_line(
+            f"log pipeline: {pipeline.dropped} records dropped because the queue was full "
+            f"(log_queue_size={pipeline.queue.maxsize})", yellow=True)
@@ -0,0 +1,53 @@
+import logging
+
+import pytest
+
+from controller.async_base import AsyncBaseClass
+from controller.base import BaseClass
+from controller.network_policy import NetworkPolicy
+
+logger = logging.getLogger(__name__)
+
+
+def pytest_addoption(parser):
+    parser.addini("network_block_resource_types", type="args", default=[],
+                  help="Resource types aborted in every browser context (e.g. image font media)")
+    parser.addini("network_block_urls", type="linelist", default=[],
+                  help="URL globs aborted in every browser context")
+    parser.addini("network_allow_urls", type="linelist", default=[],
+                  help="If set, only URLs matching these globs are allowed (allowlist mode)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "network_policy(enabled=True, block_resource_types=..., block_urls=..., allow_urls=...): "
+        "override the network policy for one test")
+
+
+# Runtest hooks rather than an autouse fixture, which would add a report container to every test
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    config = item.config
+    policy = NetworkPolicy(
+        block_resource_types=config.getini("network_block_resource_types"),
+        block_urls=config.getini("network_block_urls"),
+        allow_urls=config.getini("network_allow_urls"),
+    )
+    marker = item.get_closest_marker("network_policy")
+    if marker:
+        policy = policy.copy(**marker.kwargs)
+    BaseClass.network_policy = AsyncBaseClass.network_policy = policy
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    policy = BaseClass.network_policy
+    BaseClass.network_policy = AsyncBaseClass.network_policy = None
+    if policy is None:
+        return
+    stats = policy.stats()
+    if stats["requests"]:
+        item.user_properties.append(("network_policy", stats))
+        logger.info("Network policy for %s: %s", item.nodeid, stats)
@@ -0,0 +1,66 @@
+import pytest
+
+from controller.async_base import AsyncBaseClass, AsyncBrowserPool
+from controller.base import BaseClass, BrowserPool
+from controller.profiles import ENV_VAR, PROFILES, get_profile
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("execution profile", "engine, headless mode and launch flags")
+    group.addoption("--profile", choices=sorted(PROFILES), default=None,
+                    help=f"execution profile for every controller (default: ${ENV_VAR}, else local)")
+    group.addoption("--profile-pool-size", type=int, default=None,
+                    help="browsers kept per engine, overriding the profile")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    try:
+        profile = get_profile(config.getoption("--profile"))
+    except ValueError as e:
+        raise pytest.UsageError(str(e))
+    overrides = {}
+    # pytest-playwright's own options, when given, refine the profile rather than being ignored
+    if config.getoption("--browser", default=None):
+        overrides["engines"] = config.getoption("--browser")
+    if config.getoption("--headed", default=False):
+        overrides["mode"] = "headed"
+    if config.getoption("--slowmo", default=0):
+        overrides["slow_mo"] = config.getoption("--slowmo")
+    if config.getoption("--profile-pool-size"):
+        overrides["pool_size"] = config.getoption("--profile-pool-size")
+    if overrides:
+        profile = profile.copy(**overrides)
+    # xdist workers run this too, with the same options and environment
+    BrowserPool.profile = AsyncBrowserPool.profile = profile
+    config._execution_profile = profile
+    # Only a multi-engine profile needs the per-test fixture; otherwise it would just add a
+    # report container to every test
+    if len(profile.engines) > 1:
+        config.pluginmanager.register(EngineMatrix(), "profile-engines")
+
+
+def pytest_report_header(config):
+    return f"execution profile: {config._execution_profile.describe()}"
+
+
+def drives_browsers(cls):
+    return cls is not None and any(isinstance(value, (BaseClass, AsyncBaseClass)) for value in vars(cls).values())
+
+
+def pytest_generate_tests(metafunc):
+    engines = metafunc.config._execution_profile.engines
+    # Only tests of classes holding a controller run once per engine
+    if len(engines) > 1 and "profile_engine" in metafunc.fixturenames and drives_browsers(metafunc.cls):
+        metafunc.parametrize("profile_engine", engines)
+
+
+class EngineMatrix:
+    """Runs the tests of browser-driving classes once per engine of the profile."""
+
+    @pytest.fixture(autouse=True)
+    def profile_engine(self, request):
+        engine = getattr(request, "param", None)
+        BaseClass.engine = AsyncBaseClass.engine = engine
+        yield engine
+        BaseClass.engine = AsyncBaseClass.engine = None
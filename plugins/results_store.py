@@ -0,0 +1,60 @@
+import shutil
+from pathlib import Path
+
+import allure_commons
+import pytest
+from allure_commons.logger import AllureFileLogger
+from allure_pytest.listener import AllureListener
+
+from reporting.results_store import ResultsStore
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("results store", "compact Allure results")
+    group.addoption("--allure-store", default=None,
+                    help="write Allure results to one NDJSON file per worker in this directory instead of "
+                         "one file per result; export with python -m reporting.results_store")
+    group.addoption("--allure-store-inline-kb", type=int, default=16,
+                    help="attachments up to this size are kept inline, larger ones as deduplicated blobs")
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    directory = config.getoption("--allure-store")
+    if not directory or config.option.collectonly:
+        return
+    directory = Path(directory).absolute()
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is None and config.option.clean_alluredir and directory.is_dir():
+        shutil.rmtree(directory)
+
+    # The store replaces allure's per-file writer; the listener still builds the results
+    for plugin in allure_commons.plugin_manager.get_plugins():
+        if isinstance(plugin, AllureFileLogger):
+            allure_commons.plugin_manager.unregister(plugin)
+    if not config.pluginmanager.has_plugin("allure_listener"):
+        listener = AllureListener(config)
+        config.pluginmanager.register(listener, "allure_listener")
+        allure_commons.plugin_manager.register(listener)
+        config.add_cleanup(lambda: allure_commons.plugin_manager.unregister(listener))
+
+    store = ResultsStore(directory, worker=workerinput["workerid"] if workerinput else "main",
+                         inline_limit=config.getoption("--allure-store-inline-kb") * 1024)
+    allure_commons.plugin_manager.register(store)
+    config._results_store = store
+
+    def close():
+        allure_commons.plugin_manager.unregister(store)
+        store.close()
+    config.add_cleanup(close)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    store = getattr(config, "_results_store", None)
+    if store is None or hasattr(config, "workerinput"):
+        return
+    terminalreporter.section("results store")
+    terminalreporter.write_line(f"results in {store.directory} (export with: python -m reporting.results_store "
+                                f"{store.directory} allure-results)")
+    if store.blobs_written or store.blobs_reused:
+        terminalreporter.write_line(f"blobs written: {store.blobs_written}, reused: {store.blobs_reused}")
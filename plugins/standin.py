@@ -0,0 +1,50 @@
+import pytest
+
+from controller.OnCallFunctions import OnCallFunctions
+from controller.login_cache import LoginCache
+from standin.server import StandinServer, StandinSettings
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("standin", "local OnCall/Aware stand-in server")
+    group.addoption("--standin-records", type=int, default=50,
+                    help="queue records on the stand-in dashboard (default: 50)")
+    group.addoption("--standin-activities", type=int, default=20,
+                    help="add-activity buttons on the stand-in history page (default: 20)")
+    group.addoption("--standin-latency-ms", type=float, default=0.0,
+                    help="delay added to every stand-in response")
+    group.addoption("--standin-jitter-ms", type=float, default=0.0,
+                    help="random extra delay of up to this many ms per response")
+    group.addoption("--standin-error-rate", type=float, default=0.0,
+                    help="fraction of stand-in responses replaced by an error (0-1)")
+    group.addoption("--standin-error-status", type=int, default=500,
+                    help="HTTP status of injected errors (default: 500)")
+    group.addoption("--standin-error-paths", default="*",
+                    help="comma separated path globs eligible for error injection (default: all)")
+    group.addoption("--standin-seed", type=int, default=None,
+                    help="seed for jitter and error injection, to make runs repeatable")
+
+
+@pytest.fixture(scope="session")
+def standin_server(pytestconfig):
+    settings = StandinSettings(
+        records=pytestconfig.getoption("--standin-records"),
+        activities=pytestconfig.getoption("--standin-activities"),
+        latency_ms=pytestconfig.getoption("--standin-latency-ms"),
+        jitter_ms=pytestconfig.getoption("--standin-jitter-ms"),
+        error_rate=pytestconfig.getoption("--standin-error-rate"),
+        error_status=pytestconfig.getoption("--standin-error-status"),
+        error_paths=[glob.strip() for glob in pytestconfig.getoption("--standin-error-paths").split(",") if glob.strip()],
+        seed=pytestconfig.getoption("--standin-seed"),
+    )
+    with StandinServer(settings) as server:
+        yield server
+
+
+@pytest.fixture
+def standin_oncall(standin_server, tmp_path):
+    """OnCallFunctions logging in to the stand-in, with a login cache private to the test."""
+    oncall = standin_server.point(OnCallFunctions())
+    oncall.login_cache = LoginCache(tmp_path / "auth")
+    yield oncall
+    oncall.close_all()
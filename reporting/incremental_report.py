@@ -0,0 +1,672 @@
+"""Incremental Allure report builder.
+
+Instead of regenerating the whole report, only results that are new since the last
+build are turned into ``data/test-cases`` files. Every other report file (the
+suites, behaviors, packages, categories and timeline trees, their CSV exports, the
+widgets, trends and export/ metrics) is rewritten from a small index kept in
+``<report>/.incremental/index.json`` (latest case per historyId, the result files
+and UUIDs of the retained launches, per-launch statistics), so a build costs as much
+as the run it adds rather than the history behind it::
+
+    python -m reporting.incremental_report allure-results allure-report --retention 20
+
+The first build into a report made by ``allure generate`` seeds the index from that
+report's cases and trend files. The source may also be a results store written with
+--allure-store. The report's static files (index.html, app.js, plugins) are taken
+from an existing report.
+"""
+import argparse
+import base64
+import csv
+import glob
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from reporting.results_store import BLOBS
+
+STATUSES = ("failed", "broken", "skipped", "passed", "unknown")
+CATEGORIES = {"failed": "Product defects", "broken": "Test defects"}
+INDEX = ".incremental/index.json"
+# Bumped when the index layout changes; an index of another version is rebuilt from the report
+INDEX_VERSION = 3
+# What a leaf looks like in the data/*.json trees
+NODE_KEYS = ("name", "uid", "status", "time", "flaky", "newFailed", "newPassed", "newBroken",
+             "retriesCount", "retriesStatusChange", "parameters", "tags")
+SUITE_LABELS = ("parentSuite", "suite", "subSuite")
+BEHAVIOR_LABELS = ("epic", "feature", "story")
+
+
+def md5(*parts):
+    return hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def statistic(statuses=()):
+    counts = dict.fromkeys(STATUSES, 0)
+    for status in statuses:
+        counts[status if status in counts else "unknown"] += 1
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+def span(item):
+    start, stop = item.get("start", 0), item.get("stop", item.get("start", 0))
+    return {"start": start, "stop": stop, "duration": stop - start}
+
+
+def first(leaf, name, default=""):
+    values = leaf["labels"].get(name)
+    return values[0] if values else default
+
+
+def suites(leaf):
+    return [[first(leaf, name) for name in SUITE_LABELS if first(leaf, name)]]
+
+
+def behaviors(leaf):
+    """One [epic, feature, story] per combination of the test's labels ("" where missing)."""
+    return [list(combination) for combination in
+            itertools.product(*(leaf["labels"].get(name) or [""] for name in BEHAVIOR_LABELS))]
+
+
+def java_date(millis):
+    # Allure's CSV exports print dates the way java.util.Date.toString does
+    return time.strftime("%a %b %d %H:%M:%S %Z %Y", time.localtime(millis / 1000))
+
+
+class ResultsSource:
+    """New results, containers and attachments from an allure-results directory or a results store."""
+
+    def __init__(self, path, index, order):
+        self.path = Path(path)
+        self.is_store = bool(glob.glob(str(self.path / "*.ndjson")))
+        self.results = []
+        self.containers = []
+        self.inline = {}
+        self.environment = None
+        self.executors = None
+        if self.is_store:
+            self._read_store(index.setdefault("store_offsets", {}))
+        else:
+            self._read_directory(index.setdefault("files", {}), order, index.get("horizon", 0))
+
+    def _read_directory(self, seen, order, horizon):
+        """Read the files not seen before; ``seen`` maps each file read to the launch that read it.
+
+        Files no newer than ``horizon`` belong to launches past the retention and are left alone.
+        """
+        present = set()
+        for kind, pattern in (("results", "*-result.json"), ("containers", "*-container.json")):
+            for path in sorted(self.path.glob(pattern)):
+                present.add(path.name)
+                if path.name in seen:
+                    continue
+                try:
+                    if path.stat().st_mtime <= horizon:
+                        continue
+                except OSError:
+                    continue
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        getattr(self, kind).append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+                seen[path.name] = order
+        # Files deleted from the results directory can't be read again
+        for name in seen.keys() - present:
+            del seen[name]
+        try:
+            with open(self.path / "environment.properties", encoding="utf-8") as f:
+                pairs = [line.split("=", 1) for line in f.read().splitlines()
+                         if "=" in line and not line.lstrip().startswith(("#", "!"))]
+            self.environment = [{"name": key.strip(), "values": [value.strip()]} for key, value in pairs]
+        except OSError:
+            pass
+        try:
+            with open(self.path / "executor.json", encoding="utf-8") as f:
+                self.executors = [json.load(f)]
+        except (OSError, ValueError):
+            pass
+
+    def _read_store(self, offsets):
+        paths = sorted(self.path.glob("*.ndjson"))
+        for name in offsets.keys() - {path.name for path in paths}:
+            del offsets[name]
+        for path in paths:
+            with open(path, "rb") as f:
+                f.seek(offsets.get(path.name, 0))
+                for line in iter(f.readline, b""):
+                    if not line.endswith(b"\n"):
+                        break  # still being written; picked up next time
+                    offsets[path.name] = f.tell()
+                    entry = json.loads(line)
+                    if entry["kind"] == "result":
+                        self.results.append(entry["data"])
+                    elif entry["kind"] == "container":
+                        self.containers.append(entry["data"])
+                    elif entry["kind"] == "attachment":
+                        self.inline[entry["file"]] = entry
+
+    def copy_attachment(self, source, destination):
+        if not self.is_store:
+            origin = self.path / source
+            if origin.exists():
+                shutil.copy2(origin, destination)
+            return
+        entry = self.inline.get(source)
+        if entry is None:
+            return
+        if "blob" in entry:
+            shutil.copy2(self.path / BLOBS / entry["blob"][:2] / entry["blob"], destination)
+        else:
+            destination.write_bytes(base64.b64decode(entry["b64"]))
+
+
+class IncrementalReport:
+
+    def __init__(self, report_dir, retention=20, report_name="Allure Report"):
+        self.report_dir = Path(report_dir)
+        self.retention = retention
+        self.report_name = report_name
+        self.data_dir = self.report_dir / "data"
+        self.index_path = self.report_dir / INDEX
+        self.history = self._read_json("history/history.json", {})
+        self.index = self._read_json(INDEX, {})
+        # Test-case files no case or history entry refers to any more, deleted after the build
+        self.evicted = set()
+        if self.index.get("version") == 2:
+            self._migrate()
+        if self.index.get("version") != INDEX_VERSION:
+            self.index = {"version": INDEX_VERSION, "processed": {}, "cases": {}, "launches": [],
+                          "environment": [], "executors": [], "horizon": 0}
+            self._seed()
+            # The generated report may hold cases nothing refers to; sweep them once, on the first prune
+            self.index["sweep"] = True
+
+    def _migrate(self):
+        """Version 2 kept every processed UUID and file forever; date them to the latest launch so they expire."""
+        latest = self.index["launches"][0]["order"] if self.index["launches"] else 0
+        for key in ("processed", "files"):
+            if key in self.index:
+                self.index[key] = dict.fromkeys(self.index[key], latest)
+        self.index["horizon"] = 0
+        self.index["version"] = INDEX_VERSION
+
+    def _read_json(self, relative, default):
+        try:
+            with open(self.report_dir / relative, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def _write_json(self, relative, data):
+        path = self.report_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _write_text(self, relative, text):
+        path = self.report_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def _write_csv(self, relative, header, rows):
+        path = self.report_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(header)
+            writer.writerows(rows)
+        os.replace(tmp, path)
+
+    # --- seeding from a generated report ---------------------------------
+
+    def _seed(self):
+        """Take over the cases and trends of a report built by ``allure generate`` (or an older index)."""
+        trends = {name: self._read_json(f"history/{name}.json", [])
+                  for name in ("history-trend", "duration-trend", "categories-trend", "retry-trend")}
+        launches = []
+        for position, entry in enumerate(trends["history-trend"][:self.retention]):
+            def data(name, default):
+                entries = trends[name]
+                return entries[position].get("data", default) if position < len(entries) else default
+            retry = data("retry-trend", {})
+            launches.append({
+                "order": entry.get("buildOrder") or len(trends["history-trend"]) - position,
+                "statistic": statistic() | entry.get("data", {}),
+                "duration": data("duration-trend", {}).get("duration", 0),
+                "categories": data("categories-trend", {}),
+                "retry": retry.get("retry", 0),
+            })
+        self.index["launches"] = launches
+        latest = launches[0]["order"] if launches else 0
+
+        tree = self._read_json("data/suites.json", {})
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if "children" in node:
+                stack.extend(node["children"])
+                continue
+            if "uid" not in node:
+                continue
+            case = self._read_json(f"data/test-cases/{node['uid']}.json", None)
+            if case is None:
+                continue
+            history_id = case.get("historyId") or md5(case.get("fullName", ""))
+            self.index["cases"][history_id] = dict(self._leaf(case), launch=latest)
+        self.index["environment"] = self._read_json("widgets/environment.json", [])
+        self.index["executors"] = self._read_json("widgets/executors.json", [])
+
+    # --- test cases -------------------------------------------------------
+
+    def _attachments(self, source, attachments):
+        converted = []
+        for attachment in attachments or ():
+            destination = self.data_dir / "attachments" / attachment["source"]
+            if not destination.exists():
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                source.copy_attachment(attachment["source"], destination)
+            converted.append({
+                "uid": md5(attachment["source"])[:16],
+                "name": attachment.get("name", attachment["source"]),
+                "source": attachment["source"],
+                "type": attachment.get("type", "text/plain"),
+                "size": destination.stat().st_size if destination.exists() else 0,
+            })
+        return converted
+
+    def _stage(self, source, item):
+        steps = [self._stage(source, step) for step in item.get("steps") or ()]
+        attachments = self._attachments(source, item.get("attachments"))
+        details = item.get("statusDetails") or {}
+        stage = {
+            "name": item.get("name", ""),
+            "time": span(item),
+            "status": item.get("status", "unknown"),
+            "steps": steps,
+            "attachments": attachments,
+            "parameters": item.get("parameters") or [],
+            "stepsCount": len(steps) + sum(step["stepsCount"] for step in steps),
+            "attachmentsCount": len(attachments) + sum(step["attachmentsCount"] for step in steps),
+            "hasContent": bool(steps or attachments or details.get("message")),
+            "attachmentStep": False,
+            "shouldDisplayMessage": bool(details.get("message")),
+        }
+        if details.get("message"):
+            stage["statusMessage"] = details["message"]
+        return stage
+
+    def _test_case(self, source, result, uid, fixtures, previous):
+        labels = result.get("labels") or []
+        details = result.get("statusDetails") or {}
+        status = result.get("status", "unknown")
+        history_entry = self.history.get(result.get("historyId"), {})
+        before = [self._stage(source, fixture) for container in fixtures for fixture in container.get("befores") or ()]
+        after = [self._stage(source, fixture) for container in fixtures for fixture in container.get("afters") or ()]
+        tags = sorted({label["value"] for label in labels if label["name"] == "tag"})
+        severity = next((label["value"] for label in labels if label["name"] == "severity"), "normal")
+        case = {
+            "uid": uid,
+            "name": result.get("name", ""),
+            "fullName": result.get("fullName", ""),
+            "historyId": result.get("historyId", ""),
+            "time": span(result),
+            "status": status,
+            "statusMessage": details.get("message", ""),
+            "statusTrace": details.get("trace", ""),
+            "flaky": bool(details.get("flaky")),
+            "newFailed": status == "failed" and previous not in (None, "failed"),
+            "newBroken": status == "broken" and previous not in (None, "broken"),
+            "newPassed": status == "passed" and previous not in (None, "passed"),
+            "retriesCount": 0,
+            "retriesStatusChange": False,
+            "beforeStages": before,
+            "testStage": self._stage(source, result),
+            "afterStages": after,
+            "labels": labels,
+            "parameters": result.get("parameters") or [],
+            "links": result.get("links") or [],
+            "hidden": False,
+            "retry": False,
+            "extra": {
+                "severity": severity,
+                "retries": [],
+                "categories": [{"name": CATEGORIES[status]}] if status in CATEGORIES else [],
+                "tags": tags,
+                "history": history_entry,
+            },
+            "source": f"{uid}.json",
+            "parameterValues": [parameter.get("value", "") for parameter in result.get("parameters") or []],
+        }
+        if result.get("description"):
+            case["description"] = result["description"]
+        return case
+
+    @staticmethod
+    def _leaf(case):
+        """What the aggregates need of a case; works for our cases and ones written by ``allure generate``."""
+        labels = {}
+        for label in case.get("labels") or ():
+            labels.setdefault(label["name"], []).append(label["value"])
+        extra = case.get("extra") or {}
+        return {
+            "name": case.get("name", ""),
+            "uid": case["uid"],
+            "status": case.get("status", "unknown"),
+            "time": case.get("time") or span({}),
+            "flaky": case.get("flaky", False),
+            "newFailed": case.get("newFailed", False),
+            "newPassed": case.get("newPassed", False),
+            "newBroken": case.get("newBroken", False),
+            "retriesCount": case.get("retriesCount", 0),
+            "retriesStatusChange": case.get("retriesStatusChange", False),
+            "parameters": case.get("parameterValues") or [],
+            "tags": extra.get("tags") or [],
+            "severity": extra.get("severity", "normal"),
+            "labels": labels,
+            "statusMessage": case.get("statusMessage") or "",
+            "description": case.get("description") or "",
+            "categories": [category["name"] for category in extra.get("categories") or ()],
+            "retries": [retry["uid"] for retry in extra.get("retries") or () if "uid" in retry],
+        }
+
+    # --- history ----------------------------------------------------------
+
+    def _add_history(self, history_id, case):
+        entry = self.history.setdefault(history_id, {"statistic": statistic(), "items": []})
+        entry["items"].insert(0, {"uid": case["uid"], "status": case["status"], "time": case["time"]})
+        self.evicted.update(item["uid"] for item in entry["items"][self.retention:])
+        del entry["items"][self.retention:]
+        entry["statistic"] = statistic(item["status"] for item in entry["items"])
+
+    def _expire(self, order, source):
+        """Forget what fell out of the last ``retention`` launches.
+
+        That is tests that have not run since (deleted or renamed) and the UUIDs and result
+        files of those launches. The horizon moves past the expired files, so one still lying
+        in allure-results is not read or added again.
+        """
+        cutoff = order - self.retention
+        del self.index["launches"][self.retention:]
+        for history_id, leaf in list(self.index["cases"].items()):
+            if leaf["launch"] <= cutoff:
+                del self.index["cases"][history_id]
+                self.evicted.add(leaf["uid"])
+                self.evicted.update(leaf["retries"])
+                entry = self.history.pop(history_id, {})
+                self.evicted.update(item["uid"] for item in entry.get("items", ()))
+        for key in ("processed", "files"):
+            entries = self.index.get(key, {})
+            for name in [name for name, launch in entries.items() if launch <= cutoff]:
+                del entries[name]
+                if key == "files":
+                    try:
+                        self.index["horizon"] = max(self.index["horizon"], (source.path / name).stat().st_mtime)
+                    except OSError:
+                        pass
+
+    def _prune(self):
+        """Delete the test-case files evicted by this build that nothing refers to any more.
+
+        Only a report just taken over from ``allure generate`` is swept for orphans as a whole.
+        """
+        cases_dir = self.data_dir / "test-cases"
+        if not cases_dir.is_dir():
+            return 0
+        keep = set()
+        for leaf in self.index["cases"].values():
+            keep.add(leaf["uid"])
+            keep.update(leaf["retries"])
+        for entry in self.history.values():
+            keep.update(item["uid"] for item in entry.get("items", ()))
+        if self.index.pop("sweep", False):
+            self.evicted.update(path.stem for path in cases_dir.glob("*.json"))
+        pruned = 0
+        for uid in self.evicted - keep:
+            path = cases_dir / f"{uid}.json"
+            if path.exists():
+                path.unlink()
+                pruned += 1
+        self.evicted.clear()
+        return pruned
+
+    # --- aggregates -------------------------------------------------------
+
+    @staticmethod
+    def _tree(name, leaves, paths):
+        """A data/*.json tree with each leaf under every group path ``paths(leaf)`` returns."""
+        root = {"uid": md5(name), "name": name, "children": []}
+        for leaf in leaves:
+            for groups in paths(leaf):
+                node, path = root, []
+                for group in groups:
+                    path.append(group)
+                    child = next((c for c in node["children"] if c["name"] == group and "children" in c), None)
+                    if child is None:
+                        child = {"name": group, "uid": md5(name, *path), "children": []}
+                        node["children"].append(child)
+                    node = child
+                node["children"].append({key: leaf[key] for key in NODE_KEYS} | {"parentUid": node["uid"]})
+        return root
+
+    @staticmethod
+    def _top(name, groups):
+        """A widgets/*.json list of top-level groups with their statistic."""
+        return {"total": len(groups), "items": [
+            {"uid": md5(name, group), "name": group, "statistic": statistic(statuses)}
+            for group, statuses in sorted(groups.items())]}
+
+    def _write_aggregates(self):
+        leaves = sorted(self.index["cases"].values(), key=lambda leaf: (suites(leaf), leaf["name"]))
+
+        def behavior_paths(leaf):
+            return [[group for group in combination if group] for combination in behaviors(leaf)]
+
+        def package_paths(leaf):
+            return [[first(leaf, "package")] if first(leaf, "package") else []]
+
+        def category_paths(leaf):
+            return [[category, leaf["statusMessage"] or "Empty message"] for category in leaf["categories"]]
+
+        def timeline_paths(leaf):
+            return [[first(leaf, "host", "unknown"), first(leaf, "thread", "unknown")]]
+
+        self._write_json("data/suites.json", self._tree("suites", leaves, suites))
+        self._write_json("data/behaviors.json", self._tree("behaviors", leaves, behavior_paths))
+        self._write_json("data/packages.json", self._tree("packages", leaves, package_paths))
+        self._write_json("data/categories.json", self._tree("categories", leaves, category_paths))
+        self._write_json("data/timeline.json", self._tree("timeline", leaves, timeline_paths))
+        self._write_csvs(leaves)
+
+        top_suites, top_features, top_categories = {}, {}, {}
+        for leaf in leaves:
+            top_suites.setdefault(first(leaf, "parentSuite") or first(leaf, "suite"), []).append(leaf["status"])
+            for group in {next((g for g in combination if g), "") for combination in behaviors(leaf)}:
+                if group:
+                    top_features.setdefault(group, []).append(leaf["status"])
+            for category in leaf["categories"]:
+                top_categories.setdefault(category, []).append(leaf["status"])
+        self._write_json("widgets/suites.json", self._top("suites", top_suites))
+        self._write_json("widgets/behaviors.json", self._top("behaviors", top_features))
+        self._write_json("widgets/categories.json", self._top("categories", top_categories))
+        plain = [{key: leaf[key] for key in ("uid", "name", "time", "status", "severity")} for leaf in leaves]
+        for widget in ("status-chart", "severity", "duration"):
+            self._write_json(f"widgets/{widget}.json", plain)
+        self._write_json("widgets/environment.json", self.index["environment"])
+        self._write_json("widgets/executors.json", self.index["executors"])
+        self._write_json("widgets/launch.json", [])
+
+        overall = statistic(leaf["status"] for leaf in leaves)
+        times = [leaf["time"] for leaf in leaves] or [span({})]
+        durations = [t["duration"] for t in times]
+        summary_time = {
+            "start": min(t["start"] for t in times),
+            "stop": max(t["stop"] for t in times),
+            "duration": max(t["stop"] for t in times) - min(t["start"] for t in times),
+            "minDuration": min(durations),
+            "maxDuration": max(durations),
+            "sumDuration": sum(durations),
+        }
+        self._write_json("widgets/summary.json", {
+            "reportName": self.report_name, "testRuns": [], "statistic": overall, "time": summary_time})
+        self._write_exports(overall, summary_time, {name: len(statuses) for name, statuses in top_categories.items()})
+
+        # Trends: newest launch first, cut at the retention
+        launches = self.index["launches"]
+        trends = {
+            "history-trend": [{"buildOrder": l["order"], "reportName": self.report_name, "data": l["statistic"]}
+                              for l in launches],
+            "duration-trend": [{"buildOrder": l["order"], "data": {"duration": l["duration"]}} for l in launches],
+            "categories-trend": [{"buildOrder": l["order"], "data": l["categories"]} for l in launches],
+            "retry-trend": [{"buildOrder": l["order"], "data": {"run": l["statistic"]["total"], "retry": l["retry"]}}
+                            for l in launches],
+        }
+        for name, data in trends.items():
+            self._write_json(f"history/{name}.json", data)
+            self._write_json(f"widgets/{name}.json", data)
+        self._write_json("history/history.json", self.history)
+
+    def _write_csvs(self, leaves):
+        self._write_csv("data/suites.csv", [
+            "DESCRIPTION", "DURATION IN MS", "NAME", "PARENT SUITE", "START TIME", "STATUS", "STOP TIME",
+            "SUB SUITE", "SUITE", "TEST CLASS", "TEST METHOD",
+        ], [[leaf["description"], leaf["time"]["duration"], leaf["name"], first(leaf, "parentSuite"),
+             java_date(leaf["time"]["start"]), leaf["status"], java_date(leaf["time"]["stop"]),
+             first(leaf, "subSuite"), first(leaf, "suite"), first(leaf, "testClass"), first(leaf, "testMethod")]
+            for leaf in leaves])
+
+        groups = {}
+        for leaf in leaves:
+            for combination in behaviors(leaf):
+                groups.setdefault(tuple(combination), []).append(leaf["status"])
+        rows = []
+        for (epic, feature, story), statuses in sorted(groups.items()):
+            counts = statistic(statuses)
+            rows.append([counts["broken"], epic, counts["failed"], feature, counts["passed"], counts["skipped"],
+                         story, counts["unknown"]])
+        self._write_csv("data/behaviors.csv",
+                        ["BROKEN", "EPIC", "FAILED", "FEATURE", "PASSED", "SKIPPED", "STORY", "UNKNOWN"], rows)
+
+        groups = {}
+        for leaf in leaves:
+            for category in leaf["categories"]:
+                groups.setdefault(category, []).append(leaf["status"])
+        rows = []
+        for category, statuses in sorted(groups.items()):
+            counts = statistic(statuses)
+            rows.append([counts["broken"], category, counts["failed"], counts["passed"], counts["skipped"],
+                         counts["unknown"]])
+        self._write_csv("data/categories.csv", ["BROKEN", "CATEGORY", "FAILED", "PASSED", "SKIPPED", "UNKNOWN"], rows)
+
+    def _write_exports(self, overall, summary_time, problems):
+        retry = self.index["launches"][0]["retry"] if self.index["launches"] else 0
+        metrics = [("launch_status", status, overall[status]) for status in ("failed", "broken", "passed", "skipped",
+                                                                             "unknown")]
+        metrics += [("launch_time", name, summary_time[key]) for name, key in (
+            ("duration", "duration"), ("min_duration", "minDuration"), ("max_duration", "maxDuration"),
+            ("sum_duration", "sumDuration"), ("start", "start"), ("stop", "stop"))]
+        metrics += [("launch_problems", name.lower().replace(" ", "_"), count) for name, count in sorted(problems.items())]
+        metrics += [("launch_retries", "retries", retry), ("launch_retries", "run", overall["total"])]
+        timestamp_ns = time.time_ns()
+        self._write_text("export/influxDbData.txt",
+                         "".join(f"{group} {name}={value} {timestamp_ns}\n" for group, name, value in metrics))
+        self._write_text("export/prometheusData.txt",
+                         "".join(f"{group}_{name} {value}\n" for group, name, value in metrics))
+        self._write_text("export/mail.html", (
+            "<!DOCTYPE html>\n<html>\n<head>\n    <meta charset=\"utf-8\">\n"
+            f"    <title>{self.report_name} summary mail</title>\n</head>\n<body>\n"
+            f"    {overall['total']} tests: {overall['passed']} passed, {overall['failed']} failed, "
+            f"{overall['broken']} broken, {overall['skipped']} skipped\n</body>\n</html>\n"))
+
+    # --- build ------------------------------------------------------------
+
+    def update(self, results_path):
+        """Merge the results not seen before into the report; returns (added, pruned, seconds)."""
+        started = time.perf_counter()
+        order = self.index["launches"][0]["order"] + 1 if self.index["launches"] else 1
+        source = ResultsSource(results_path, self.index, order)
+        processed = self.index["processed"]
+        fixtures = {}
+        for container in source.containers:
+            for child in container.get("children") or ():
+                fixtures.setdefault(child, []).append(container)
+
+        new = [result for result in source.results if result.get("uuid") not in processed]
+        new.sort(key=lambda result: result.get("start", 0))
+        statuses, launch_times = {}, []
+        for result in new:
+            uid = md5(result["uuid"])[:16]
+            history_id = result.get("historyId") or md5(result.get("fullName", ""))
+            replaced = self.index["cases"].get(history_id, {})
+            previous = replaced.get("status")
+            # Retries are only referenced from the case they belong to
+            self.evicted.update(replaced.get("retries", ()))
+            case = self._test_case(source, result, uid, fixtures.get(result["uuid"], ()), previous)
+            self._write_json(f"data/test-cases/{uid}.json", case)
+            self._add_history(history_id, case)
+            self.index["cases"][history_id] = dict(self._leaf(case), launch=order)
+            processed[result["uuid"]] = order
+            # Reruns within one launch count once, with their last status
+            statuses[history_id] = case["status"]
+            launch_times.append(case["time"])
+        if source.environment is not None:
+            self.index["environment"] = source.environment
+        if source.executors is not None:
+            self.index["executors"] = source.executors
+
+        pruned = 0
+        if new:
+            counts = statistic(statuses.values())
+            self.index["launches"].insert(0, {
+                "order": order,
+                "statistic": counts,
+                "duration": max(t["stop"] for t in launch_times) - min(t["start"] for t in launch_times),
+                "categories": {label: counts[status] for status, label in CATEGORIES.items() if counts[status]},
+                "retry": len(new) - len(statuses),
+            })
+            self._expire(order, source)
+            self._write_aggregates()
+            pruned = self._prune()
+        self._write_json(INDEX, self.index)
+        return len(new), pruned, time.perf_counter() - started
+
+    def copy_static(self, template_dir):
+        """Copy index.html, app.js and plugins from a generated report, once."""
+        template_dir = Path(template_dir)
+        for name in ("index.html", "app.js", "styles.css", "favicon.ico"):
+            if (template_dir / name).exists() and not (self.report_dir / name).exists():
+                self.report_dir.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(template_dir / name, self.report_dir / name)
+        if (template_dir / "plugin").is_dir() and not (self.report_dir / "plugin").exists():
+            shutil.copytree(template_dir / "plugin", self.report_dir / "plugin")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge new Allure results into an existing report")
+    parser.add_argument("results", help="allure-results directory or results store")
+    parser.add_argument("report", help="report directory to update")
+    parser.add_argument("--retention", type=int, default=20, help="runs kept per test and in the trends")
+    parser.add_argument("--static-from", default=None,
+                        help="report to copy index.html/app.js/plugins from when the target has none")
+    parser.add_argument("--name", default="Allure Report")
+    args = parser.parse_args(argv)
+    report = IncrementalReport(args.report, retention=args.retention, report_name=args.name)
+    if args.static_from:
+        report.copy_static(args.static_from)
+    added, pruned, elapsed = report.update(args.results)
+    print(f"{added} new results merged, {pruned} test-case files pruned in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
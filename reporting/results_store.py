@@ -0,0 +1,169 @@
+"""Append-only Allure results store.
+
+Tests write one NDJSON file per worker instead of a file per result, container and
+attachment. Attachments above ``inline_limit`` bytes go to ``blobs/`` once per
+content hash. Turn a store back into a normal allure-results directory with::
+
+    python -m reporting.results_store .allure-store allure-results
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+from allure_commons import hookimpl
+from attr import asdict
+
+BLOBS = "blobs"
+
+
+def _asdict(item):
+    return asdict(item, filter=lambda _, v: v or v is False)
+
+
+class ResultsStore:
+    """allure_commons logger writing everything to ``<directory>/<worker>.ndjson``."""
+
+    def __init__(self, directory, worker="main", inline_limit=16 * 1024):
+        self.directory = Path(directory).absolute()
+        self.blob_dir = self.directory / BLOBS
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.inline_limit = inline_limit
+        self.path = self.directory / f"{worker}.ndjson"
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.blobs_written = 0
+        self.blobs_reused = 0
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        # One write per entry, flushed, so a crashed worker leaves only whole lines behind
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def _report_item(self, kind, item):
+        self._append({"kind": kind, "file": item.file_pattern.format(prefix=uuid.uuid4()), "data": _asdict(item)})
+
+    def _blob_path(self, digest):
+        return self.blob_dir / digest[:2] / digest
+
+    def _store_blob(self, digest, write):
+        path = self._blob_path(digest)
+        if path.exists():
+            self.blobs_reused += 1
+            return
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp creates 0600 files; exported reports are usually served to others
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+        self.blobs_written += 1
+
+    @hookimpl
+    def report_result(self, result):
+        self._report_item("result", result)
+
+    @hookimpl
+    def report_container(self, container):
+        self._report_item("container", container)
+
+    @hookimpl
+    def report_globals(self, globals_item):
+        self._report_item("globals", globals_item)
+
+    @hookimpl
+    def report_attached_data(self, body, file_name):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if len(body) <= self.inline_limit:
+            self._append({"kind": "attachment", "file": file_name, "b64": base64.b64encode(body).decode("ascii")})
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        self._store_blob(digest, lambda f: f.write(body))
+        self._append({"kind": "attachment", "file": file_name, "blob": digest})
+
+    @hookimpl
+    def report_attached_file(self, source, file_name):
+        size = os.path.getsize(source)
+        if size <= self.inline_limit:
+            with open(source, "rb") as f:
+                self.report_attached_data(f.read(), file_name)
+            return
+        sha = hashlib.sha256()
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        def copy(out):
+            with open(source, "rb") as f:
+                shutil.copyfileobj(f, out)
+        self._store_blob(digest, copy)
+        self._append({"kind": "attachment", "file": file_name, "blob": digest})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def iter_entries(store_dir):
+    """Every entry of every worker file in a store, skipping a torn last line."""
+    for path in sorted(Path(store_dir).glob("*.ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def export(store_dir, results_dir, clean=False):
+    """Write a store out as standard allure-results files; returns counts per kind."""
+    store_dir, results_dir = Path(store_dir), Path(results_dir)
+    if clean and results_dir.is_dir():
+        shutil.rmtree(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for entry in iter_entries(store_dir):
+        destination = results_dir / entry["file"]
+        if entry["kind"] != "attachment":
+            with open(destination, "w", encoding="utf-8") as f:
+                json.dump(entry["data"], f, ensure_ascii=False)
+        elif "blob" in entry:
+            if destination.exists():
+                destination.unlink()
+            _link_or_copy(store_dir / BLOBS / entry["blob"][:2] / entry["blob"], destination)
+        else:
+            destination.write_bytes(base64.b64decode(entry["b64"]))
+        counts[entry["kind"]] = counts.get(entry["kind"], 0) + 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export an Allure results store to allure-results")
+    parser.add_argument("store", help="results store directory (--allure-store)")
+    parser.add_argument("results", help="allure-results directory to write")
+    parser.add_argument("--clean", action="store_true", help="empty the results directory first")
+    args = parser.parse_args(argv)
+    counts = export(args.store, args.results, clean=args.clean)
+    print(", ".join(f"{count} {kind}s" for kind, count in sorted(counts.items())) or "store is empty")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from html import escape
+
+# First record id on the real QA dashboard; select_dashboard_record looks for it with "rtqa1securly.com"
+FIRST_RECORD_ID = 25973
+
+LAYOUT = """<!doctype html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<header>
+<form action="/24/dashboard">
+<input data-testid="header__search-input" name="q" value="{query}">
+<button data-testid="header__search-button" type="submit">Search</button>
+</form>
+</header>
+<main>
+{body}
+</main>
+</body>
+</html>"""
+
+LOGIN_BODY = """<h1>OnCall</h1>
+<a href="/24/signin">Google "G" Logo Sign in with Google</a>"""
+
+SIGNIN_BODY = """<h1>Sign in with Google</h1>
+<form method="post" action="/24/session">
+<input type="email" name="email" aria-label="Email">
+<button type="submit">Submit</button>
+</form>"""
+
+HISTORY_SCRIPT = """<div role="dialog" id="activity-dialog" hidden>
+<p id="activity-dialog-title"></p>
+<button onclick="document.getElementById('activity-dialog').hidden = true">Close</button>
+</div>
+<script>
+document.querySelectorAll("[data-activity]").forEach(button => button.addEventListener("click", () => {
+  document.getElementById("activity-dialog-title").textContent = "Activity " + button.dataset.activity + " added";
+  document.getElementById("activity-dialog").hidden = false;
+}));
+</script>"""
+
+
+def record_email(index):
+    return f"rtqa{index + 1}securly.com"
+
+
+def layout(title, body, query=""):
+    return LAYOUT.format(title=escape(title), body=body, query=escape(query))
+
+
+def login_page():
+    return layout("OnCall - Login", LOGIN_BODY)
+
+
+def signin_page():
+    return layout("Sign in", SIGNIN_BODY)
+
+
+def queue_rows(records, query=""):
+    rows = []
+    for index in range(records):
+        email = record_email(index)
+        if query and query not in email:
+            continue
+        record_id = FIRST_RECORD_ID + index
+        rows.append(
+            f'<li data-testid="dashboard_queue_auditor_record-{record_id}__button">'
+            f'<a href="/24/dashboard?record={record_id}">{email}</a></li>')
+    return "\n".join(rows)
+
+
+def dashboard_page(records, record_id=None, query=""):
+    body = [f'<h1>Dashboard</h1>\n<ul data-testid="dashboard_queue">\n{queue_rows(records, query)}\n</ul>']
+    if record_id is not None:
+        body.append(
+            f'<section data-testid="dashboard_case-overview">\n<h2>Case {record_id}</h2>\n'
+            f'<a data-testid="dashboard_case-overview__send-email-button" role="button" '
+            f'href="/24/email?record={record_id}">Send email</a>\n</section>')
+    return layout("OnCall - Dashboard", "\n".join(body), query)
+
+
+def email_page(record_id):
+    body = (f'<h1>Email for case {record_id}</h1>\n'
+            f'<a data-testid="email_incident-type__open-history-link" href="/24/history?record={record_id}">'
+            f'Open history</a>')
+    return layout("OnCall - Email", body)
+
+
+def history_page(record_id, activities):
+    buttons = "\n".join(
+        f'<button data-testid="history_flagged-tab_activity-{n}__add-activity-button" data-activity="{n}">'
+        f'Add activity {n}</button>' for n in range(1, activities + 1))
+    body = f'<h1>History for case {record_id}</h1>\n<div data-testid="history_flagged-tab">\n{buttons}\n</div>\n{HISTORY_SCRIPT}'
+    return layout("OnCall - History", body)
+
+
+def aware_page():
+    return layout("Aware", "<h1>Aware</h1>")
@@ -0,0 +1,211 @@
+import fnmatch
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from standin import pages
+
+SESSION_COOKIE = "oncall_session"
+AUTOMATION_COOKIE = "automation"
+# Never delayed or failed, so tests can always read the counters
+STATS_PATH = "/__standin/stats"
+
+
+class StandinSettings:
+    """Latency and error injection plus the size of the generated dashboard."""
+
+    def __init__(self, records=50, activities=20, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, error_status=500, error_paths=("*",), seed=None):
+        self.records = records
+        self.activities = activities
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_paths = tuple(error_paths)
+        self.random = random.Random(seed)
+
+    def delay(self):
+        jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000
+
+    def should_fail(self, path):
+        if not self.error_rate or not any(fnmatch.fnmatch(path, pattern) for pattern in self.error_paths):
+            return False
+        return self.random.random() < self.error_rate
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """OnCall/Aware pages with the data-testids the controllers use."""
+
+    server_version = "Standin/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def _send(self, status=200, body="", content_type="text/html; charset=utf-8", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location, headers=()):
+        self._send(302, headers=[("Location", location), *headers])
+
+    def _cookies(self):
+        cookies = {}
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name:
+                cookies[name] = value
+        return cookies
+
+    def _logged_in(self):
+        return SESSION_COOKIE in self._cookies()
+
+    def _inject(self, path):
+        """Apply latency and error injection; True when the request was answered with an error."""
+        self.server.count(path)
+        if path == STATS_PATH:
+            return False
+        delay = self.settings.delay()
+        if delay:
+            time.sleep(delay)
+        if self.settings.should_fail(path):
+            self.server.count_error(path)
+            self._send(self.settings.error_status, f"injected {self.settings.error_status}")
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path, query = url.path, parse_qs(url.query)
+        if self._inject(path):
+            return
+        record = query.get("record", [None])[0]
+
+        if path == STATS_PATH:
+            self._send(body=json.dumps(self.server.stats()), content_type="application/json")
+        elif path == "/automation/enableAutomation":
+            self._send(body="automation enabled", headers=[("Set-Cookie", f"{AUTOMATION_COOKIE}=1; Path=/")])
+        elif path == "/24/login":
+            if self._logged_in():
+                self._redirect("/24/dashboard")
+            else:
+                self._send(body=pages.login_page())
+        elif path == "/24/signin":
+            self._send(body=pages.signin_page())
+        elif not self._logged_in() and path.startswith("/24/"):
+            self._redirect("/24/login")
+        elif path == "/24/dashboard":
+            self._send(body=pages.dashboard_page(self.settings.records, record, query.get("q", [""])[0]))
+        elif path == "/24/email" and record:
+            self._send(body=pages.email_page(record))
+        elif path == "/24/history" and record:
+            self._send(body=pages.history_page(record, self.settings.activities))
+        elif path.rstrip("/") == "/app/aware":
+            self._send(body=pages.aware_page())
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self._inject(path):
+            return
+        if path == "/24/session":
+            email = parse_qs(body).get("email", [""])[0]
+            if not email:
+                self._redirect("/24/signin")
+                return
+            self._redirect("/24/dashboard", headers=[("Set-Cookie", f"{SESSION_COOKIE}={email}; Path=/")])
+        else:
+            self._send(404, "not found")
+
+
+class StandinHTTPServer(ThreadingHTTPServer):
+
+    def __init__(self, address, settings):
+        super().__init__(address, StandinHandler)
+        self.settings = settings
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.errors = {}
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def count_error(self, path):
+        with self._lock:
+            self.errors[path] = self.errors.get(path, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.requests), "errors": dict(self.errors)}
+
+
+class StandinServer:
+    """Local stand-in for the OnCall/Aware hosts, served from a background thread."""
+
+    def __init__(self, settings=None, host="127.0.0.1", port=0):
+        self.settings = settings or StandinSettings()
+        self.server = StandinHTTPServer((host, port), self.settings)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self):
+        return f"{self.url}/24/login"
+
+    @property
+    def enable_automation_url(self):
+        return f"{self.url}/automation/enableAutomation"
+
+    def point(self, controller):
+        """Send a controller's login and automation navigations here instead of the QA host."""
+        controller.login_url = self.login_url
+        controller.enable_automation_url = self.enable_automation_url
+        return controller
+
+    def configure(self, **changes):
+        for name, value in changes.items():
+            if not hasattr(self.settings, name):
+                raise AttributeError(f"Unknown stand-in setting: {name}")
+            setattr(self.settings, name, value)
+
+    def stats(self):
+        return self.server.stats()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,106 @@
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.async_base import AsyncBrowserPool, gather_limited
+from controller.profiles import Profile
+
+
+class FakeBrowser:
+
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        self.browser.contexts.remove(self)
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.launches = 0
+
+    async def launch(self, **options):
+        self.launches += 1
+        # Give concurrent checkouts the chance to race into a second launch
+        await asyncio.sleep(0.01)
+        return FakeBrowser()
+
+
+class FakePlaywright:
+
+    def __init__(self):
+        self.firefox = FakeEngine()
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+def fake_pool():
+    pool = AsyncBrowserPool()
+    pool.profile = Profile("test", engines=("firefox",), mode="headless")
+    pool.pw = FakePlaywright()
+    return pool
+
+
+class TestAsyncBrowserPool:
+
+    def test_concurrent_actors_share_one_launch(self):
+        pool = fake_pool()
+        playwright = pool.pw
+
+        async def scenario():
+            checkouts = await asyncio.gather(*(pool.checkout() for _ in range(5)))
+            assert len({id(browser) for browser, _, _ in checkouts}) == 1
+            assert len({id(context) for _, context, _ in checkouts}) == 5
+            await pool.release(checkouts[0][1])
+            assert len(checkouts[0][0].contexts) == 4
+            await pool.close()
+            return checkouts[0][0]
+        browser = asyncio.run(scenario())
+        assert playwright.firefox.launches == 1
+        assert (pool.checkouts, pool.releases) == (5, 1)
+        assert browser.closed and playwright.stopped and pool.pw is None
+
+
+class TestGatherLimited:
+
+    def test_concurrency_cap_and_returned_errors(self):
+        running = []
+        peak = []
+
+        async def act(n):
+            running.append(n)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(n)
+            if n == 2:
+                raise ValueError(n)
+            return n
+
+        results = asyncio.run(gather_limited([act(n) for n in range(5)], concurrency=2))
+        assert max(peak) == 2
+        assert results[:2] == [0, 1] and isinstance(results[2], ValueError) and results[3:] == [3, 4]
@@ -0,0 +1,39 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from benchmarks.run import Timings, compare, percentile, summarize
+
+
+class TestStatistics:
+
+    def test_percentile_interpolates_between_ranks(self):
+        values = [40, 10, 30, 20]
+        assert percentile(values, 0) == 10
+        assert percentile(values, 50) == 25
+        assert percentile(values, 90) == 37
+        assert percentile(values, 100) == 40
+        assert percentile([5], 99) == 5
+
+    def test_summarize(self):
+        summary = summarize([1.0, 2.0, 3.0, 4.0, 5.0])
+        assert summary == {"n": 5, "mean": 3.0, "min": 1.0, "max": 5.0, "p50": 3.0, "p90": 4.6, "p95": 4.8, "p99": 4.96}
+
+    def test_timings_collect_samples_per_step(self):
+        timings = Timings()
+        for _ in range(3):
+            with timings.measure("create_browser"):
+                pass
+        assert timings.summary()["create_browser"]["n"] == 3
+
+
+class TestCompare:
+
+    def test_only_slowdowns_beyond_tolerance_are_regressions(self):
+        baseline = {"chromium:headless": {"login": {"p50": 100.0}, "close_all": {"p50": 10.0},
+                                          "create_browser": {"p50": 0}}}
+        results = {"chromium:headless": {"login": {"p50": 130.0}, "close_all": {"p50": 11.0},
+                                         "create_browser": {"p50": 50.0}, "new_step": {"p50": 5.0}},
+                   "firefox:headless": {"login": {"p50": 500.0}}}
+        assert compare(results, baseline) == [("chromium:headless", "login", 100.0, 130.0, 30.0)]
+        assert compare(results, baseline, tolerance=40.0) == []
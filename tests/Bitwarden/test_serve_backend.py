@@ -0,0 +1,119 @@
+import sys
+import os
+import textwrap
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import bitwarden
+
+ITEM_ID = "00000000-0000-0000-0000-00000000000a"
+TWIN_ID = "00000000-0000-0000-0000-00000000000b"
+
+# A `bw` that only knows `serve`: the REST API shape of the real one, over a two-item vault
+FAKE_BW = textwrap.dedent(f'''\
+    import json
+    import os
+    import sys
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import unquote, urlparse
+
+    ITEMS = [
+        {{"id": "{ITEM_ID}", "name": "oncall", "login": {{"username": "rtqa1@securly.com"}}}},
+        {{"id": "{TWIN_ID}", "name": "oncall", "login": {{"username": "rtqa2@securly.com"}}}},
+    ]
+
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200 if payload["success"] else 400)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = unquote(urlparse(self.path).path)
+            if path == "/status":
+                status = "unlocked" if os.environ.get("BW_SESSION") == "token" else "locked"
+                return self.reply({{"success": True, "data": {{"template": {{"status": status}}}}}})
+            if path == "/list/object/items":
+                return self.reply({{"success": True, "data": {{"data": ITEMS}}}})
+            _, kind, name = path.strip("/").split("/", 2)
+            matches = [item for item in ITEMS if name in (item["id"], item["name"])]
+            if len(matches) > 1:
+                ids = " ".join(item["id"] for item in matches)
+                return self.reply({{"success": False, "message": "More than one result was found. " + ids}})
+            if not matches:
+                return self.reply({{"success": False, "message": "Not found."}})
+            if kind == "totp":
+                return self.reply({{"success": True, "data": {{"data": "123456"}}}})
+            return self.reply({{"success": True, "data": matches[0]}})
+
+        def do_POST(self):
+            self.reply({{"success": True, "data": {{"title": "Syncing complete."}}}})
+
+        def log_message(self, *args):
+            pass
+
+    if sys.argv[1] != "serve":
+        sys.exit(2)
+    HTTPServer((sys.argv[sys.argv.index("--hostname") + 1], int(sys.argv[sys.argv.index("--port") + 1])),
+               Handler).serve_forever()
+    ''')
+
+
+@pytest.fixture
+def fake_bw(tmp_path, monkeypatch):
+    script = tmp_path / "bw.py"
+    script.write_text(FAKE_BW, encoding="utf-8")
+    launcher = tmp_path / "bw"
+    launcher.write_text(f"#!/bin/sh\nexec {sys.executable} {script} \"$@\"\n", encoding="utf-8")
+    launcher.chmod(0o755)
+    monkeypatch.setattr(bitwarden, 'USE_BW_SERVE', True)
+    yield str(launcher)
+    bitwarden.stop_serve_backend()
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="the fake bw is a shell launcher")
+class TestServeBackend:
+
+    def test_rest_calls(self, fake_bw):
+        backend = bitwarden.get_serve_backend("token", fake_bw)
+        assert backend.is_running()
+        assert backend.status()['status'] == 'unlocked'
+        assert [item['id'] for item in backend.list_items()] == [ITEM_ID, TWIN_ID]
+        assert backend.get_item(ITEM_ID)['login']['username'] == "rtqa1@securly.com"
+        assert backend.get_totp(ITEM_ID) == "123456"
+        assert backend.sync()['title'] == "Syncing complete."
+        with pytest.raises(bitwarden.BwServeError, match="Not found"):
+            backend.get_item("nobody")
+
+    def test_one_server_per_session(self, fake_bw):
+        backend = bitwarden.get_serve_backend("token", fake_bw)
+        assert bitwarden.get_serve_backend("token", fake_bw) is backend
+        replacement = bitwarden.get_serve_backend("new-token", fake_bw)
+        assert replacement is not backend
+        assert not backend.is_running()
+        assert replacement.status()['status'] == 'locked'
+
+    def test_ambiguous_names_use_the_first_id(self, fake_bw):
+        backend = bitwarden.get_serve_backend("token", fake_bw)
+        assert bitwarden._resolve_via_serve(backend.get_item, "oncall")['id'] == ITEM_ID
+
+    def test_validity_checks_never_start_a_server(self, fake_bw):
+        # The fake bw only serves, so a CLI `bw status` fails
+        assert not bitwarden.is_session_valid("token", fake_bw)
+        assert bitwarden._serve_backend is None
+
+        backend = bitwarden.get_serve_backend("token", fake_bw)
+        assert bitwarden.is_session_valid("token", fake_bw)
+        assert not bitwarden.is_session_valid("other-token", fake_bw)
+        assert bitwarden._serve_backend is backend and backend.is_running()
+
+    def test_falls_back_to_cli_when_serve_dies(self, tmp_path, monkeypatch):
+        broken = tmp_path / "bw"
+        broken.write_text("#!/bin/sh\nexit 1\n", encoding="utf-8")
+        broken.chmod(0o755)
+        monkeypatch.setattr(bitwarden, 'USE_BW_SERVE', True)
+        assert bitwarden.get_serve_backend("token", str(broken)) is None
+        assert bitwarden.USE_BW_SERVE is False
@@ -0,0 +1,137 @@
+import subprocess
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import bitwarden
+
+
+class FakeBw:
+    """Stands in for the CLI: `bw status` accepts the tokens in `valid`, `bw unlock` mints a new one."""
+
+    def __init__(self, *valid):
+        self.valid = set(valid)
+        self.calls = []
+        self.unlocks = 0
+        self.lock = threading.Lock()
+
+    def run(self, args, **kwargs):
+        command = args[1]
+        with self.lock:
+            self.calls.append(command)
+        if command == 'status':
+            status = 'unlocked' if args[-1] in self.valid else 'locked'
+            return subprocess.CompletedProcess(args, 0, stdout=f'{{"status": "{status}"}}')
+        if command == 'list':
+            return subprocess.CompletedProcess(args, 1, stdout='', stderr='locked')
+        if command == 'unlock':
+            # Slow enough that a second refresher would overlap without the locks
+            time.sleep(0.05)
+            with self.lock:
+                self.unlocks += 1
+                token = f"token-{self.unlocks}"
+            self.valid = {token}
+            return subprocess.CompletedProcess(args, 0, stdout=token + "\n")
+        raise AssertionError(f"unexpected bw {command}")
+
+
+@pytest.fixture
+def bw(monkeypatch, tmp_path):
+    fake = FakeBw()
+    monkeypatch.setattr(bitwarden.subprocess, 'run', fake.run)
+    monkeypatch.setattr(bitwarden, 'BW_SESSION_CACHE_FILE', tmp_path / "session")
+    monkeypatch.setattr(bitwarden, 'USE_BW_SERVE', False)
+    monkeypatch.setattr(bitwarden, '_session_lease', None)
+    monkeypatch.delenv(bitwarden.BW_SESSION_ENV_VAR, raising=False)
+    return fake
+
+
+class TestSessionLease:
+
+    def test_validation_is_reused_inside_the_window(self, bw):
+        bw.valid = {"abc"}
+        lease = bitwarden.SessionLease(window=60)
+        assert lease.is_valid("abc") and lease.is_valid("abc")
+        assert bw.calls == ['status']
+        assert not lease.is_valid("other")
+
+    def test_expired_window_checks_again(self, bw):
+        bw.valid = {"abc"}
+        lease = bitwarden.SessionLease(window=0)
+        lease.is_valid("abc")
+        lease.is_valid("abc")
+        assert bw.calls == ['status', 'status']
+
+    def test_refresh_keeps_a_valid_token(self, bw):
+        bw.valid = {"abc"}
+        lease = bitwarden.get_session_lease()
+        lease.record("abc")
+        assert lease.refresh() == "abc"
+        assert 'unlock' not in bw.calls
+
+    def test_refresh_unlocks_without_logging_out(self, bw):
+        lease = bitwarden.get_session_lease()
+        lease.record("expired")
+        assert lease.refresh() == "token-1"
+        assert 'logout' not in bw.calls and 'login' not in bw.calls
+        assert bitwarden.BW_SESSION_CACHE_FILE.read_text(encoding='utf-8') == "token-1"
+        assert os.environ[bitwarden.BW_SESSION_ENV_VAR] == "token-1"
+        assert lease.is_current("token-1")
+
+    def test_refresh_adopts_a_token_another_worker_stored(self, bw):
+        bw.valid = {"from-worker"}
+        bitwarden.BW_SESSION_CACHE_FILE.write_text("from-worker", encoding='utf-8')
+        lease = bitwarden.get_session_lease()
+        lease.record("expired")
+        assert lease.refresh() == "from-worker"
+        assert bw.unlocks == 0
+
+    def test_concurrent_refreshes_unlock_once(self, bw):
+        lease = bitwarden.get_session_lease()
+        lease.record("expired")
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(lease.refresh())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert bw.unlocks == 1
+        assert tokens == ["token-1"] * 4
+
+    def test_readers_wait_for_a_refresh(self, bw):
+        lease = bitwarden.get_session_lease()
+        lease.record("expired")
+        os.environ[bitwarden.BW_SESSION_ENV_VAR] = "expired"
+        refresher = threading.Thread(target=lease.refresh)
+        refresher.start()
+        # `bw status` only runs once the refresh holds the lock
+        while not bw.calls:
+            time.sleep(0.001)
+        assert bitwarden.get_cached_session_token() == "token-1"
+        refresher.join(10)
+
+    def test_auto_refresh_runs_in_background(self, bw):
+        lease = bitwarden.get_session_lease()
+        lease.window = 1
+        lease.record("expired")
+        lease.start_auto_refresh(margin=0)
+        try:
+            deadline = time.monotonic() + 5
+            while bw.unlocks == 0 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            lease.stop_auto_refresh()
+        assert lease.token == "token-1"
+
+    def test_stop_session_lease_ends_auto_refresh(self, bw):
+        lease = bitwarden.get_session_lease()
+        lease.start_auto_refresh()
+        assert lease.auto_refreshing
+        bitwarden.stop_session_lease()
+        assert not lease.auto_refreshing
+        # Nothing to stop is fine too
+        bitwarden.stop_session_lease()
@@ -0,0 +1,51 @@
+import base64
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import bitwarden
+
+
+def b32(seed):
+    return base64.b32encode(seed.encode()).decode()
+
+
+# RFC 6238 Appendix B test vectors (8 digits)
+SEEDS = {
+    'SHA1': b32('12345678901234567890'),
+    'SHA256': b32('12345678901234567890123456789012'),
+    'SHA512': b32('1234567890123456789012345678901234567890123456789012345678901234'),
+}
+
+
+class TestLocalTotp:
+
+    @pytest.mark.parametrize("algorithm, at, expected", [
+        ('SHA1', 59, '94287082'),
+        ('SHA256', 59, '46119246'),
+        ('SHA512', 59, '90693936'),
+        ('SHA1', 1111111109, '07081804'),
+        ('SHA256', 1111111109, '68084774'),
+        ('SHA512', 2000000000, '38618901'),
+    ])
+    def test_rfc6238_vectors(self, algorithm, at, expected):
+        uri = f"otpauth://totp/test?secret={SEEDS[algorithm]}&algorithm={algorithm}&digits=8"
+        assert bitwarden.generate_totp(uri, at) == expected
+
+    def test_plain_seed_uses_defaults(self):
+        assert bitwarden.generate_totp(SEEDS['SHA1'], 59) == '287082'
+
+    def test_custom_period(self):
+        uri = f"otpauth://totp/test?secret={SEEDS['SHA1']}&period=60"
+        assert bitwarden.generate_totp(uri, 0) == bitwarden.generate_totp(uri, 59)
+
+    def test_picks_next_window_near_boundary(self, monkeypatch):
+        monkeypatch.setattr(bitwarden.time, 'time', lambda: 29.5)
+        code = bitwarden.get_local_totp(SEEDS['SHA1'], min_remaining=3, wait=False)
+        assert code == bitwarden.generate_totp(SEEDS['SHA1'], 30)
+
+    def test_rejects_unsupported_scheme(self):
+        with pytest.raises(ValueError):
+            bitwarden.parse_totp_secret("steam://ABCDEFGH")
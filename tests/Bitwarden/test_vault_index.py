@@ -0,0 +1,86 @@
+import json
+import subprocess
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import bitwarden
+
+OLD_ID = "00000000-0000-0000-0000-00000000000a"
+NEW_ID = "00000000-0000-0000-0000-00000000000b"
+TWIN_ID = "00000000-0000-0000-0000-00000000000c"
+
+
+def item(item_id, name, username=None, uri=None, revision=None):
+    return {
+        'id': item_id,
+        'name': name,
+        'revisionDate': revision,
+        'login': {'username': username, 'uris': [{'uri': uri}] if uri else []},
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    monkeypatch.setattr(bitwarden, '_vault_index', None)
+    monkeypatch.setattr(bitwarden, 'USE_BW_SERVE', False)
+
+
+class TestVaultIndex:
+
+    def test_newest_revision_wins_then_id(self):
+        index = bitwarden.VaultIndex([
+            item(TWIN_ID, "OnCall", revision="2024-05-01T00:00:00Z"),
+            item(OLD_ID, "OnCall", revision="2023-01-01T00:00:00Z"),
+            item(NEW_ID, "OnCall", revision="2024-05-01T00:00:00Z"),
+        ])
+        assert [i['id'] for i in index.by_name["oncall"]] == [NEW_ID, TWIN_ID, OLD_ID]
+        assert index.lookup("  ONCALL ")['id'] == NEW_ID
+
+    def test_lookup_precedence(self):
+        index = bitwarden.VaultIndex([
+            item(OLD_ID, "rtqa1@securly.com", uri="https://oncall.test"),
+            item(NEW_ID, "Service account", username="rtqa1@securly.com"),
+        ])
+        assert index.lookup(NEW_ID.upper())['id'] == NEW_ID
+        # a name match beats a username match
+        assert index.lookup("rtqa1@securly.com")['id'] == OLD_ID
+        assert index.lookup("https://oncall.test")['id'] == OLD_ID
+        assert index.lookup("nobody") is None
+
+    def test_staleness(self):
+        index = bitwarden.VaultIndex([], ttl=60)
+        assert index.is_fresh()
+        index.stale = True
+        assert not index.is_fresh()
+
+
+class TestGetCredentials:
+
+    def run_with(self, monkeypatch, list_failure):
+        calls = []
+
+        def run(args, **kwargs):
+            calls.append(args[1:3])
+            if args[1] == 'list':
+                raise list_failure
+            return subprocess.CompletedProcess(args, 0, stdout=json.dumps(item(NEW_ID, args[3])))
+        monkeypatch.setattr(bitwarden.subprocess, 'run', run)
+        return bitwarden.get_credentials("rtqa1@securly.com", "token"), calls
+
+    @pytest.mark.parametrize("failure", [
+        subprocess.CalledProcessError(1, "bw", stderr="Vault is locked"),
+        subprocess.TimeoutExpired("bw", 60),
+        FileNotFoundError("bw"),
+    ])
+    def test_index_failure_falls_back_to_direct_lookup(self, monkeypatch, failure):
+        found, calls = self.run_with(monkeypatch, failure)
+        assert found['name'] == "rtqa1@securly.com"
+        assert calls == [['list', 'items'], ['get', 'item']]
+
+    def test_index_hit_skips_the_cli(self, monkeypatch):
+        monkeypatch.setattr(bitwarden, 'list_vault_items', lambda token, bw_path: [item(NEW_ID, "OnCall")])
+        monkeypatch.setattr(bitwarden.subprocess, 'run', lambda *a, **k: pytest.fail("CLI called"))
+        assert bitwarden.get_credentials("oncall", "token")['id'] == NEW_ID
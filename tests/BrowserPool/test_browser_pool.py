@@ -0,0 +1,126 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.base import BaseClass, BrowserPool
+from controller.profiles import Profile
+
+
+class FakeBrowser:
+
+    def __init__(self, options):
+        self.options = options
+        self.contexts = []
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **options):
+        context = FakeContext(self, options)
+        self.contexts.append(context)
+        return context
+
+    def close(self):
+        self.connected = False
+
+
+class FakeContext:
+
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+        self.closed = False
+        self.pages = []
+
+    def on(self, event, handler):
+        pass
+
+    def new_page(self):
+        return object()
+
+    def close(self):
+        self.closed = True
+        self.browser.contexts.remove(self)
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.launches = []
+
+    def launch(self, **options):
+        self.launches.append(options)
+        return FakeBrowser(options)
+
+
+class FakePlaywright:
+
+    def __init__(self):
+        self.firefox = FakeEngine()
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+def fake_pool():
+    pool = BrowserPool()
+    pool.profile = Profile("test", engines=("firefox",), mode="headless")
+    pool.pw = FakePlaywright()
+    return pool
+
+
+class Controller(BaseClass):
+    pass
+
+
+class TestBrowserPool:
+
+    def test_one_browser_and_a_fresh_context_per_checkout(self):
+        pool = fake_pool()
+        browser, first, _ = pool.checkout()
+        again, second, _ = pool.checkout(storage_state="state.json")
+        assert again is browser and first is not second
+        assert second.options == {"storage_state": "state.json"}
+        assert len(pool.pw.firefox.launches) == 1
+
+    def test_release_closes_only_the_context(self):
+        pool = fake_pool()
+        browser, context, _ = pool.checkout()
+        pool.release(context)
+        assert context.closed and browser.is_connected()
+        assert pool.checkout()[0] is browser
+        assert (pool.report()["checkouts"], pool.report()["releases"]) == (2, 1)
+
+    def test_disconnected_browsers_are_replaced(self):
+        pool = fake_pool()
+        browser, _, _ = pool.checkout()
+        browser.connected = False
+        assert pool.checkout()[0] is not browser
+        assert len(pool.pw.firefox.launches) == 2
+
+    def test_close_shuts_everything_down(self):
+        pool = fake_pool()
+        browser, _, _ = pool.checkout()
+        playwright = pool.pw
+        pool.close()
+        assert not browser.is_connected() and playwright.stopped
+        assert pool.browsers == {} and pool.pw is None
+
+
+class TestBaseClass:
+
+    def test_controllers_share_the_pool(self, monkeypatch):
+        pool = fake_pool()
+        monkeypatch.setattr(BaseClass, "pool", pool)
+        # The plugins' per-test context setup is covered by their own tests
+        for name in ("network_policy", "har", "trace_chunks"):
+            monkeypatch.setattr(BaseClass, name, None)
+        first, second = Controller(), Controller()
+        handles = [first.create_browser(), second.create_browser()]
+        assert first.browsers[handles[0]] is second.browsers[handles[1]]
+        context = first.contexts[handles[0]]
+        first.close_all()
+        assert context.closed and first.contexts == {}
+        assert len(second.contexts) == 1 and pool.releases == 1
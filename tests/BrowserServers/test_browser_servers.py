@@ -0,0 +1,143 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller import browser_server
+from controller.base import BrowserPool
+from controller.browser_server import BrowserServer
+from controller.profiles import Profile
+from plugins.browser_servers import BrowserServerPool
+
+ENDPOINT = "ws://127.0.0.1:9000/abc"
+
+
+class FakeBrowser:
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+
+class FakeContext:
+
+    def __init__(self, browser):
+        self.browser = browser
+
+    def new_page(self):
+        return object()
+
+    def close(self):
+        self.browser.contexts.remove(self)
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.connections = []
+
+    def connect(self, endpoint):
+        self.connections.append(endpoint)
+        return FakeBrowser(endpoint)
+
+    def launch(self, **options):
+        raise AssertionError("launched a browser although a server is configured")
+
+
+class FakePlaywright:
+
+    def __init__(self):
+        self.firefox = FakeEngine()
+
+
+@pytest.fixture
+def fake_driver(tmp_path, monkeypatch):
+    """A `node` that prints what the launch script would, so BrowserServer.start needs no browser."""
+    def install(output):
+        node = tmp_path / "node"
+        # Without output it keeps stdout open and says nothing, like a server stuck starting up
+        script = f"echo '{output}'\nexec cat > /dev/null" if output is not None else "exec cat"
+        node.write_text(f"#!/bin/sh\n{script}\n", encoding="utf-8")
+        node.chmod(0o755)
+        monkeypatch.setattr(browser_server, "compute_driver_executable",
+                            lambda: (str(node), str(tmp_path / "package" / "cli.js")))
+    return install
+
+
+class TestPoolOnServers:
+
+    def test_workers_connect_once_and_share_the_connection(self):
+        pool = BrowserPool()
+        pool.profile = Profile("test", engines=("firefox",), mode="headed")
+        pool.pw = FakePlaywright()
+        pool.endpoints = {"firefox": ENDPOINT}
+        first = pool.checkout()
+        # Headless mode is the server's business, so it does not split the connection
+        second = pool.checkout(headless=True)
+        assert first[0] is second[0] and pool.pw.firefox.connections == [ENDPOINT]
+        pool.release(first[1])
+        assert pool.server_stats[ENDPOINT] == {"connections": 1, "contexts": 2, "active": 1, "peak_active": 2}
+        assert pool.report()["launches"].keys() == {"firefox:server"}
+
+
+class TestBrowserServerPool:
+
+    def test_endpoints_round_robin(self):
+        servers = BrowserServerPool(2, ["firefox"])
+        servers.servers = {"firefox": [BrowserServer("firefox"), BrowserServer("firefox")]}
+        for index, server in enumerate(servers.servers["firefox"]):
+            server.ws_endpoint = f"ws://server{index}"
+        assert [servers.endpoints_for(index)["firefox"] for index in range(3)] == [
+            "ws://server0", "ws://server1", "ws://server0"]
+
+    def test_summary_adds_up_workers(self):
+        servers = BrowserServerPool(1, ["firefox"])
+        stats = {"connections": 1, "contexts": 3, "active": 0, "peak_active": 2}
+        servers.worker_stats = [("gw0", {ENDPOINT: stats}), ("gw1", {ENDPOINT: stats})]
+        assert servers.summary() == {
+            ENDPOINT: {"workers": ["gw0", "gw1"], "connections": 2, "contexts": 6, "peak_active": 4}}
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="the fake node is a shell launcher")
+class TestBrowserServer:
+
+    def test_launch_options_are_camel_cased(self):
+        server = BrowserServer("chromium", headless=False, slow_mo=50, args=["--no-first-run"])
+        assert server.launch_options == {"headless": False, "slowMo": 50, "args": ["--no-first-run"]}
+
+    def test_start_reads_the_endpoint(self, fake_driver):
+        fake_driver(ENDPOINT)
+        server = BrowserServer("firefox").start()
+        try:
+            assert server.ws_endpoint == ENDPOINT and server.startup_time is not None
+        finally:
+            server.stop()
+        assert server.process is None
+
+    def test_start_fails_without_an_endpoint(self, fake_driver):
+        fake_driver("Error: browserType.launchServer: Executable doesn't exist")
+        server = BrowserServer("firefox")
+        with pytest.raises(RuntimeError, match="firefox browser server failed to start"):
+            server.start()
+        assert server.process is None
+
+    def test_silent_server_is_killed_after_the_deadline(self, fake_driver):
+        fake_driver(None)
+        server = BrowserServer("firefox", startup_timeout=0.2)
+        with pytest.raises(RuntimeError, match="printed no endpoint within 0.2s"):
+            server.start()
+        assert server.process is None
+
+    def test_unknown_driver_layout_fails_clearly(self, monkeypatch):
+        monkeypatch.setattr(browser_server, "compute_driver_executable", None)
+        with pytest.raises(RuntimeError, match="run without --browser-servers"):
+            BrowserServer("firefox").start()
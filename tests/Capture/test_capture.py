@@ -0,0 +1,215 @@
+import io
+import sys
+import os
+
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller import capture
+from controller.capture import CapturePolicy, ScreenshotCapture, dhash, fingerprint, is_near_duplicate
+from plugins import capture as capture_plugin
+
+
+def png(draw, size=64):
+    """An uncompressed PNG of ``draw(x, y) -> grey level``, like a browser screenshot that re-encodes smaller."""
+    image = Image.new("L", (size, size))
+    image.putdata([draw(x, y) for y in range(size) for x in range(size)])
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=0)
+    return buffer.getvalue()
+
+
+DASHBOARD = png(lambda x, y: x * 4)
+# The same dashboard with the clock in a corner ticking over
+DASHBOARD_LATER = png(lambda x, y: 255 if x < 3 and y < 3 else x * 4)
+RECORD = png(lambda x, y: 255 - x * 4)
+
+
+class FakePage:
+
+    def __init__(self, *shots):
+        self.shots = list(shots)
+
+    def is_closed(self):
+        return False
+
+    def screenshot(self, full_page=False, type="png"):
+        return self.shots.pop(0)
+
+
+class FakeContext:
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+
+
+class FakeOutcome:
+
+    def __init__(self, report):
+        self.report = report
+
+    def get_result(self):
+        return self.report
+
+
+class FakeReport:
+
+    def __init__(self, when, failed):
+        self.when = when
+        self.failed = failed
+
+
+class FakeConfig:
+
+    def __init__(self, worker=False):
+        self._capture_totals = dict.fromkeys(capture_plugin.TOTALS, 0)
+        if worker:
+            self.workerinput = {}
+            self.workeroutput = {}
+
+
+class FakeItem:
+
+    def __init__(self, config):
+        self.config = config
+        self.user_properties = []
+
+
+class FakeTerminalReporter:
+
+    def __init__(self):
+        self.lines = []
+
+    def section(self, title):
+        self.lines.append(title)
+
+    def write_line(self, line):
+        self.lines.append(line)
+
+
+@pytest.fixture
+def attached(monkeypatch):
+    attachments = []
+    monkeypatch.setattr(capture.allure, "attach",
+                        lambda body, name, attachment_type: attachments.append((name, attachment_type.extension)))
+    return attachments
+
+
+@pytest.fixture
+def policy():
+    policy = CapturePolicy(mode="on-step")
+    yield policy
+    policy.shutdown()
+
+
+def run_teardown(item):
+    hook = capture_plugin.pytest_runtest_teardown(item, None)
+    next(hook)
+    with pytest.raises(StopIteration):
+        next(hook)
+
+
+class TestFingerprints:
+
+    def test_dhash_distance(self):
+        assert bin(dhash(DASHBOARD) ^ dhash(DASHBOARD_LATER)).count("1") <= 4
+        assert bin(dhash(DASHBOARD) ^ dhash(RECORD)).count("1") == 64
+        assert is_near_duplicate(fingerprint(DASHBOARD), fingerprint(DASHBOARD_LATER), threshold=4)
+        assert not is_near_duplicate(fingerprint(DASHBOARD), fingerprint(RECORD), threshold=4)
+
+    def test_non_images_fall_back_to_exact_matches(self):
+        assert fingerprint(b"not a png")[0] == "sha256"
+        assert is_near_duplicate(fingerprint(b"not a png"), fingerprint(b"not a png"), threshold=0)
+        assert not is_near_duplicate(fingerprint(b"not a png"), fingerprint(DASHBOARD), threshold=64)
+
+
+class TestEncode:
+
+    def test_png_is_recompressed(self, policy):
+        encoded = policy.encode(DASHBOARD)
+        assert encoded["extension"] == "png" and len(encoded["data"]) < len(DASHBOARD)
+        assert Image.open(io.BytesIO(encoded["data"])).format == "PNG"
+
+    def test_jpeg(self):
+        encoded = CapturePolicy(image_format="jpeg", quality=50).encode(DASHBOARD)
+        assert encoded["extension"] == "jpg" and encoded["data"][:2] == b"\xff\xd8"
+
+    def test_unreadable_screenshot_is_kept_as_is(self, policy):
+        encoded = policy.encode(b"not a png")
+        assert (encoded["data"], encoded["extension"]) == (b"not a png", "png")
+
+
+class TestScreenshotCapture:
+
+    def test_consecutive_repeats_are_dropped_per_page(self, policy, attached):
+        shots = ScreenshotCapture(policy)
+        shots.watch(FakeContext(FakePage(DASHBOARD, DASHBOARD_LATER, RECORD, DASHBOARD),
+                                FakePage(DASHBOARD, RECORD, RECORD, RECORD)))
+        for step in ("login", "search", "open", "back"):
+            shots.snap(step)
+        stats = shots.finish()
+        assert [name for name, _ in attached] == [
+            "000 login (context 0, page 0)", "001 login (context 0, page 1)",
+            "003 search (context 0, page 1)", "004 open (context 0, page 0)", "006 back (context 0, page 0)"]
+        assert (stats["taken"], stats["kept"], stats["dropped"]) == (8, 5, 3)
+        assert stats["bytes_saved"] == stats["raw_bytes"] - stats["kept_bytes"] > 0
+
+    def test_sampling_and_failed_steps(self, attached):
+        policy = CapturePolicy(mode="on-step", sample_rate=0.25)
+        shots = ScreenshotCapture.active = ScreenshotCapture(policy)
+        try:
+            shots.watch(FakeContext(FakePage(DASHBOARD, RECORD, DASHBOARD)))
+            for step in range(8):
+                ScreenshotCapture.end_steps(f"step{step}")
+            ScreenshotCapture.end_steps("submit", passed=False)
+            shots.finish()
+        finally:
+            ScreenshotCapture.active = None
+            policy.shutdown()
+        assert [name.split(" (")[0] for name, _ in attached] == ["000 step3", "001 step7", "002 submit"]
+
+    def test_failure_is_captured_in_every_mode(self, attached):
+        policy = CapturePolicy(mode="on-failure", image_format="jpeg")
+        shots = ScreenshotCapture.active = ScreenshotCapture(policy)
+        try:
+            shots.watch(FakeContext(FakePage(DASHBOARD)))
+            ScreenshotCapture.end_steps("login")
+            for when in ("setup", "call"):
+                hook = capture_plugin.pytest_runtest_makereport(None, None)
+                next(hook)
+                with pytest.raises(StopIteration):
+                    hook.send(FakeOutcome(FakeReport(when, failed=when == "call")))
+            shots.finish()
+        finally:
+            ScreenshotCapture.active = None
+            policy.shutdown()
+        assert attached == [("000 failure (context 0, page 0)", "jpg")]
+
+
+class TestCaptureTotals:
+
+    def test_totals_are_merged_across_workers(self, policy, attached):
+        controller = FakeConfig()
+        for worker in range(2):
+            config = FakeConfig(worker=True)
+            item = FakeItem(config)
+            ScreenshotCapture.active = ScreenshotCapture(policy)
+            ScreenshotCapture.active.watch(FakeContext(FakePage(DASHBOARD, DASHBOARD)))
+            ScreenshotCapture.active.snap("login")
+            ScreenshotCapture.active.snap("login again")
+            run_teardown(item)
+            assert ScreenshotCapture.active is None
+            assert [key for key, _ in item.user_properties] == ["capture_ms", "bytes_saved"]
+            capture_plugin.pytest_sessionfinish(type("Session", (), {"config": config})())
+            node = type("Node", (), {"config": controller, "workeroutput": config.workeroutput})()
+            capture_plugin.pytest_testnodedown(node, None)
+
+        totals = controller._capture_totals
+        assert (totals["taken"], totals["kept"], totals["dropped"]) == (4, 2, 2)
+        assert totals["raw_bytes"] == 4 * len(DASHBOARD)
+        assert totals["bytes_saved"] == totals["raw_bytes"] - totals["kept_bytes"]
+        terminal = FakeTerminalReporter()
+        capture_plugin.pytest_terminal_summary(terminal, controller)
+        assert terminal.lines[0] == "screenshots"
+        assert terminal.lines[1].startswith("4 taken, 2 kept, 2 dropped as repeats")
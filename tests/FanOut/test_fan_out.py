@@ -0,0 +1,130 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.AsyncOnCallFunctions import AsyncOnCallFunctions
+from controller.OnCallFunctions import OnCallFunctions
+from controller.async_base import FanOutError
+
+USERS = [f"rtqa{n}securly.com" for n in range(1, 21)]
+
+
+class FakeContext:
+
+    async def close(self):
+        pass
+
+
+class FakePage:
+
+    def __init__(self, email):
+        self.email = email
+        self.clicks = []
+
+
+class FakeAsyncOnCall(AsyncOnCallFunctions):
+    """Skips the browser: every login gets a fake page, and steps just yield to the event loop."""
+
+    fail_login = ()
+    fail_select = ()
+
+    def __init__(self, pool=None):
+        super().__init__(pool)
+        self.running = 0
+        self.peak = 0
+
+    async def create_logged_in_browser(self, email):
+        handle = f"browser_{self.counter}"
+        self.counter += 1
+        self.browsers[handle] = None
+        self.contexts[handle] = FakeContext()
+        self.pages[handle] = FakePage(email)
+        await asyncio.sleep(0)
+        if email in self.fail_login:
+            raise RuntimeError("login rejected")
+        return handle
+
+    async def select_dashboard_record(self, page, record_id=25973, email="rtqa1securly.com"):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if page.email in self.fail_select:
+            raise AssertionError("record locked")
+        page.clicks.append(record_id)
+        return record_id
+
+
+class FakeOnCall(OnCallFunctions):
+    async_twin = FakeAsyncOnCall
+
+
+class TestAsyncFanOut:
+
+    def run(self, controller, *steps, concurrency=None):
+        async def scenario():
+            handles = await controller.create_logged_in_browsers(USERS, concurrency)
+            return await controller.fan_out(handles, *steps, concurrency=concurrency)
+        return asyncio.run(scenario())
+
+    def test_all_users_act_at_once(self):
+        controller = FakeAsyncOnCall()
+        results = self.run(controller, ("select_dashboard_record", {"record_id": 7}), "select_dashboard_record")
+        assert results == {email: [7, 25973] for email in USERS}
+        assert controller.peak == len(USERS)
+        assert len(controller.contexts) == len(USERS)
+
+    def test_concurrency_limit(self):
+        controller = FakeAsyncOnCall()
+        self.run(controller, "select_dashboard_record", concurrency=5)
+        assert controller.peak == 5
+
+    def test_callable_step_gets_user(self):
+        async def pick_own_record(controller, page, user):
+            return await controller.select_dashboard_record(page, record_id=USERS.index(user), email=user)
+        results = self.run(FakeAsyncOnCall(), pick_own_record)
+        assert [results[email][0] for email in USERS] == list(range(len(USERS)))
+
+    def test_failed_users_skip_later_steps(self):
+        controller = FakeAsyncOnCall()
+        controller.fail_select = {USERS[3]}
+        with pytest.raises(FanOutError, match="1 of 20 users failed") as failure:
+            self.run(controller, "select_dashboard_record", ("select_dashboard_record", {"record_id": 1}))
+        assert failure.value.errors[USERS[3]][0] == "select_dashboard_record"
+        assert failure.value.results[USERS[3]] == []
+        assert failure.value.results[USERS[0]] == [25973, 1]
+
+    def test_failed_login_closes_new_contexts(self):
+        controller = FakeAsyncOnCall()
+        controller.fail_login = {USERS[0]}
+        with pytest.raises(FanOutError, match="login"):
+            asyncio.run(controller.create_logged_in_browsers(USERS))
+        assert controller.contexts == {}
+
+    def test_users_must_be_distinct(self):
+        with pytest.raises(ValueError, match="distinct"):
+            asyncio.run(FakeAsyncOnCall().create_logged_in_browsers(["a@x.com", "A@x.com"]))
+
+
+class TestSyncFanOut:
+
+    def test_runs_on_async_twin(self):
+        results = FakeOnCall().fan_out(USERS[:3], ("select_dashboard_record", {"record_id": 9}))
+        assert results == {email: [9] for email in USERS[:3]}
+
+    def test_errors_reach_the_caller(self):
+        FakeAsyncOnCall.fail_select = {USERS[1]}
+        try:
+            with pytest.raises(FanOutError, match=USERS[1]):
+                FakeOnCall().fan_out(USERS[:3], "select_dashboard_record")
+        finally:
+            FakeAsyncOnCall.fail_select = ()
+
+    def test_needs_async_twin(self):
+        class NoTwin(OnCallFunctions):
+            async_twin = None
+        with pytest.raises(TypeError, match="no async twin"):
+            NoTwin().fan_out(USERS[:1], "select_dashboard_record")
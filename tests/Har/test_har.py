@@ -0,0 +1,77 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.har import HarSettings
+
+NODEID = "tests/OnCall/test_oncall.py::TestOnCall::test_fan_out[chromium]"
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.routes = []
+
+    def route_from_har(self, **options):
+        self.routes.append(options)
+
+
+class AsyncFakeContext(FakeContext):
+
+    async def route_from_har(self, **options):
+        FakeContext.route_from_har(self, **options)
+
+
+def record(settings, labels):
+    settings.begin_test(NODEID)
+    paths = {}
+    for label in labels:
+        context = FakeContext()
+        settings.apply(context, label)
+        paths.setdefault(label, []).append(context.routes[0]["path"])
+    return paths
+
+
+class TestHarSettings:
+
+    def test_files_follow_the_user_not_the_order(self, tmp_path):
+        settings = HarSettings("record", tmp_path)
+        first = record(settings, ["rtqa1@securly.com", "rtqa2@securly.com"])
+        second = record(settings, ["rtqa2@securly.com", "rtqa1@securly.com"])
+        assert first == second
+        assert first["rtqa1@securly.com"] == [
+            tmp_path / "tests_OnCall_test_oncall.py_TestOnCall_test_fan_out_chromium" / "rtqa1_securly.com.har"]
+
+    def test_repeated_and_unlabelled_contexts(self, tmp_path):
+        settings = HarSettings("record", tmp_path)
+        paths = record(settings, ["a@x.com", None, "a@x.com", None])
+        assert [path.name for path in paths["a@x.com"]] == ["a_x.com.har", "a_x.com-2.har"]
+        assert [path.name for path in paths[None]] == ["context-0.har", "context-1.har"]
+
+    def test_replay(self, tmp_path):
+        path = record(HarSettings("record", tmp_path), ["a@x.com"])["a@x.com"][0]
+        path.write_text("{}", encoding="utf-8")
+        replay = HarSettings("replay", tmp_path, strict=True, url="**/api/**")
+        replay.begin_test(NODEID)
+        context = FakeContext()
+        replay.apply(context, "a@x.com")
+        assert context.routes == [{"path": path, "url": "**/api/**", "not_found": "abort"}]
+        with pytest.raises(FileNotFoundError, match="b_x.com.har"):
+            replay.apply(FakeContext(), "b@x.com")
+
+    def test_lenient_replay_goes_live_without_a_recording(self, tmp_path):
+        replay = HarSettings("replay", tmp_path)
+        replay.begin_test(NODEID)
+        context = AsyncFakeContext()
+        asyncio.run(replay.apply_async(context, "a@x.com"))
+        assert context.routes == []
+
+    def test_off_does_nothing(self, tmp_path):
+        context = FakeContext()
+        HarSettings("off", tmp_path).apply(context, "a@x.com")
+        assert context.routes == []
+        with pytest.raises(ValueError, match="Unknown HAR mode"):
+            HarSettings("replay-all")
@@ -0,0 +1,179 @@
+import json
+import subprocess
+import sys
+import os
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller import locators
+from plugins.impact_selection import (MAP_VERSION, ImpactRecorder, ImpactSelector, changed_lines,
+                                      code_ranges, touched)
+
+ROOT = Path(__file__).resolve().parents[2]
+
+LOCATORS = textwrap.dedent('''\
+    ONCALL = LocatorRegistry(
+        "OnCall",
+        login_button=Selector.role("button", name="Log in"),
+        search_input=Selector.test_id("header__search-input"),
+    )
+    ''')
+FLOWS = textwrap.dedent('''\
+    class Flow:
+
+        def login(self, page):
+            return "login"
+
+        def search(self, page):
+            return "search"
+    ''')
+TESTS = {
+    "tests/test_flows.py::test_login": ["controller/flows.py::Flow.login",
+                                        "controller/locators.py::locator:OnCall.login_button"],
+    "tests/test_flows.py::test_search": ["controller/flows.py::Flow.search",
+                                         "controller/locators.py::locator:OnCall.search_input"],
+    "tests/test_flows.py::test_offline": [],
+}
+
+
+class FakeHook:
+
+    def __init__(self):
+        self.deselected = []
+
+    def pytest_deselected(self, items):
+        self.deselected.extend(items)
+
+
+class FakeConfig:
+
+    def __init__(self, root):
+        self.rootpath = root
+        self.hook = FakeHook()
+        self.options = {"--impact-map": ".impact-map.json", "--impact-base": None, "--impact-max-age-days": 14}
+
+    def getoption(self, name):
+        return self.options[name]
+
+
+class FakeItem:
+
+    def __init__(self, nodeid):
+        self.nodeid = nodeid
+
+
+def git(root, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                   cwd=root, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / "controller").mkdir()
+    (tmp_path / "controller" / "locators.py").write_text(LOCATORS, encoding="utf-8")
+    (tmp_path / "controller" / "flows.py").write_text(FLOWS, encoding="utf-8")
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "base")
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=tmp_path, capture_output=True, text=True).stdout.strip()
+    impact_map = {"version": MAP_VERSION, "commit": head, "recorded_at": time.time(), "tests": TESTS}
+    (tmp_path / ".impact-map.json").write_text(json.dumps(impact_map), encoding="utf-8")
+    # The map itself is not a change
+    (tmp_path / ".gitignore").write_text(".impact-map.json\n.gitignore\n", encoding="utf-8")
+    return tmp_path
+
+
+def select(root):
+    config = FakeConfig(root)
+    items = [FakeItem(nodeid) for nodeid in TESTS]
+    selector = ImpactSelector(config)
+    selector.select(config, items)
+    return [item.nodeid.split("::")[1] for item in items], selector.summary
+
+
+def edit(path, old, new):
+    path.write_text(path.read_text(encoding="utf-8").replace(old, new), encoding="utf-8")
+
+
+class TestChangeMapping:
+
+    def test_selectors_get_their_own_ranges(self):
+        ranges = {name: (first, last) for name, first, last in code_ranges(LOCATORS)}
+        assert ranges == {"locator:OnCall.login_button": (3, 3), "locator:OnCall.search_input": (4, 4)}
+        assert touched(code_ranges(LOCATORS), [4]) == {"locator:OnCall.search_input"}
+        assert touched(code_ranges(LOCATORS), [2]) == {"*"}
+
+    def test_changed_lines(self):
+        diff = "@@ -3,2 +3,0 @@\n@@ -9 +8,3 @@\n"
+        assert changed_lines(diff) == ({3, 4, 9}, {3, 8, 9, 10})
+
+
+class TestImpactSelector:
+
+    def test_selector_edit_selects_only_its_tests(self, repo):
+        edit(repo / "controller" / "locators.py", "header__search-input", "header__search-field")
+        selected, summary = select(repo)
+        assert selected == ["test_search"]
+        assert "1 controller methods and locators changed" in summary
+
+    def test_method_edit(self, repo):
+        edit(repo / "controller" / "flows.py", 'return "login"', 'return "sign in"')
+        assert select(repo)[0] == ["test_login"]
+
+    def test_module_level_edit_selects_every_user_of_the_module(self, repo):
+        edit(repo / "controller" / "flows.py", "class Flow:", "FLAG = True\n\n\nclass Flow:")
+        assert select(repo)[0] == ["test_login", "test_search"]
+
+    def test_shared_file_runs_everything(self, repo):
+        (repo / "conftest.py").write_text("", encoding="utf-8")
+        selected, summary = select(repo)
+        assert len(selected) == 3 and "shared files changed" in summary
+
+    def test_other_sources_run_everything(self, repo):
+        (repo / "standin").mkdir()
+        (repo / "standin" / "server.py").write_text("", encoding="utf-8")
+        selected, summary = select(repo)
+        assert len(selected) == 3 and "standin/server.py" in summary
+
+    def test_test_modules_select_their_tests_but_helpers_do_not(self, repo):
+        (repo / "tests").mkdir()
+        (repo / "tests" / "test_flows.py").write_text("", encoding="utf-8")
+        assert select(repo)[0] == ["test_login", "test_search", "test_offline"]
+        (repo / "tests" / "test_flows.py").unlink()
+        (repo / "tests" / "helpers.py").write_text("", encoding="utf-8")
+        assert "tests/helpers.py" in select(repo)[1]
+
+    def test_old_map_runs_everything(self, repo):
+        edit(repo / ".impact-map.json", f'"version": {MAP_VERSION}', '"version": 1')
+        selected, summary = select(repo)
+        assert len(selected) == 3 and "predates locator tracking" in summary
+
+
+class FakeLocator:
+
+    def get_by_text(self, text):
+        return self
+
+
+class FakePage:
+
+    def get_by_test_id(self, test_id):
+        return FakeLocator()
+
+
+class TestImpactRecorder:
+
+    def test_records_resolved_locators(self, monkeypatch):
+        monkeypatch.setattr(locators, "resolve_listeners", [])
+        recorder = ImpactRecorder(ROOT)
+        page = FakePage()
+        locators.ONCALL.on(page).get("search_input")
+        recorder.current = set()
+        locators.ONCALL.on(page).get("search_input")
+        locators.ONCALL.on(page).dashboard_record
+        assert recorder.current == {"controller/locators.py::locator:OnCall.search_input",
+                                    "controller/locators.py::locator:OnCall.dashboard_record"}
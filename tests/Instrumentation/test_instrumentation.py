@@ -0,0 +1,151 @@
+import asyncio
+import sys
+import os
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller import instrumentation
+from controller.AsyncOnCallFunctions import AsyncOnCallFunctions
+from controller.OnCallFunctions import OnCallFunctions
+from controller.base import BaseClass
+from controller.instrumentation import counters, instrument, metrics
+
+
+class FakeFrame:
+    parent_frame = None
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.pages = []
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, value=None):
+        for handler in self.handlers.get(event, ()):
+            handler(value)
+
+
+class FakePage:
+
+    def __init__(self, context=None):
+        self.context = context or FakeContext()
+        self.handlers = {}
+        self.context.emit("page", self)
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def navigate(self, requests):
+        for handler in self.handlers.get("framenavigated", ()):
+            handler(FakeFrame())
+        for n in range(requests):
+            self.context.emit("request", f"request {n}")
+
+
+def watched_page():
+    context = FakeContext()
+    counters.watch(context)
+    return FakePage(context)
+
+
+class Recorder:
+
+    def __init__(self):
+        self.steps = []
+
+    def begin_steps(self, name):
+        self.steps.append(("begin", name))
+
+    def end_steps(self, name, passed=True):
+        self.steps.append(("end", name))
+
+
+class TestNetworkAttribution:
+
+    def test_concurrent_actors_only_see_their_own_traffic(self):
+        async def act(page, requests):
+            for _ in range(requests):
+                page.navigate(1)
+                await asyncio.sleep(0)
+
+        step = instrument(act, "test.concurrent_act")
+
+        async def scenario():
+            await asyncio.gather(step(watched_page(), 3), step(watched_page(), 5))
+        asyncio.run(scenario())
+        action = metrics.actions["test.concurrent_act"]
+        assert action["count"] == 2
+        assert action["requests"] == 8 and action["navigations"] == 8
+
+        # Each call is attributed separately: run one more and compare
+        asyncio.run(step(watched_page(), 2))
+        assert metrics.actions["test.concurrent_act"]["requests"] == 10
+
+    def test_contexts_opened_by_the_step_count(self):
+        async def open_and_load():
+            page = watched_page()
+            page.navigate(4)
+            return page
+
+        other = watched_page()
+
+        async def scenario():
+            await asyncio.gather(instrument(open_and_load, "test.open")(), asyncio.sleep(0))
+            other.navigate(7)
+        asyncio.run(scenario())
+        assert metrics.actions["test.open"]["requests"] == 4
+
+    def test_steps_without_pages_count_nothing(self):
+        page = watched_page()
+        instrument(lambda: page.navigate(3), "test.no_page")()
+        assert metrics.actions["test.no_page"]["requests"] == 0
+
+
+class TestStepListeners:
+
+    def test_only_outermost_steps_per_thread(self, monkeypatch):
+        recorder = Recorder()
+        monkeypatch.setattr(instrumentation, "step_listeners", [recorder])
+        inner = instrument(lambda: None, "inner")
+        outer = instrument(lambda: inner(), "outer")
+        outer()
+        assert recorder.steps == [("begin", "outer"), ("end", "outer")]
+
+        # A step in another thread is outermost there even while this thread is inside one
+        in_thread = instrument(lambda: None, "in_thread")
+
+        def hold():
+            thread = threading.Thread(target=in_thread)
+            thread.start()
+            thread.join()
+        recorder.steps.clear()
+        instrument(hold, "holding")()
+        assert ("begin", "in_thread") in recorder.steps
+
+
+class TestInstrumentClass:
+
+    def test_controller_methods_are_wrapped(self):
+        assert hasattr(vars(OnCallFunctions)["select_dashboard_record"], "__wrapped__")
+
+    def test_inherited_base_steps_are_wrapped_once(self):
+        for controller_class in (OnCallFunctions, AsyncOnCallFunctions):
+            for name in ("create_browser", "close_browser", "enable_automation", "close_all"):
+                wrapped = vars(controller_class)[name]
+                assert wrapped.__wrapped__ is vars(controller_class.__mro__[1])[name]
+        assert not hasattr(vars(BaseClass)["create_browser"], "__wrapped__")
+
+        controller = OnCallFunctions()
+        controller.close_all()
+        assert metrics.actions["OnCallFunctions.close_all"]["count"] >= 1
+
+    def test_subclasses_outside_controller_are_left_alone(self):
+        class FakeOnCall(OnCallFunctions):
+            def select_dashboard_record(self, page, record_id=1, email=None):
+                return record_id
+
+        assert not hasattr(vars(FakeOnCall)["select_dashboard_record"], "__wrapped__")
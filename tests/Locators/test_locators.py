@@ -0,0 +1,40 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.locators import AWARE, ONCALL, LocatorRegistry, Selector
+
+
+class TestLocatorRegistry:
+
+    def test_shipped_registries_are_valid(self):
+        ONCALL.validate()
+        AWARE.validate()
+
+    def test_parameterised_test_id(self):
+        selector = ONCALL.selectors["add_activity_button"]
+        assert selector.fields() == {"n"}
+        assert selector.value.format(n=12) == "history_flagged-tab_activity-12__add-activity-button"
+
+    @pytest.mark.parametrize("selector, problem", [
+        (Selector.role("buton", name="Close"), "unknown ARIA role"),
+        (Selector.test_id("dashboard record"), "characters outside"),
+        (Selector.test_id("activity-{n"), "bad template"),
+        (Selector.test_id("activity-{0}"), "plain names"),
+        (Selector.test_id("activity-{n}", m=1), "defaults for unknown parameters"),
+        (Selector.by_text("Close", name="Close"), "only applies to role selectors"),
+        (Selector("css", "div > a"), "unknown kind"),
+    ])
+    def test_invalid_selectors_fail_at_creation(self, selector, problem):
+        with pytest.raises(ValueError, match=problem):
+            LocatorRegistry("Broken", broken=selector)
+
+    def test_duplicate_test_ids(self):
+        with pytest.raises(ValueError, match="same test id as first"):
+            LocatorRegistry("Broken", first=Selector.test_id("a__button"), second=Selector.test_id("a__button"))
+
+    def test_missing_parameters(self):
+        with pytest.raises(KeyError, match="n"):
+            ONCALL.selectors["add_activity_button"].build(page=None, params={})
@@ -0,0 +1,121 @@
+import logging
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from plugins import logging_pipeline
+from plugins.logging_pipeline import AllureLogBuffer, attach_log, parse_log_levels
+
+NODEID = "tests/OnCall/test_oncall.py::TestOnCall::test_login"
+
+
+def record(message, name="controller", level=logging.INFO, nodeid=NODEID):
+    entry = logging.LogRecord(name, level, __file__, 1, message, None, None)
+    entry.nodeid = nodeid
+    return entry
+
+
+class FakeReport:
+
+    def __init__(self, failed=False):
+        self.failed = failed
+
+
+class FakePipeline:
+
+    def __init__(self, buffer):
+        self.allure_buffer = buffer
+        self.flushed = 0
+
+    def flush(self):
+        self.flushed += 1
+
+
+class FakeConfig:
+
+    def __init__(self, buffer, log_on="failure"):
+        self._log_pipeline = FakePipeline(buffer)
+        self.log_on = log_on
+
+    def getini(self, name):
+        assert name == "allure_log_on"
+        return self.log_on
+
+
+class FakeItem:
+
+    def __init__(self, config, setup=False, call=False):
+        self.nodeid = NODEID
+        self.config = config
+        self.rep_setup = FakeReport(setup)
+        self.rep_call = FakeReport(call)
+
+
+@pytest.fixture
+def attached(monkeypatch):
+    attachments = []
+    monkeypatch.setattr(logging_pipeline.allure, "attach",
+                        lambda body, name, attachment_type: attachments.append((name, body)))
+    return attachments
+
+
+class TestAllureLogBuffer:
+
+    def test_capacity_keeps_the_newest_records(self):
+        buffer = AllureLogBuffer(capacity=3)
+        for n in range(5):
+            buffer.handle(record(f"step {n}"))
+        buffer.handle(record("other test", nodeid="tests/other.py::test_other"))
+        assert buffer.dropped == {NODEID: 2}
+        lines = buffer.pop(NODEID).splitlines()
+        assert lines[0] == "... 2 earlier records dropped (allure_log_capacity=3)"
+        assert [line.rsplit(" - ", 1)[1] for line in lines[1:]] == ["step 2", "step 3", "step 4"]
+        assert buffer.pop(NODEID) == "" and NODEID not in buffer.dropped
+        assert buffer.pop("tests/other.py::test_other").endswith("other test")
+
+    def test_records_outside_a_test_are_ignored(self):
+        buffer = AllureLogBuffer()
+        buffer.handle(record("collection", nodeid=""))
+        assert buffer.buffers == {}
+
+    def test_longest_logger_prefix_wins(self):
+        levels = parse_log_levels(["playwright=WARNING", "playwright._impl=DEBUG", "urllib3 = error"])
+        buffer = AllureLogBuffer(levels=levels)
+        kept = [entry.name for entry in (
+            record("a", "playwright"),
+            record("b", "playwright.sync_api"),
+            record("c", "playwright._impl._connection", logging.DEBUG),
+            record("d", "playwrightish"),
+            record("e", "urllib3.connectionpool", logging.WARNING),
+        ) if buffer.filter(entry)]
+        assert kept == ["playwright._impl._connection", "playwrightish"]
+
+
+class TestAttachLog:
+
+    def test_only_failed_tests_get_the_log(self, attached):
+        buffer = AllureLogBuffer()
+        config = FakeConfig(buffer)
+        buffer.handle(record("passing"))
+        attach_log(FakeItem(config), FakeReport())
+        assert attached == [] and buffer.buffers == {}
+
+        buffer.handle(record("failing"))
+        attach_log(FakeItem(config, call=True), FakeReport())
+        buffer.handle(record("broken teardown"))
+        attach_log(FakeItem(config), FakeReport(failed=True))
+        assert [(name, body.rsplit(" - ", 1)[1]) for name, body in attached] == [
+            ("log", "failing"), ("log", "broken teardown")]
+        assert config._log_pipeline.flushed == 3
+
+    def test_always(self, attached):
+        buffer = AllureLogBuffer()
+        buffer.handle(record("passing"))
+        attach_log(FakeItem(FakeConfig(buffer, log_on="always")), FakeReport())
+        assert len(attached) == 1
+
+    def test_nothing_logged_attaches_nothing(self, attached):
+        attach_log(FakeItem(FakeConfig(AllureLogBuffer(), log_on="always"), setup=True), FakeReport())
+        assert attached == []
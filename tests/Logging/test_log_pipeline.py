@@ -0,0 +1,108 @@
+import logging
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from plugins import logging_pipeline
+from plugins.logging_pipeline import LogPipeline
+
+NODEID = "tests/OnCall/test_oncall.py::TestOnCall::test_login"
+
+
+class FakeConfig:
+
+    def __init__(self, queue_size=10000, log_file=""):
+        self.ini = {
+            "log_queue_size": str(queue_size),
+            "allure_log_capacity": "2000",
+            "allure_log_levels": [],
+            "log_pipeline_file": log_file,
+            "log_root_level": "DEBUG",
+        }
+
+    def getini(self, name):
+        return self.ini[name]
+
+
+class FakeTerminalReporter:
+
+    def __init__(self):
+        self.lines = []
+
+    def write_line(self, line, **markup):
+        self.lines.append(line)
+
+
+def record(message, *args):
+    return logging.LogRecord("controller", logging.INFO, __file__, 1, message, args or None, None)
+
+
+@pytest.fixture
+def in_test(monkeypatch):
+    monkeypatch.setitem(logging_pipeline.log_context, "nodeid", NODEID)
+    monkeypatch.setitem(logging_pipeline.log_context, "worker", "gw3")
+
+
+@pytest.fixture
+def root_level():
+    level = logging.getLogger().level
+    yield
+    logging.getLogger().setLevel(level)
+
+
+class TestContextQueueHandler:
+
+    def test_records_are_stamped_and_merged(self, in_test):
+        pipeline = LogPipeline(FakeConfig())
+        users = ["rtqa1"]
+        pipeline.queue_handler.handle(record("users %s", users))
+        users.append("rtqa2")
+        queued = pipeline.queue.get_nowait()
+        assert (queued.nodeid, queued.worker) == (NODEID, "gw3")
+        assert (queued.msg, queued.args) == ("users ['rtqa1']", None)
+        assert queued.getMessage() == "users ['rtqa1']"
+
+    def test_full_queue_drops_and_reports(self, in_test):
+        config = FakeConfig(queue_size=2)
+        config._log_pipeline = pipeline = LogPipeline(config)
+        for n in range(5):
+            pipeline.queue_handler.handle(record(f"step {n}"))
+        assert pipeline.dropped == 3 and pipeline.queue.qsize() == 2
+        terminal = FakeTerminalReporter()
+        logging_pipeline.pytest_terminal_summary(terminal, config)
+        assert terminal.lines == ["log pipeline: 3 records dropped because the queue was full (log_queue_size=2)"]
+
+    def test_nothing_dropped_nothing_reported(self):
+        config = FakeConfig()
+        config._log_pipeline = LogPipeline(config)
+        terminal = FakeTerminalReporter()
+        logging_pipeline.pytest_terminal_summary(terminal, config)
+        assert terminal.lines == []
+
+
+class TestLogPipeline:
+
+    def test_flush_drains_before_pop(self, in_test, root_level, tmp_path):
+        pipeline = LogPipeline(FakeConfig(log_file=str(tmp_path / "pipeline.log")))
+        pipeline.start()
+        try:
+            for n in range(200):
+                logging.getLogger("controller").info("step %d", n)
+            pipeline.flush()
+            assert pipeline.queue.unfinished_tasks == 0
+            lines = pipeline.allure_buffer.pop(NODEID).splitlines()
+            assert len(lines) == 200 and lines[-1].endswith("step 199")
+        finally:
+            pipeline.stop()
+        assert " - gw3 - INFO - controller - " + NODEID + " - step 0" in (tmp_path / "pipeline.log").read_text()
+
+    def test_stop_joins_the_listener(self, root_level):
+        pipeline = LogPipeline(FakeConfig())
+        pipeline.start()
+        thread = pipeline.listener._thread
+        assert thread.is_alive()
+        pipeline.stop()
+        assert not thread.is_alive() and pipeline.listener._thread is None
+        assert pipeline.queue_handler not in logging.getLogger().handlers
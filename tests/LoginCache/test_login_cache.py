@@ -0,0 +1,221 @@
+import asyncio
+import json
+import sys
+import os
+import threading
+import time
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.AsyncOnCallFunctions import AsyncOnCallFunctions
+from controller.OnCallFunctions import OnCallFunctions
+from controller.login_cache import LoginCache, file_lock, local_storage_script
+
+LOGIN_URL = "https://oncall.test/login"
+STATE = {
+    "cookies": [{"name": "sid", "value": "abc", "domain": "oncall.test", "path": "/"}],
+    "origins": [{"origin": "https://oncall.test", "localStorage": [{"name": "token", "value": "t0k"}]}],
+}
+
+
+class FakeLocator:
+
+    def __init__(self, page, name):
+        self.page = page
+        self.name = name
+
+    def get_by_text(self, text):
+        return self
+
+    def or_(self, other):
+        return FakeLocator(self.page, f"{self.name}|{other.name}")
+
+    @property
+    def first(self):
+        return self
+
+    def wait_for(self, state="visible", timeout=None):
+        if not set(self.name.split("|")) & self.page.shown:
+            raise PlaywrightTimeoutError("nothing visible")
+
+    def is_visible(self):
+        return self.name in self.page.shown
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.cookies = []
+        self.scripts = []
+
+    def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    def add_init_script(self, script):
+        self.scripts.append(script)
+
+
+class FakePage:
+
+    def __init__(self, *shown):
+        self.context = FakeContext()
+        self.shown = set(shown)
+        self.visited = []
+
+    def goto(self, url):
+        self.visited.append(url)
+
+    def get_by_test_id(self, test_id):
+        return FakeLocator(self, "dashboard")
+
+    def get_by_role(self, role, name=None, exact=None):
+        return FakeLocator(self, "signin")
+
+
+class AsyncFakeLocator(FakeLocator):
+
+    def or_(self, other):
+        return AsyncFakeLocator(self.page, f"{self.name}|{other.name}")
+
+    async def wait_for(self, state="visible", timeout=None):
+        FakeLocator.wait_for(self, state, timeout)
+
+    async def is_visible(self):
+        return FakeLocator.is_visible(self)
+
+
+class AsyncFakeContext(FakeContext):
+
+    async def add_cookies(self, cookies):
+        FakeContext.add_cookies(self, cookies)
+
+    async def add_init_script(self, script):
+        FakeContext.add_init_script(self, script)
+
+
+class AsyncFakePage(FakePage):
+
+    def __init__(self, *shown):
+        super().__init__(*shown)
+        self.context = AsyncFakeContext()
+
+    async def goto(self, url):
+        FakePage.goto(self, url)
+
+    def get_by_test_id(self, test_id):
+        return AsyncFakeLocator(self, "dashboard")
+
+    def get_by_role(self, role, name=None, exact=None):
+        return AsyncFakeLocator(self, "signin")
+
+
+def oncall(cache, controller_class=OnCallFunctions):
+    controller = controller_class()
+    controller.login_url = LOGIN_URL
+    controller.login_cache = cache
+    return controller
+
+
+class TestLoginCache:
+
+    def test_round_trip_is_keyed_by_url_and_case_insensitive_email(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        cache.write(STATE, LOGIN_URL, "Rtqa1@securly.com")
+        assert cache.load(LOGIN_URL, "rtqa1@securly.com") == STATE
+        assert cache.load("https://other.test/login", "rtqa1@securly.com") is None
+
+    def test_expired_entries_are_removed(self, tmp_path):
+        cache = LoginCache(tmp_path, ttl=60)
+        path = cache.write(STATE, LOGIN_URL, "a@x.com")
+        stale = time.time() - 120
+        os.utime(path, (stale, stale))
+        assert cache.get(LOGIN_URL, "a@x.com") is None
+        assert not path.exists()
+
+    def test_unreadable_entries_are_discarded(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        cache.path_for(LOGIN_URL, "a@x.com").write_text("{not json", encoding="utf-8")
+        assert cache.load(LOGIN_URL, "a@x.com") is None
+        assert not cache.path_for(LOGIN_URL, "a@x.com").exists()
+
+    def test_readers_wait_for_the_lock(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        path = cache.path_for(LOGIN_URL, "a@x.com")
+        seen = []
+        with file_lock(cache._lock_path(path)):
+            reader = threading.Thread(target=lambda: seen.append(cache.load(LOGIN_URL, "a@x.com")))
+            reader.start()
+            time.sleep(0.1)
+            # The reader is parked on the lock, so it sees the finished write
+            path.write_text(json.dumps(STATE), encoding="utf-8")
+        reader.join(5)
+        assert seen == [STATE]
+
+    def test_local_storage_script(self):
+        assert local_storage_script({"cookies": []}) is None
+        script = local_storage_script(STATE)
+        assert '"https://oncall.test": [{"name": "token", "value": "t0k"}]' in script
+
+
+class TestResumeCachedSession:
+
+    def test_without_cache_nothing_is_loaded(self, tmp_path):
+        page = FakePage("dashboard")
+        assert not oncall(LoginCache(tmp_path)).resume_cached_session(page, "a@x.com")
+        assert page.visited == []
+
+    def test_dashboard_accepts_session_and_restores_storage(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        cache.write(STATE, LOGIN_URL, "a@x.com")
+        page = FakePage("dashboard")
+        assert oncall(cache).resume_cached_session(page, "a@x.com")
+        assert page.context.cookies == STATE["cookies"]
+        assert len(page.context.scripts) == 1
+        assert cache.get(LOGIN_URL, "a@x.com") is not None
+
+    def test_sign_in_page_rejects_session(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        cache.write(STATE, LOGIN_URL, "a@x.com")
+        assert not oncall(cache).resume_cached_session(FakePage("signin"), "a@x.com")
+        assert cache.get(LOGIN_URL, "a@x.com") is None
+
+    def test_nothing_rendering_counts_as_rejected(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        cache.write(STATE, LOGIN_URL, "a@x.com")
+        assert not oncall(cache).resume_cached_session(FakePage(), "a@x.com", timeout_ms=10)
+        assert cache.get(LOGIN_URL, "a@x.com") is None
+
+
+class TestAsyncResumeCachedSession:
+
+    def test_waiting_for_the_lock_leaves_the_loop_running(self, tmp_path):
+        cache = LoginCache(tmp_path)
+        cache.write(STATE, LOGIN_URL, "a@x.com")
+        held = threading.Event()
+
+        def hold_lock():
+            with file_lock(cache._lock_path(cache.path_for(LOGIN_URL, "a@x.com"))):
+                held.set()
+                time.sleep(0.2)
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(5)
+
+        async def scenario():
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.01)
+            ticker = asyncio.create_task(tick())
+            resumed = await oncall(cache, AsyncOnCallFunctions).resume_cached_session(AsyncFakePage("signin"),
+                                                                                      "a@x.com")
+            ticker.cancel()
+            return resumed, ticks
+        resumed, ticks = asyncio.run(scenario())
+        holder.join(5)
+        # Other actors kept running while this one was parked on the lock
+        assert not resumed and len(ticks) >= 5
+        assert cache.get(LOGIN_URL, "a@x.com") is None
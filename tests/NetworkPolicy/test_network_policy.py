@@ -0,0 +1,118 @@
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.network_policy import NetworkPolicy
+
+
+class FakeRequest:
+
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    def abort(self, error_code=None):
+        self.outcome = error_code
+
+    def fallback(self):
+        self.outcome = "fallback"
+
+
+class AsyncFakeRoute(FakeRoute):
+
+    async def abort(self, error_code=None):
+        FakeRoute.abort(self, error_code)
+
+    async def fallback(self):
+        FakeRoute.fallback(self)
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.routes = []
+
+    def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    def load(self, *requests, route_class=FakeRoute):
+        routes = [route_class(url, resource_type) for url, resource_type in requests]
+        for route in routes:
+            self.routes[0][1](route)
+        return [route.outcome for route in routes]
+
+
+class AsyncFakeContext(FakeContext):
+
+    async def route(self, pattern, handler):
+        FakeContext.route(self, pattern, handler)
+
+    def load(self, *requests, route_class=AsyncFakeRoute):
+        routes = [route_class(url, resource_type) for url, resource_type in requests]
+
+        async def handle_all():
+            for route in routes:
+                await self.routes[0][1](route)
+        asyncio.run(handle_all())
+        return [route.outcome for route in routes]
+
+
+PAGE_LOAD = [
+    ("https://oncall.test/24/login", "document"),
+    ("https://oncall.test/app.js", "script"),
+    ("https://oncall.test/logo.png", "image"),
+    ("https://fonts.test/inter.woff2", "font"),
+    ("https://analytics.test/collect", "xhr"),
+]
+
+
+class TestNetworkPolicy:
+
+    def test_blocks_types_and_urls_and_counts_them(self):
+        policy = NetworkPolicy(block_resource_types=["image", "font"], block_urls=["https://analytics.test/*"])
+        context = FakeContext()
+        policy.apply(context)
+        assert context.load(*PAGE_LOAD) == ["fallback", "fallback"] + ["blockedbyclient"] * 3
+        assert policy.stats() == {
+            "requests": 5,
+            "blocked": 3,
+            "blocked_by_type": {"image": 1, "font": 1, "xhr": 1},
+        }
+
+    def test_allowlist_blocks_everything_else(self):
+        policy = NetworkPolicy(block_resource_types=["script"], allow_urls=["https://oncall.test/*"])
+        assert policy.should_block("https://fonts.test/inter.woff2", "font")
+        # allowlist mode ignores the blocklists
+        assert not policy.should_block("https://oncall.test/app.js", "script")
+
+    def test_disabled_policy_does_not_route(self):
+        policy = NetworkPolicy(block_resource_types=["image"]).copy(enabled=False)
+        context = FakeContext()
+        policy.apply(context)
+        assert context.routes == []
+        assert not policy.should_block("https://oncall.test/logo.png", "image")
+
+    def test_copy_overrides_and_keeps_separate_stats(self):
+        policy = NetworkPolicy(block_resource_types=["image"])
+        override = policy.copy(block_urls=["*/collect"])
+        context = FakeContext()
+        override.apply(context)
+        context.load(*PAGE_LOAD)
+        assert override.block_resource_types == {"image"}
+        assert override.stats()["blocked"] == 2
+        assert policy.stats()["requests"] == 0
+
+    def test_async_contexts(self):
+        policy = NetworkPolicy(block_resource_types=["image", "font"])
+        context = AsyncFakeContext()
+        asyncio.run(policy.apply_async(context))
+        assert context.load(*PAGE_LOAD).count("blockedbyclient") == 2
+        assert policy.stats()["blocked_by_type"] == {"image": 1, "font": 1}
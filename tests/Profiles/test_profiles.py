@@ -0,0 +1,118 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.base import BrowserPool
+from controller.profiles import PROFILES, Profile, get_profile
+
+
+class FakeBrowser:
+
+    def __init__(self, options):
+        self.options = options
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    def new_context(self, **options):
+        context = FakeContext(self, options)
+        self.contexts.append(context)
+        return context
+
+
+class FakeContext:
+
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+
+    def new_page(self):
+        return object()
+
+    def close(self):
+        self.browser.contexts.remove(self)
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.launches = []
+
+    def launch(self, **options):
+        self.launches.append(options)
+        return FakeBrowser(options)
+
+
+class FakePlaywright:
+
+    def __init__(self):
+        self.chromium = FakeEngine()
+        self.firefox = FakeEngine()
+
+
+def fake_pool(profile):
+    pool = BrowserPool()
+    pool.profile = profile
+    pool.pw = FakePlaywright()
+    return pool
+
+
+class TestProfiles:
+
+    def test_local_keeps_headed_firefox(self):
+        assert PROFILES["local"].resolve() == ("firefox", "headed")
+        assert PROFILES["local"].launch_options("firefox", "headed") == {"headless": False}
+
+    def test_selection_from_environment(self, monkeypatch):
+        monkeypatch.setenv("PW_PROFILE", "debug")
+        assert get_profile().name == "debug"
+        assert get_profile("ci-fast").name == "ci-fast"
+        monkeypatch.setenv("PW_PROFILE", "nope")
+        with pytest.raises(ValueError, match="Unknown execution profile"):
+            get_profile()
+
+    @pytest.mark.parametrize("engine, headless, expected", [
+        (None, None, ("chromium", "shell")),
+        ("firefox", None, ("firefox", "headless")),
+        ("chromium", False, ("chromium", "headed")),
+        ("chromium", True, ("chromium", "shell")),
+    ])
+    def test_explicit_arguments_win(self, engine, headless, expected):
+        assert PROFILES["ci-fast"].resolve(engine, headless) == expected
+
+    def test_launch_options(self):
+        profile = PROFILES["cross-browser"]
+        chromium = profile.launch_options(*profile.resolve("chromium"))
+        assert chromium["headless"] and chromium["channel"] == "chromium"
+        assert "--disable-dev-shm-usage" in chromium["args"]
+        assert profile.launch_options(*profile.resolve("webkit")) == {"headless": True}
+        assert PROFILES["debug"].launch_options("chromium", "headed")["slow_mo"] == 250
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError, match="Unknown headless mode"):
+            Profile("broken", mode="invisible")
+
+
+class TestPoolProfile:
+
+    def test_checkout_uses_profile_viewport(self):
+        pool = fake_pool(PROFILES["ci-fast"])
+        _, context, _ = pool.checkout()
+        assert context.options["viewport"] == {"width": 1280, "height": 720}
+        _, context, _ = pool.checkout(viewport={"width": 400, "height": 300})
+        assert context.options["viewport"] == {"width": 400, "height": 300}
+        assert len(pool.pw.chromium.launches) == 1
+        assert pool.report()["launches"].keys() == {"chromium:shell"}
+
+    def test_pool_size_spreads_busy_contexts(self):
+        pool = fake_pool(PROFILES["ci-fast"].copy(pool_size=2))
+        contexts = [pool.checkout()[1] for _ in range(4)]
+        assert len(pool.pw.chromium.launches) == 2
+        assert [len(browser.contexts) for browser in pool.browsers[("chromium", "shell")]] == [2, 2]
+        for context in contexts:
+            pool.release(context)
+        pool.checkout()
+        assert len(pool.pw.chromium.launches) == 2
@@ -0,0 +1,152 @@
+import csv
+import json
+import sys
+import os
+import shutil
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from reporting.incremental_report import IncrementalReport, md5
+
+REPORT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'allure-report'))
+
+
+def write_result(results, name, status="passed", start=1000, feature="OnCall", story="Smoke", message=None):
+    result = {
+        "uuid": str(uuid.uuid4()),
+        "historyId": md5(name),
+        "name": name,
+        "fullName": f"tests.OnCall.test_oncall.TestOnCallTestKeywords#{name}",
+        "status": status,
+        "start": start,
+        "stop": start + 10,
+        "labels": [
+            {"name": "feature", "value": feature},
+            {"name": "story", "value": story},
+            {"name": "parentSuite", "value": "tests.OnCall"},
+            {"name": "suite", "value": "test_oncall"},
+            {"name": "subSuite", "value": "TestOnCallTestKeywords"},
+            {"name": "package", "value": "tests.OnCall.test_oncall"},
+        ],
+    }
+    if message:
+        result["statusDetails"] = {"message": message}
+    results.mkdir(parents=True, exist_ok=True)
+    (results / f"{result['uuid']}-result.json").write_text(json.dumps(result), encoding="utf-8")
+    return result
+
+
+def leaves(node):
+    if "children" not in node:
+        return [node]
+    return [leaf for child in node["children"] for leaf in leaves(child)]
+
+
+def read(report, relative):
+    with open(report / relative, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestIncrementalReport:
+
+    def test_every_aggregate_follows_the_latest_cases(self, tmp_path):
+        report = tmp_path / "report"
+        write_result(tmp_path / "run1", "test_a")
+        write_result(tmp_path / "run1", "test_b", status="broken", message="boom")
+        IncrementalReport(report).update(tmp_path / "run1")
+        write_result(tmp_path / "run2", "test_b", start=2000, story="Second")
+        added, _, _ = IncrementalReport(report).update(tmp_path / "run2")
+        assert added == 1
+
+        for tree in ("suites", "behaviors", "packages", "timeline"):
+            uids = sorted(leaf["uid"] for leaf in leaves(read(report, f"data/{tree}.json")))
+            assert len(uids) == 2, tree
+            for uid in uids:
+                assert (report / "data" / "test-cases" / f"{uid}.json").exists()
+        stories = {leaf["name"]: node["name"] for node in read(report, "data/behaviors.json")["children"][0]["children"]
+                   for leaf in node["children"]}
+        assert stories == {"test_a": "Smoke", "test_b": "Second"}
+        # test_b was fixed, so nothing is left in the categories
+        assert read(report, "data/categories.json")["children"] == []
+        assert read(report, "widgets/categories.json")["total"] == 0
+        assert read(report, "widgets/behaviors.json")["items"][0]["statistic"]["passed"] == 2
+        with open(report / "data/behaviors.csv", encoding="utf-8") as f:
+            assert len(list(csv.reader(f))) == 3
+        assert "launch_status_passed 2" in (report / "export/prometheusData.txt").read_text(encoding="utf-8")
+        trend = read(report, "history/history-trend.json")
+        assert [entry["buildOrder"] for entry in trend] == [2, 1]
+        assert trend[1]["data"]["broken"] == 1
+
+    def test_retention_prunes_test_case_files(self, tmp_path):
+        report = tmp_path / "report"
+        for run in range(4):
+            write_result(tmp_path / f"run{run}", "test_a", start=run * 1000)
+            IncrementalReport(report, retention=2).update(tmp_path / f"run{run}")
+        history = read(report, "history/history.json")[md5("test_a")]["items"]
+        files = {path.stem for path in (report / "data" / "test-cases").glob("*.json")}
+        assert files == {item["uid"] for item in history}
+        assert len(files) == 2
+        assert len(read(report, "history/history-trend.json")) == 2
+
+    def test_index_keeps_only_the_retained_launches(self, tmp_path):
+        report = tmp_path / "report"
+        results = tmp_path / "allure-results"
+        for run in range(6):
+            # allure-results is never cleaned, so every earlier file is still there
+            write_result(results, f"test_{run % 2}", start=(run + 1) * 1000)
+            added, _, _ = IncrementalReport(report, retention=2).update(results)
+            assert added == 1
+        index = read(report, ".incremental/index.json")
+        assert len(index["processed"]) == 2 and len(index["files"]) == 2
+        assert sorted(index["processed"].values()) == [5, 6]
+
+        # Expired files are behind the horizon: not read, not merged again
+        assert IncrementalReport(report, retention=2).update(results)[0] == 0
+        assert read(report, ".incremental/index.json")["files"] == index["files"]
+
+    def test_only_evicted_case_files_are_deleted(self, tmp_path):
+        report = tmp_path / "report"
+        write_result(tmp_path / "run0", "test_a")
+        IncrementalReport(report, retention=1).update(tmp_path / "run0")
+        stray = report / "data" / "test-cases" / "not-ours.json"
+        stray.write_text("{}", encoding="utf-8")
+        write_result(tmp_path / "run1", "test_a", start=2000)
+        _, pruned, _ = IncrementalReport(report, retention=1).update(tmp_path / "run1")
+        assert pruned == 1 and stray.exists()
+        assert len(list((report / "data" / "test-cases").glob("*.json"))) == 2
+
+    def test_migrates_a_version_2_index(self, tmp_path):
+        report = tmp_path / "report"
+        results = tmp_path / "allure-results"
+        first = write_result(results, "test_a")
+        IncrementalReport(report, retention=1).update(results)
+        index = read(report, ".incremental/index.json")
+        index.update(version=2, processed={first["uuid"]: md5(first["uuid"])[:16]},
+                     files=dict.fromkeys(index["files"], True))
+        del index["horizon"]
+        (report / ".incremental" / "index.json").write_text(json.dumps(index), encoding="utf-8")
+
+        write_result(results, "test_b", start=2000)
+        assert IncrementalReport(report, retention=1).update(results)[0] == 1
+        index = read(report, ".incremental/index.json")
+        assert index["version"] == 3 and len(index["processed"]) == 1 and len(index["files"]) == 1
+
+    def test_seeds_from_a_generated_report(self, tmp_path):
+        report = tmp_path / "report"
+        shutil.copytree(REPORT, report, ignore=lambda directory, names: ["attachments"] if directory.endswith("data") else [])
+        before = {leaf["uid"] for leaf in leaves(read(report, "data/suites.json"))}
+        old_trend = read(report, "history/history-trend.json")
+
+        write_result(tmp_path / "run", "test_new", feature="aware", story="")
+        IncrementalReport(report).update(tmp_path / "run")
+
+        after = {leaf["uid"] for leaf in leaves(read(report, "data/suites.json"))}
+        assert before < after and len(after) == len(before) + 1
+        assert {leaf["uid"] for leaf in leaves(read(report, "data/behaviors.json"))} == after
+        trend = read(report, "history/history-trend.json")
+        assert len(trend) == len(old_trend) + 1
+        assert trend[1]["data"] == old_trend[0]["data"]
+        # Retries of the cases that are still shown are kept
+        for uid in before:
+            for retry in read(report, f"data/test-cases/{uid}.json")["extra"]["retries"]:
+                assert (report / "data" / "test-cases" / f"{retry['uid']}.json").exists()
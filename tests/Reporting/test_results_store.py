@@ -0,0 +1,71 @@
+import json
+import sys
+import os
+
+from allure_commons import model2
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from reporting.results_store import ResultsStore, export, iter_entries
+
+
+def store_for(tmp_path, worker="gw0"):
+    return ResultsStore(tmp_path / "store", worker=worker, inline_limit=8)
+
+
+class TestResultsStore:
+
+    def test_export_round_trip(self, tmp_path):
+        store = store_for(tmp_path)
+        store.report_result(model2.TestResult(uuid="r1", name="test_login", status=model2.Status.PASSED,
+                                              start=1, stop=2))
+        store.report_container(model2.TestResultContainer(uuid="c1", children=["r1"]))
+        store.report_attached_data("small", "a-attachment.txt")
+        store.report_attached_data(b"x" * 100, "b-attachment.txt")
+        store.close()
+
+        counts = export(tmp_path / "store", tmp_path / "results")
+        assert counts == {"result": 1, "container": 1, "attachment": 2}
+        results = {path.name: path for path in (tmp_path / "results").iterdir()}
+        result = json.loads(next(path for name, path in results.items() if name.endswith("-result.json")).read_text())
+        assert result == {"uuid": "r1", "name": "test_login", "status": "passed", "start": 1, "stop": 2}
+        assert results["a-attachment.txt"].read_bytes() == b"small"
+        assert results["b-attachment.txt"].read_bytes() == b"x" * 100
+
+    def test_large_attachments_are_stored_once(self, tmp_path):
+        store = store_for(tmp_path)
+        screenshot = tmp_path / "shot.png"
+        screenshot.write_bytes(b"png" * 50)
+        store.report_attached_file(screenshot, "1-attachment.png")
+        store.report_attached_file(screenshot, "2-attachment.png")
+        store.report_attached_data(b"png" * 50, "3-attachment.png")
+        store.close()
+        assert (store.blobs_written, store.blobs_reused) == (1, 2)
+        assert len([path for path in store.blob_dir.rglob("*") if path.is_file()]) == 1
+
+        export(tmp_path / "store", tmp_path / "results")
+        exported = sorted((tmp_path / "results").iterdir())
+        assert [path.read_bytes() for path in exported] == [b"png" * 50] * 3
+
+    def test_workers_write_their_own_files(self, tmp_path):
+        for worker in ("gw0", "gw1"):
+            store = store_for(tmp_path, worker)
+            store.report_result(model2.TestResult(uuid=worker, name=f"test_{worker}"))
+            store.close()
+        assert sorted(path.name for path in (tmp_path / "store").glob("*.ndjson")) == ["gw0.ndjson", "gw1.ndjson"]
+        assert [entry["data"]["uuid"] for entry in iter_entries(tmp_path / "store")] == ["gw0", "gw1"]
+
+    def test_torn_last_line_is_skipped(self, tmp_path):
+        store = store_for(tmp_path)
+        store.report_result(model2.TestResult(uuid="r1", name="test_login"))
+        store.close()
+        with open(store.path, "a", encoding="utf-8") as f:
+            f.write('{"kind": "result", "fi')
+        assert [entry["data"]["uuid"] for entry in iter_entries(tmp_path / "store")] == ["r1"]
+
+    def test_clean_export_replaces_old_results(self, tmp_path):
+        results = tmp_path / "results"
+        results.mkdir()
+        (results / "stale-result.json").write_text("{}", encoding="utf-8")
+        store_for(tmp_path).close()
+        assert export(tmp_path / "store", results, clean=True) == {}
+        assert list(results.iterdir()) == []
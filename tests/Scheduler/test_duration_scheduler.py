@@ -0,0 +1,160 @@
+import json
+import sys
+import os
+
+import pytest
+from allure_commons.utils import md5
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from plugins.duration_scheduler import (CACHE_KEY, NODE_CACHE_KEY, DurationScheduler, assign_longest_first,
+                                        build_duration_cache)
+
+MODULE = "tests/OnCall/test_oncall.py::TestOnCall::"
+
+
+class FakeCache:
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def get(self, key, default):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = json.loads(json.dumps(value))
+
+
+class FakeConfig:
+
+    def __init__(self, root, workers=None, default_ms=None, cache=None):
+        self.rootpath = root
+        self.cache = cache or FakeCache()
+        self.options = {"--lpt-history": "history.json", "--lpt-results": "results",
+                        "--lpt-default-ms": default_ms}
+        if workers:
+            self.workerinput = {"workercount": workers}
+
+    def getoption(self, name):
+        return self.options[name]
+
+
+class FakeItem:
+
+    def __init__(self, name, marker=None):
+        self.nodeid = MODULE + name
+        self.stash = {}
+        self.markers = [marker] if marker else []
+
+    def get_closest_marker(self, name):
+        return next((marker for marker in self.markers if marker.name == name), None)
+
+    def add_marker(self, marker):
+        self.markers.append(marker.mark)
+
+    @property
+    def group(self):
+        return self.get_closest_marker("xdist_group").args[0]
+
+
+class FakeReport:
+
+    def __init__(self, nodeid, when, duration, gateway=None):
+        self.nodeid = nodeid
+        self.when = when
+        self.duration = duration
+        if gateway:
+            self.node = type("Node", (), {"gateway": type("Gateway", (), {"id": gateway})})()
+
+
+def history_id(name):
+    return md5(f"tests.OnCall.test_oncall.TestOnCall#{name}")
+
+
+def write_history(root, durations):
+    history = {history_id(name): {"items": [{"time": {"duration": value}} for value in values]}
+               for name, values in durations.items()}
+    (root / "history.json").write_text(json.dumps(history), encoding="utf-8")
+
+
+def write_result(root, name, duration):
+    results = root / "results"
+    results.mkdir(exist_ok=True)
+    result = {"historyId": history_id(name), "start": 1000, "stop": 1000 + duration}
+    (results / f"{name}-result.json").write_text(json.dumps(result), encoding="utf-8")
+
+
+class TestAssignLongestFirst:
+
+    def test_longest_tests_are_spread_first(self):
+        assignment, loads = assign_longest_first({"a": 7, "b": 5, "c": 4, "d": 3, "e": 1}, 2)
+        assert assignment == {"a": 0, "b": 1, "c": 1, "d": 0, "e": 1}
+        assert loads == [10, 10]
+
+    def test_ties_are_deterministic(self):
+        estimates = {"x": 1, "y": 1, "z": 1}
+        assert assign_longest_first(estimates, 2) == assign_longest_first(dict(reversed(estimates.items())), 2)
+
+
+class TestDurationCache:
+
+    def test_fresh_results_win_over_history(self, tmp_path):
+        write_history(tmp_path, {"test_login": [100, 300, 200], "test_search": [50]})
+        write_result(tmp_path, "test_search", 80)
+        durations = build_duration_cache(FakeConfig(tmp_path))
+        assert durations == {history_id("test_login"): 200, history_id("test_search"): 80}
+
+    def test_cache_is_reused_until_sources_change(self, tmp_path):
+        write_history(tmp_path, {"test_login": [100]})
+        config = FakeConfig(tmp_path)
+        build_duration_cache(config)
+        stamp = config.cache.values[CACHE_KEY]["stamp"]
+        config.cache.values[CACHE_KEY]["durations"] = {"cached": 1}
+        assert build_duration_cache(config) == {"cached": 1}
+
+        write_history(tmp_path, {"test_login": [400]})
+        os.utime(tmp_path / "history.json", (stamp + 10, stamp + 10))
+        assert build_duration_cache(config) == {history_id("test_login"): 400}
+
+    def test_missing_sources(self, tmp_path):
+        assert build_duration_cache(FakeConfig(tmp_path)) == {}
+
+
+class TestDurationScheduler:
+
+    def test_items_are_grouped_into_balanced_bins(self, tmp_path):
+        write_history(tmp_path, {"test_a": [700], "test_b": [500], "test_c": [400], "test_d": [300]})
+        cache = FakeCache()
+        build_duration_cache(FakeConfig(tmp_path, cache=cache))
+        config = FakeConfig(tmp_path, workers=2, cache=cache)
+        items = [FakeItem(name) for name in ("test_a", "test_b", "test_c", "test_d")]
+        scheduler = DurationScheduler(config)
+        scheduler.pytest_collection_modifyitems(config, items)
+        assert [item.group for item in items] == ["lpt0", "lpt1", "lpt1", "lpt0"]
+        assert scheduler.predicted_loads == [1000, 900]
+
+    def test_explicit_groups_are_kept(self, tmp_path):
+        config = FakeConfig(tmp_path, workers=2)
+        items = [FakeItem("test_a", pytest.mark.xdist_group("login").mark), FakeItem("test_b")]
+        DurationScheduler(config).pytest_collection_modifyitems(config, items)
+        assert [item.group for item in items] == ["login", "lpt1"]
+
+    def test_unknown_tests_get_the_median_or_the_default(self, tmp_path):
+        write_history(tmp_path, {"test_a": [100], "test_b": [300], "test_c": [900]})
+        items = [FakeItem(name) for name in ("test_a", "test_b", "test_c", "test_new")]
+        assert DurationScheduler(FakeConfig(tmp_path)).estimates(items)[MODULE + "test_new"] == 300
+        config = FakeConfig(tmp_path, default_ms=50)
+        assert DurationScheduler(config).estimates(items)[MODULE + "test_new"] == 50
+
+    def test_measured_node_durations_win(self, tmp_path):
+        write_history(tmp_path, {"test_a": [100]})
+        config = FakeConfig(tmp_path, cache=FakeCache({NODE_CACHE_KEY: {MODULE + "test_a": 2500}}))
+        assert DurationScheduler(config).estimates([FakeItem("test_a")]) == {MODULE + "test_a": 2500}
+
+    def test_reports_are_summed_per_test_and_worker(self, tmp_path):
+        config = FakeConfig(tmp_path)
+        scheduler = DurationScheduler(config)
+        nodeid = MODULE + "test_a@lpt1"
+        for when, duration in (("setup", 0.5), ("call", 2.0), ("teardown", 0.25)):
+            scheduler.pytest_runtest_logreport(FakeReport(nodeid, when, duration, gateway="gw1"))
+        assert scheduler.node_durations == {MODULE + "test_a": 2750}
+        assert scheduler.actual == {"gw1": 2750}
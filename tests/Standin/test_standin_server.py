@@ -0,0 +1,65 @@
+import sys
+import os
+
+import pytest
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from standin.server import StandinServer, StandinSettings
+
+
+@pytest.fixture()
+def server():
+    with StandinServer(StandinSettings(records=3000, seed=1)) as server:
+        yield server
+
+
+def logged_in_session(server):
+    session = requests.Session()
+    session.get(server.enable_automation_url)
+    session.post(f"{server.url}/24/session", data={"email": "autoqa@securly.com"})
+    return session
+
+
+class TestStandinServer:
+
+    def test_login_flow(self, server):
+        session = requests.Session()
+        assert 'Google "G" Logo Sign in with' in session.get(server.login_url).text
+        response = session.post(f"{server.url}/24/session", data={"email": "autoqa@securly.com"})
+        assert response.url.endswith("/24/dashboard")
+        # A known session skips the sign-in page, which resume_cached_session relies on
+        assert session.get(server.login_url).url.endswith("/24/dashboard")
+
+    def test_pages_require_login(self, server):
+        assert requests.get(f"{server.url}/24/dashboard").url.endswith("/24/login")
+
+    def test_dashboard_contract(self, server):
+        session = logged_in_session(server)
+        dashboard = session.get(f"{server.url}/24/dashboard?record=25973").text
+        assert dashboard.count("dashboard_queue_auditor_record-") == 3000
+        assert 'data-testid="dashboard_queue_auditor_record-25973__button"' in dashboard
+        assert ">rtqa1securly.com<" in dashboard
+        assert 'data-testid="dashboard_case-overview__send-email-button"' in dashboard
+        assert 'data-testid="email_incident-type__open-history-link"' in \
+            session.get(f"{server.url}/24/email?record=25973").text
+        history = session.get(f"{server.url}/24/history?record=25973").text
+        for n in (1, 12):
+            assert f'data-testid="history_flagged-tab_activity-{n}__add-activity-button"' in history
+        assert ">Close</button>" in history
+
+    def test_search_filters_queue(self, server):
+        session = logged_in_session(server)
+        dashboard = session.get(f"{server.url}/24/dashboard?q=rtqa12securly").text
+        assert dashboard.count("dashboard_queue_auditor_record-") == 1
+
+    def test_error_injection(self, server):
+        server.configure(error_rate=1.0, error_status=503, error_paths=["/24/*"])
+        assert requests.get(server.login_url).status_code == 503
+        assert requests.get(server.enable_automation_url).status_code == 200
+        assert server.stats()["errors"] == {"/24/login": 1}
+
+    def test_latency(self, server):
+        server.configure(latency_ms=200)
+        response = requests.get(server.enable_automation_url)
+        assert response.elapsed.total_seconds() >= 0.2
@@ -0,0 +1,91 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.tracing import RollingTracer
+
+
+class FakeTracing:
+    """Enforces Playwright's chunk rules: start() opens a chunk, and only one is open at a time."""
+
+    def __init__(self):
+        self.tracing = False
+        self.chunk_open = False
+        self.actions = []
+
+    def start(self, **options):
+        assert not self.tracing
+        self.tracing = self.chunk_open = True
+
+    def start_chunk(self, title=None):
+        assert self.tracing and not self.chunk_open, "a chunk is already open"
+        self.chunk_open = True
+        self.actions = []
+
+    def stop_chunk(self, path=None):
+        assert self.chunk_open, "no chunk to stop"
+        self.chunk_open = False
+        path.write_text(",".join(self.actions))
+
+    def stop(self, path=None):
+        self.stop_chunk(path)
+        self.tracing = False
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.tracing = FakeTracing()
+
+    def act(self, name):
+        assert self.tracing.chunk_open, f"{name} ran untraced"
+        self.tracing.actions.append(name)
+
+
+@pytest.fixture
+def tracer():
+    tracer = RollingTracer(FakeContext(), keep=3)
+    yield tracer
+    tracer.discard()
+
+
+class TestRollingTracer:
+
+    def test_every_action_lands_in_a_chunk(self, tracer):
+        context = tracer.context
+        context.act("goto")
+        tracer.end_step("login")
+        context.act("click")
+        context.act("fill")
+        tracer.end_step("search")
+        context.act("assert")
+        tracer.stop()
+        assert [(path.stem, path.read_text()) for path in tracer.chunks] == [
+            ("0000-login", "goto"),
+            ("0001-search", "click,fill"),
+            ("0002-teardown", "assert"),
+        ]
+        assert not context.tracing.tracing
+
+    def test_only_the_last_chunks_are_kept(self, tracer):
+        for step in range(5):
+            tracer.context.act(f"step {step}")
+            tracer.end_step(f"step{step}")
+        tracer.stop()
+        assert [path.stem for path in tracer.chunks] == ["0003-step3", "0004-step4", "0005-teardown"]
+        assert sorted(path.name for path in tracer.directory.iterdir()) == [path.name for path in tracer.chunks]
+
+    def test_stop_is_idempotent_and_ends_stepping(self, tracer):
+        tracer.stop()
+        tracer.stop()
+        tracer.end_step("late")
+        assert [path.stem for path in tracer.chunks] == ["0000-teardown"]
+
+    def test_persist(self, tracer, tmp_path):
+        tracer.end_step("login")
+        tracer.stop()
+        saved = tracer.persist(tmp_path / "failed")
+        assert [path.name for path in saved] == ["0000-login.zip", "0001-teardown.zip"]
+        assert all(path.exists() for path in saved)
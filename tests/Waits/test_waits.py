@@ -0,0 +1,228 @@
+import asyncio
+import sys
+import os
+import time
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from controller.instrumentation import counters
+from controller.waits import DOM_CHECK_ERRORS, AsyncWait, Wait, WaitTimeout, wait_stats
+
+
+class FakeRequest:
+
+    def __init__(self, url):
+        self.url = url
+
+
+class FakeResponse:
+
+    def __init__(self, url, status=200):
+        self.url = url
+        self.status = status
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.pages = []
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, value):
+        for handler in self.handlers.get(event, ()):
+            handler(value)
+
+
+class FakePage:
+    """Just enough of a page for Wait: events, timers and a DOM that is busy until ``quiet_at``."""
+
+    def __init__(self):
+        self.context = FakeContext()
+        counters.watch(self.context)
+        self.listeners = {}
+        self.timers = []
+        self.quiet_at = 0.0
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    def emit(self, event, value):
+        for handler in list(self.listeners.get(event, ())):
+            handler(value)
+
+    def later(self, delay_ms, action):
+        self.timers.append((time.perf_counter() + delay_ms / 1000, action))
+
+    def _fire(self):
+        now = time.perf_counter()
+        for timer in [timer for timer in self.timers if timer[0] <= now]:
+            self.timers.remove(timer)
+            timer[1]()
+
+    def wait_for_timeout(self, ms):
+        time.sleep(ms / 1000)
+        self._fire()
+
+    def is_closed(self):
+        return False
+
+    def evaluate(self, script):
+        pass
+
+    def wait_for_function(self, script, arg=None, timeout=None):
+        if time.perf_counter() + timeout / 1000 < self.quiet_at:
+            time.sleep(timeout / 1000)
+            raise PlaywrightTimeoutError("DOM still changing")
+        time.sleep(max(self.quiet_at - time.perf_counter(), 0))
+
+
+class DetachedPage(FakePage):
+    """A page whose frame keeps detaching, so every DOM check errors."""
+
+    def __init__(self):
+        super().__init__()
+        self.evaluations = 0
+        self.waited = []
+
+    def wait_for_timeout(self, ms):
+        self.waited.append(ms)
+        super().wait_for_timeout(ms)
+
+    def evaluate(self, script):
+        self.evaluations += 1
+        raise PlaywrightError("Execution context was destroyed")
+
+
+class FakeLocator:
+
+    def __init__(self, visible=True):
+        self.visible = visible
+
+    def wait_for(self, state="visible", timeout=None):
+        if not self.visible:
+            time.sleep(timeout / 1000)
+            raise PlaywrightTimeoutError(f"not {state}")
+
+    def __str__(self):
+        return "dashboard record"
+
+
+class AsyncFakePage(FakePage):
+
+    async def wait_for_timeout(self, ms):
+        await asyncio.sleep(ms / 1000)
+        self._fire()
+
+    async def evaluate(self, script):
+        pass
+
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        FakePage.wait_for_function(self, script, arg, timeout)
+
+
+class AsyncDetachedPage(DetachedPage):
+
+    async def wait_for_timeout(self, ms):
+        DetachedPage.wait_for_timeout(self, ms)
+
+    async def evaluate(self, script):
+        DetachedPage.evaluate(self, script)
+
+
+class AsyncFakeLocator(FakeLocator):
+
+    async def wait_for(self, state="visible", timeout=None):
+        FakeLocator.wait_for(self, state, timeout)
+
+
+class TestWait:
+
+    def test_network_idle_waits_for_requests_to_finish(self):
+        page = FakePage()
+        request = FakeRequest("https://oncall.test/api/queue")
+        page.context.emit("request", request)
+        page.later(60, lambda: page.context.emit("requestfinished", request))
+        waited = Wait(page, "idle", budget_ms=2000).network_idle(idle_ms=50).until()
+        assert 100 <= waited < 1000
+
+    def test_required_idle_times_out_on_long_poll(self):
+        page = FakePage()
+        page.context.emit("request", FakeRequest("https://oncall.test/api/poll"))
+        with pytest.raises(WaitTimeout, match="1 requests in flight"):
+            Wait(page, "long poll", budget_ms=150).network_idle().until()
+
+    def test_ignored_urls_do_not_block_idle(self):
+        page = FakePage()
+        page.context.emit("request", FakeRequest("https://oncall.test/api/poll"))
+        Wait(page, "ignored", budget_ms=500).network_idle(idle_ms=20, ignore=["*/api/poll"]).until()
+
+    def test_best_effort_idle_does_not_fail_the_wait(self):
+        page = FakePage()
+        page.context.emit("request", FakeRequest("https://oncall.test/api/poll"))
+        started = time.perf_counter()
+        Wait(page, "best effort", budget_ms=5000, best_effort_ms=100) \
+            .selector(FakeLocator()).network_idle(required=False).dom_settled(required=False).until()
+        assert time.perf_counter() - started < 1
+        assert wait_stats.waits["best effort"]["best_effort_misses"] == 1
+        assert wait_stats.waits["best effort"]["timeouts"] == 0
+
+    def test_missing_selector_fails(self):
+        with pytest.raises(WaitTimeout, match="dashboard record visible"):
+            Wait(FakePage(), "selector", budget_ms=100).selector(FakeLocator(visible=False)) \
+                .network_idle(required=False).until()
+
+    def test_dom_settled(self):
+        page = FakePage()
+        page.quiet_at = time.perf_counter() + 0.05
+        Wait(page, "dom", budget_ms=1000).dom_settled().until()
+        page.quiet_at = time.perf_counter() + 10
+        with pytest.raises(WaitTimeout, match="DOM quiet"):
+            Wait(page, "dom", budget_ms=100).dom_settled().until()
+
+    def test_dom_errors_back_off_and_give_up(self):
+        page = DetachedPage()
+        with pytest.raises(WaitTimeout, match="DOM quiet"):
+            Wait(page, "detached", budget_ms=5000).dom_settled().until()
+        assert page.evaluations == DOM_CHECK_ERRORS
+        assert len(page.waited) == DOM_CHECK_ERRORS - 1 and all(ms > 0 for ms in page.waited)
+
+    def test_response_seen_inside_the_block(self):
+        page = FakePage()
+        with Wait(page, "response", budget_ms=500).response("**/api/queue*", status=200):
+            page.emit("response", FakeResponse("https://oncall.test/api/queue?page=1"))
+        assert page.listeners["response"] == []
+        with pytest.raises(WaitTimeout, match="response"):
+            with Wait(page, "response", budget_ms=100).response("**/api/queue*", status=200):
+                page.emit("response", FakeResponse("https://oncall.test/api/queue", status=500))
+
+
+class TestAsyncWait:
+
+    def test_best_effort_and_selector(self):
+        page = AsyncFakePage()
+        page.context.emit("request", FakeRequest("https://oncall.test/api/poll"))
+
+        async def scenario():
+            async with AsyncWait(page, "async", budget_ms=2000, best_effort_ms=50) \
+                    .selector(AsyncFakeLocator()).network_idle(required=False):
+                pass
+            with pytest.raises(WaitTimeout):
+                await AsyncWait(page, "async", budget_ms=100).selector(AsyncFakeLocator(visible=False)).until()
+        asyncio.run(scenario())
+
+    def test_dom_errors_back_off_and_give_up(self):
+        page = AsyncDetachedPage()
+
+        async def scenario():
+            with pytest.raises(WaitTimeout, match="DOM quiet"):
+                await AsyncWait(page, "detached", budget_ms=5000).dom_settled().until()
+        asyncio.run(scenario())
+        assert page.evaluations == DOM_CHECK_ERRORS and len(page.waited) == DOM_CHECK_ERRORS - 1